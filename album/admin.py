@@ -1,5 +1,14 @@
 from django.contrib import admin
-from .models import Album
+from core.aggregates import refresh_artist_genres
+from .models import Album, AlbumGenre
+
+
+class AlbumGenreInline(admin.TabularInline):
+    # Tabla intermedia explícita: el admin no admite filter_horizontal con ella
+    model = AlbumGenre
+    extra = 1
+    verbose_name = 'Género'
+    verbose_name_plural = 'Géneros'
 
 
 @admin.register(Album)
@@ -10,7 +19,7 @@ class AlbumAdmin(admin.ModelAdmin):
     ]
     list_filter = ['status', 'release_date', 'artist_id']
     search_fields = ['title', 'artist_id__name']
-    filter_horizontal = ['genres']
+    inlines = [AlbumGenreInline]
     readonly_fields = ['total_tracks', 'total_duration', 'duration_formatted', 'is_released']
     date_hierarchy = 'release_date'
 
@@ -19,10 +28,29 @@ class AlbumAdmin(admin.ModelAdmin):
             'fields': ('title', 'artist_id', 'release_date', 'cover_url')
         }),
         ('Detalles', {
-            'fields': ('status', 'price', 'genres')
+            'fields': ('status', 'price')
         }),
         ('Estadísticas', {
             'fields': ('total_tracks', 'total_duration', 'duration_formatted', 'is_released'),
             'classes': ('collapse',)
         }),
-    )
\ No newline at end of file
+    )
+
+    def save_model(self, request, obj, form, change):
+        # Artista anterior: si el álbum cambia de artista también hay que recalcularlo
+        obj._previous_artist_pk = form.initial.get('artist_id') if change else None
+        super().save_model(request, obj, form, change)
+
+    def save_related(self, request, form, formsets, change):
+        # Después de los géneros en línea
+        super().save_related(request, form, formsets, change)
+        refresh_artist_genres({form.instance._previous_artist_pk, form.instance.artist_id_id})
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        refresh_artist_genres([obj.artist_id_id])
+
+    def delete_queryset(self, request, queryset):
+        artist_pks = set(queryset.values_list('artist_id', flat=True))
+        super().delete_queryset(request, queryset)
+        refresh_artist_genres(artist_pks)
@@ -1,15 +1,21 @@
 from django.db import models
 from django.conf import settings
+from django.db.models import Q
 from core.choices import ReleaseStatus
-import uuid
+from core.ids import CompactUUIDField, new_uuid
+from core.managers import PublishedManager, ReleaseQuerySet
+
+PUBLISHED = Q(status=ReleaseStatus.PUBLISHED)
+DRAFT = Q(status=ReleaseStatus.DRAFT)
 
 
 class Album(models.Model):
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = CompactUUIDField(primary_key=True, default=new_uuid, editable=False)
     artist_id = models.ForeignKey(
         'artist.Artist',
         on_delete=models.CASCADE,
-        related_name='albums'
+        related_name='albums',
+        db_index=False
     )
     title = models.CharField(max_length=255)
     cover_url = models.URLField(
@@ -32,29 +38,48 @@ class Album(models.Model):
     )
     genres = models.ManyToManyField(
         'genre.Genre',
+        through='AlbumGenre',
         related_name='albums',
         blank=True
     )
-    track_list = models.ManyToManyField(
-        'track.Track',
-        related_name='tracks',
-        blank=True
+    # Totales de sus pistas (todos los estados), mantenidos por core.aggregates
+    # en cada escritura de pistas; check_album_aggregates los verifica
+    track_count = models.PositiveIntegerField(default=0, editable=False)
+    total_duration_sec = models.PositiveIntegerField(default=0, editable=False)
+    genre_ids = models.JSONField(
+        default=list,
+        blank=True,
+        editable=False,
+        help_text="Ids de los géneros de sus pistas"
     )
 
     # Campos de auditoría
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = ReleaseQuerySet.as_manager()
+    published = PublishedManager()
+
     class Meta:
         db_table = 'albums'
         ordering = ['-release_date', 'title']
         verbose_name = 'Álbum'
         verbose_name_plural = 'Álbumes'
+        # Mismo orden que Meta.ordering: los listados no necesitan ordenar en memoria.
+        # Los álbumes publicados de un artista salen del índice parcial; el
+        # listado general usa (status, ...). Los borradores por fecha sirven al
+        # programador de lanzamientos y a /albums/upcoming
         indexes = [
-            models.Index(fields=['title']),
-            models.Index(fields=['release_date']),
-            models.Index(fields=['status']),
-            models.Index(fields=['artist_id', 'release_date']),
+            models.Index(
+                fields=['artist_id', '-release_date', 'title'], condition=PUBLISHED,
+                name='albums_pub_artist_release_idx'
+            ),
+            models.Index(fields=['artist_id', '-release_date', 'title']),
+            models.Index(fields=['status', '-release_date', 'title']),
+            # status repetido en la clave: sin él el planificador prefiere el índice completo
+            models.Index(
+                fields=['status', 'release_date', 'title'], condition=DRAFT, name='albums_draft_release_idx'
+            ),
         ]
 
     def __str__(self):
@@ -66,21 +91,17 @@ class Album(models.Model):
         from django.utils import timezone
         if self.release_date is None:
             return False
-        return self.release_date <= timezone.now().date()
+        return self.release_date <= timezone.localdate()
 
     @property
     def total_duration(self):
-        """Calcula la duración total del álbum sumando las pistas"""
-        from django.db.models import Sum
-        total_seconds = self.tracks.aggregate(
-            total=Sum('duration_sec')
-        )['total'] or 0
-        return total_seconds
+        """Duración total del álbum (suma guardada de sus pistas)"""
+        return self.total_duration_sec
 
     @property
     def total_tracks(self):
         """Número total de pistas en el álbum"""
-        return self.tracks.count()
+        return self.track_count
 
     @property
     def duration_formatted(self):
@@ -96,5 +117,21 @@ class Album(models.Model):
             return f"{minutes:02d}:{seconds:02d}"
 
     def get_tracks_ordered(self):
-        """Obtiene las pistas ordenadas (podrías agregar un campo 'track_number' después)"""
-        return self.tracks.all().order_by('title')
\ No newline at end of file
+        """Pistas en el orden de la lista del álbum (disco y número)"""
+        from track.models import TRACKLIST_ORDER
+        return self.tracks.order_by(*TRACKLIST_ORDER)
+
+
+class AlbumGenre(models.Model):
+    """Tabla intermedia de ``Album.genres`` (misma tabla que la generada antes)"""
+    album = models.ForeignKey(Album, on_delete=models.CASCADE, db_index=False)
+    genre = models.ForeignKey('genre.Genre', on_delete=models.CASCADE, db_index=False)
+
+    class Meta:
+        db_table = 'albums_genres'
+        constraints = [
+            models.UniqueConstraint(fields=['album', 'genre'], name='albums_genres_album_genre_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['genre', 'album']),
+        ]
@@ -0,0 +1,35 @@
+"""Serializador de lectura de álbumes, sin dependencias de track.serializers
+
+track.serializers lo anida en cada pista y album.serializers importa track.serializers;
+vivir aquí rompe el ciclo y deja la referencia resuelta al importar.
+"""
+from rest_framework import serializers
+from artist.serializers import ArtistSerializer
+from .models import Album
+
+
+class AlbumSerializer(serializers.ModelSerializer):
+    # Campos de solo lectura para representación
+    artist = serializers.SerializerMethodField()
+
+    # Campos calculados
+    total_tracks = serializers.ReadOnlyField()
+    total_duration = serializers.ReadOnlyField()
+    duration_formatted = serializers.ReadOnlyField()
+    is_released = serializers.ReadOnlyField()
+
+    # Campos para escritura
+    artist_id = serializers.UUIDField(write_only=True, required=True)
+
+    class Meta:
+        model = Album
+        fields = [
+            'id', 'artist', 'title', 'cover_url', 'release_date',
+            'status', 'genres', 'price', 'total_tracks', 'total_duration',
+            'genre_ids', 'duration_formatted', 'is_released', 'created_at', 'updated_at',
+            'artist_id'
+        ]
+        read_only_fields = ['id', 'genre_ids', 'created_at', 'updated_at']
+
+    def get_artist(self, obj):
+        return ArtistSerializer(obj.artist_id).data
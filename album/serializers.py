@@ -1,49 +1,47 @@
+from django.db import transaction
+from django.db.models import prefetch_related_objects
+from django.utils import timezone
 from rest_framework import serializers
+from artist.models import Artist
+from artist.serializers import ArtistSerializer
+from core.aggregates import refresh_artist_genres
+from core.relations import BatchedPrimaryKeyRelatedField, BatchedRelationsMixin, set_prefetched
+from core.sharding import bulk_create_tracks, sharded_tracks, sharding_enabled
+from core.updates import save_changed_fields
+from track.models import TRACKLIST_ORDER, Track
+from track.serializers import TrackCreateSerializer, TrackSerializer
 from .models import Album
+from .read_serializers import AlbumSerializer  # noqa: F401  (reexportado para las vistas)
 
 
-class AlbumSerializer(serializers.ModelSerializer):
-    # Campos de solo lectura para representación
-    artist = serializers.SerializerMethodField()
-
-    # Campos calculados
-    total_tracks = serializers.ReadOnlyField()
-    total_duration = serializers.ReadOnlyField()
-    duration_formatted = serializers.ReadOnlyField()
-    is_released = serializers.ReadOnlyField()
+class AlbumTrackCreateSerializer(TrackCreateSerializer):
+    """Pista anidada en la creación de un álbum (hereda artista y álbum)"""
+    artist_id = None
+    album_id = None
 
-    # Campos para escritura
-    artist_id = serializers.UUIDField(write_only=True, required=True)
-
-    class Meta:
-        model = Album
+    class Meta(TrackCreateSerializer.Meta):
         fields = [
-            'id', 'artist', 'title', 'cover_url', 'release_date',
-            'status', 'genres', 'price', 'total_tracks', 'total_duration',
-            'duration_formatted', 'is_released', 'created_at', 'updated_at',
-            'artist_id'
+            'disc_number', 'track_number', 'title', 'duration_sec', 'explicit', 'status',
+            'preview_url', 'audio_master_url', 'language', 'genres'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at']
 
-    def get_artist(self, obj):
-        """Importación diferida para evitar importaciones circulares"""
-        from artist.serializers import ArtistSerializer
-        return ArtistSerializer(obj.artist).data
 
-
-class AlbumCreateSerializer(serializers.ModelSerializer):
-    artist_id = serializers.UUIDField(required=True)
+class AlbumCreateSerializer(BatchedRelationsMixin, serializers.ModelSerializer):
+    artist_id = BatchedPrimaryKeyRelatedField(
+        queryset=Artist.objects.all(),
+        error_messages={'does_not_exist': 'Artista no encontrado'}
+    )
+    tracks = AlbumTrackCreateSerializer(many=True, required=False, write_only=True)
 
     class Meta:
         model = Album
         fields = [
             'id', 'artist_id', 'title', 'cover_url', 'release_date',
-            'status', 'genres', 'price'
+            'status', 'genres', 'price', 'tracks'
         ]
 
     def validate_release_date(self, value):
         """Validar que la fecha de lanzamiento no sea en el pasado para álbumes publicados"""
-        from django.utils import timezone
         if value < timezone.now().date():
             raise serializers.ValidationError(
                 "La fecha de lanzamiento no puede ser en el pasado para álbumes publicados"
@@ -56,31 +54,53 @@ class AlbumCreateSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("El precio no puede ser negativo")
         return value
 
+    @transaction.atomic
     def create(self, validated_data):
-        # Extraer artist_id
-        artist_id = validated_data.pop('artist_id')
+        # Artista y géneros ya vienen resueltos como instancias
+        artist = validated_data['artist_id']
         genres = validated_data.pop('genres', [])
-
-        # Obtener instancia del artista
-        try:
-            from artist.models import Artist
-            artist = Artist.objects.get(id=artist_id)
-            validated_data['artist'] = artist
-        except Artist.DoesNotExist:
-            raise serializers.ValidationError({"artist_id": "Artista no encontrado"})
+        tracks_data = validated_data.pop('tracks', [])
 
         # Crear el álbum
         album = Album.objects.create(**validated_data)
 
-        # Agregar géneros si se proporcionaron
+        # Géneros del álbum con un único INSERT
+        AlbumGenre = Album.genres.through
+        AlbumGenre.objects.bulk_create([
+            AlbumGenre(album_id=album.pk, genre_id=genre.pk) for genre in genres
+        ])
+        set_prefetched(album, 'genres', genres)
         if genres:
-            album.genres.set(genres)
-
+            # bulk_create_tracks solo rehace los pares de los géneros de las pistas
+            refresh_artist_genres([artist.pk], {genre.pk for genre in genres})
+
+        # Pistas y sus géneros en bloque
+        tracks = []
+        track_genres = []
+        for track_data in tracks_data:
+            track_genres.append(track_data.pop('genres', []))
+            tracks.append(Track(artist_id=artist, album_id=album, **track_data))
+        bulk_create_tracks(tracks, [
+            (track, genre.pk)
+            for track, genres_of_track in zip(tracks, track_genres)
+            for genre in genres_of_track
+        ])
+        # bulk_create_tracks ya dejó en ``album`` los totales que guardó en su fila
+        for track, genres_of_track in zip(tracks, track_genres):
+            set_prefetched(track, 'genres', genres_of_track)
+
+        # Las pistas quedan en memoria para serializar sin volver a consultar
+        set_prefetched(album, 'tracks', sorted(
+            tracks, key=lambda track: (track.disc_number, track.track_number, track.title)
+        ))
         return album
 
 
-class AlbumUpdateSerializer(serializers.ModelSerializer):
-    artist_id = serializers.UUIDField(required=False)
+class AlbumUpdateSerializer(BatchedRelationsMixin, serializers.ModelSerializer):
+    artist_id = BatchedPrimaryKeyRelatedField(
+        queryset=Artist.objects.all(), required=False,
+        error_messages={'does_not_exist': 'Artista no encontrado'}
+    )
 
     class Meta:
         model = Album
@@ -90,7 +110,6 @@ class AlbumUpdateSerializer(serializers.ModelSerializer):
         ]
 
     def validate_release_date(self, value):
-        from django.utils import timezone
         if value and value < timezone.now().date():
             raise serializers.ValidationError(
                 "La fecha de lanzamiento no puede ser en el pasado"
@@ -103,27 +122,19 @@ class AlbumUpdateSerializer(serializers.ModelSerializer):
         return value
 
     def update(self, instance, validated_data):
-        # Manejar actualización del artista si se proporciona
-        artist_id = validated_data.pop('artist_id', None)
+        # El artista y los géneros ya vienen resueltos como instancias
         genres = validated_data.pop('genres', None)
+        old_artist_pk = instance.artist_id_id
 
-        if artist_id is not None:
-            try:
-                from artist.models import Artist
-                artist = Artist.objects.get(id=artist_id)
-                instance.artist = artist
-            except Artist.DoesNotExist:
-                raise serializers.ValidationError({"artist_id": "Artista no encontrado"})
-
-        # Actualizar géneros si se proporcionan
-        if genres is not None:
-            instance.genres.set(genres)
-
-        # Actualizar los demás campos
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
+        with transaction.atomic():
+            # Actualizar géneros si se proporcionan
+            if genres is not None:
+                instance.genres.set(genres)
 
-        instance.save()
+            # Actualizar los demás campos y los géneros de los artistas afectados
+            save_changed_fields(instance, validated_data)
+            if genres is not None or old_artist_pk != instance.artist_id_id:
+                refresh_artist_genres({old_artist_pk, instance.artist_id_id})
         return instance
 
 
@@ -140,12 +151,21 @@ class AlbumSongsSerializer(serializers.ModelSerializer):
         ]
 
     def get_artist(self, obj):
-        """Importación diferida para artista"""
-        from artist.serializers import ArtistSerializer
-        return ArtistSerializer(obj.artist).data
+        return ArtistSerializer(obj.artist_id).data
 
     def get_songs(self, obj):
-        """Importación diferida para tracks"""
-        from track.serializers import TrackSerializer
-        tracks = obj.tracks.all()
-        return TrackSerializer(tracks, many=True).data
\ No newline at end of file
+        prefetched = getattr(obj, '_prefetched_objects_cache', {})
+        if 'tracks' in prefetched:
+            # Respuesta de la creación: todas las pistas creadas (también los
+            # borradores), ya en memoria y en orden de tracklist
+            tracks = list(prefetched['tracks'])
+        else:
+            tracks = obj.tracks.published().order_by(*TRACKLIST_ORDER)
+            if sharding_enabled():
+                # Cada pista está en el shard de su artista: se consultan todos
+                tracks = sharded_tracks(tracks)
+            tracks = list(tracks)
+        prefetch_related_objects(tracks, 'genres')
+        # Artista y álbum son comunes a todas las pistas: se serializan una vez
+        context = {**self.context, 'nested_cache': {}}
+        return TrackSerializer(tracks, many=True, context=context).data
\ No newline at end of file
@@ -1,3 +1,214 @@
-from django.test import TestCase
+from datetime import date
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.core.management import call_command
+from django.db import DatabaseError, connection
+from django.db.models import QuerySet
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from album.models import Album
+from artist.models import ArtistGenre
+from core.aggregates import compute_artist_genres
+from core.releases import release_due_albums
+from core.testing import BASE, CatalogTestCase
+from genre.models import Genre
+from track.models import Track
+
+
+class AlbumReleaseTests(CatalogTestCase):
+    def test_due_draft_albums_are_released_with_their_tracks(self):
+        today = timezone.localdate()
+        due = Album.objects.create(artist_id=self.artist, title='Hoy', release_date=today)
+        later = Album.objects.create(
+            artist_id=self.artist, title='Mañana', release_date=date.fromordinal(today.toordinal() + 1)
+        )
+        track = Track.objects.create(
+            artist_id=self.artist, album_id=due, title='Nueva', status='draft',
+            audio_master_url='https://example.com/c.mp3'
+        )
+
+        self.assertEqual(release_due_albums(), [due.pk])
+        due.refresh_from_db()
+        later.refresh_from_db()
+        track.refresh_from_db()
+        self.assertEqual((due.status, later.status, track.status), ('published', 'draft', 'published'))
+        upcoming = APIClient().get(BASE + 'albums/upcoming/').json()['items']
+        self.assertEqual([album['title'] for album in upcoming], ['Mañana'])
+
+    def test_failed_track_update_keeps_the_album_in_draft(self):
+        due = Album.objects.create(artist_id=self.artist, title='Hoy', release_date=timezone.localdate())
+        Track.objects.create(
+            artist_id=self.artist, album_id=due, title='Nueva', status='draft',
+            audio_master_url='https://example.com/c.mp3'
+        )
+        update = QuerySet.update
+
+        def failing_update(queryset, **kwargs):
+            if queryset.model is Track:
+                raise DatabaseError('base de pistas no disponible')
+            return update(queryset, **kwargs)
+
+        # Álbumes y pistas se publican en la misma unidad: el lote no queda a medias
+        with mock.patch.object(QuerySet, 'update', failing_update), self.assertRaises(DatabaseError):
+            release_due_albums()
+        due.refresh_from_db()
+        self.assertEqual(due.status, 'draft')
+
+
+class AlbumAggregateTests(CatalogTestCase):
+    def test_album_totals_follow_track_writes(self):
+        client = APIClient()
+        other = Album.objects.create(artist_id=self.artist, title='Otro', release_date=date(2021, 1, 1))
+        response = client.post(BASE + 'tracks/', {
+            'artist_id': str(self.artist.pk), 'album_id': str(self.album.pk), 'title': 'Nueva',
+            'duration_sec': 200, 'audio_master_url': 'https://example.com/b.mp3',
+            'genres': [str(self.genre.pk)],
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        track_pk = Track.objects.get(title='Nueva').pk
+
+        def totals(album):
+            album.refresh_from_db()
+            return album.track_count, album.total_duration_sec, album.genre_ids
+
+        # Las pistas de setUpTestData se crearon con el ORM: los totales se reparan
+        call_command('check_album_aggregates', '--repair', stdout=StringIO())
+        self.assertEqual(totals(self.album), (2, 200, sorted([str(self.genre.pk), str(self.subgenre.pk)])))
+
+        client.patch(BASE + f'tracks/{track_pk}/', {'album_id': str(other.pk), 'duration_sec': 90}, format='json')
+        self.assertEqual(totals(self.album), (1, 0, [str(self.subgenre.pk)]))
+        self.assertEqual(totals(other), (1, 90, [str(self.genre.pk)]))
+
+        client.delete(BASE + f'tracks/{track_pk}/')
+        self.assertEqual(totals(other), (0, 0, []))
+        with CaptureQueriesContext(connection) as queries:
+            client.get(BASE + f'albums/{self.album.pk}/')
+        self.assertFalse([query for query in queries if '"tracks"."album_id_id"' in query['sql']])
+
+
+class AlbumTracklistTests(CatalogTestCase):
+    def test_album_tracks_follow_tracklist_order(self):
+        client = APIClient()
+        track = {'audio_master_url': 'https://example.com/t.mp3', 'duration_sec': 60}
+        response = client.post(BASE + 'albums/', {
+            'artist_id': str(self.artist.pk), 'title': 'Doble', 'status': 'published',
+            'release_date': str(timezone.localdate()),
+            'tracks': [
+                {**track, 'title': 'Zeta'}, {**track, 'title': 'Alfa'}, {**track, 'title': 'Beta', 'disc_number': 2},
+            ],
+        }, format='json')
+        self.assertEqual(response.status_code, 201)
+        album = response.json()['id']
+        client.post(BASE + 'tracks/', {
+            **track, 'title': 'Extra', 'artist_id': str(self.artist.pk), 'album_id': album,
+        }, format='json')
+
+        songs = client.get(BASE + f'albums/{album}/album_songs/').json()['songs']
+        self.assertEqual(
+            [(song['disc_number'], song['track_number'], song['title']) for song in songs],
+            [(1, 1, 'Zeta'), (1, 2, 'Alfa'), (1, 3, 'Extra'), (2, 1, 'Beta')]
+        )
+        listed = client.get(BASE + f'tracks/?album_id={album}').json()['items']
+        self.assertEqual([song['title'] for song in listed], ['Zeta', 'Alfa', 'Extra', 'Beta'])
+
+    def test_create_response_lists_every_new_track_without_reading_back(self):
+        track = {'audio_master_url': 'https://example.com/t.mp3'}
+        with CaptureQueriesContext(connection) as queries:
+            response = APIClient().post(BASE + 'albums/', {
+                'artist_id': str(self.artist.pk), 'title': 'Con borrador',
+                'release_date': str(timezone.localdate()),
+                'tracks': [{**track, 'title': 'one', 'status': 'draft'}, {**track, 'title': 'two'}],
+            }, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual([song['title'] for song in response.json()['songs']], ['one', 'two'])
+        # El tracklist de la respuesta sale de memoria, no de un SELECT tras el commit
+        self.assertFalse([query for query in queries if 'ORDER BY "tracks"."disc_number"' in query['sql']])
+
+
+class AlbumNestedCreateTests(CatalogTestCase):
+    track_fields = {'audio_master_url': 'https://example.com/t.mp3', 'duration_sec': 100}
+
+    def post(self, tracks, **fields):
+        return APIClient().post(BASE + 'albums/', {
+            'artist_id': str(self.artist.pk), 'title': 'Anidado', 'release_date': str(timezone.localdate()),
+            'genres': [str(self.genre.pk)], 'tracks': tracks, **fields,
+        }, format='json')
+
+    def test_album_and_tracks_are_written_in_bulk(self):
+        tracks = [
+            {**self.track_fields, 'title': f'Pista {number}', 'genres': [str(self.subgenre.pk), str(self.genre.pk)]}
+            for number in range(1, 4)
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post(tracks)
+        self.assertEqual(response.status_code, 201, response.content)
+        body = response.json()
+        self.assertEqual(body['genres'], [str(self.genre.pk)])
+        self.assertEqual(
+            [(song['track_number'], song['title'], sorted(song['genres'])) for song in body['songs']],
+            [(number, f'Pista {number}', sorted([str(self.genre.pk), str(self.subgenre.pk)])) for number in (1, 2, 3)]
+        )
+        # Un INSERT para todas las pistas y otro para todos sus géneros
+        sql = [query['sql'] for query in queries]
+        self.assertEqual(sum(statement.startswith('INSERT INTO "tracks" ') for statement in sql), 1)
+        self.assertEqual(sum(statement.startswith('INSERT INTO "tracks_genres"') for statement in sql), 1)
+        # Los géneros de todas las pistas se resuelven con una sola consulta
+        resolved = [
+            statement for statement in sql
+            if statement.startswith('SELECT "genres"."genre_id", "genres"."name", "genres"."description"')
+            and 'IN (' in statement
+        ]
+        self.assertEqual(len(resolved), 1)
+        album = Album.objects.get(pk=body['id'])
+        self.assertEqual((album.track_count, album.total_duration_sec), (3, 300))
+        # Los totales de la respuesta son los calculados al escribir, sin releer el álbum
+        nested = body['songs'][0]['album']
+        self.assertEqual((nested['total_tracks'], nested['total_duration']), (3, 300))
+        self.assertEqual(nested['genre_ids'], album.genre_ids)
+        self.assertFalse([
+            statement for statement in sql if statement.startswith('SELECT') and '"albums"."track_count"' in statement
+        ])
+
+    def test_invalid_track_rejects_the_whole_album(self):
+        for tracks in (
+            [{**self.track_fields, 'title': 'Buena'}, {'title': 'Sin audio'}],
+            [{**self.track_fields, 'title': 'Buena', 'genres': ['00000000-0000-0000-0000-000000000000']}],
+        ):
+            with self.subTest(tracks=tracks):
+                response = self.post(tracks)
+                self.assertEqual(response.status_code, 400)
+                self.assertIn('tracks', response.json())
+        self.assertFalse(Album.objects.filter(title='Anidado').exists())
+        self.assertFalse(Track.objects.filter(title='Buena').exists())
+
+    def test_without_tracks_returns_the_plain_album(self):
+        response = APIClient().post(BASE + 'albums/', {
+            'artist_id': str(self.artist.pk), 'title': 'Solo', 'release_date': str(timezone.localdate()),
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        self.assertNotIn('songs', response.json())
+        self.assertEqual(Album.objects.get(title='Solo').track_count, 0)
+
+
+class AlbumArtistGenreTests(CatalogTestCase):
+    def test_album_and_tracklist_genres_reach_artist_genres(self):
+        call_command('rebuild_artist_genres', stdout=StringIO())
+        jazz = Genre.objects.create(name='Jazz')
+        response = APIClient().post(BASE + 'albums/', {
+            'artist_id': str(self.artist.pk), 'title': 'Mixto', 'release_date': str(timezone.localdate()),
+            'genres': [str(jazz.pk)],
+            'tracks': [
+                {'title': 'Una', 'audio_master_url': 'https://example.com/u.mp3', 'genres': [str(self.genre.pk)]},
+            ],
+        }, format='json')
+        self.assertEqual(response.status_code, 201, response.content)
+        weights = compute_artist_genres([self.artist.pk])[self.artist.pk]
+        links = ArtistGenre.objects.filter(artist=self.artist)
+        self.assertEqual(
+            {(link.genre_id, link.track_count, link.album_count) for link in links},
+            {(genre_pk, tracks, albums) for genre_pk, (tracks, albums) in weights.items()}
+        )
+        self.assertEqual(links.get(genre=jazz).album_count, 1)
@@ -2,7 +2,15 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
+from django.db import DEFAULT_DB_ALIAS
 from django.db.models import Q
+from django.utils import timezone
+from core.aggregates import refresh_artist_genres
+from core.coalescing import CoalescedReadMixin
+from core.filters import AllowlistedOrderingFilter
+from core.releases import upcoming_albums
+from core.sharding import atomic_on_track_databases, detach_album_tracks, shard_for_artist
+from core.write_queue import run_write
 from .models import Album
 from .serializers import (
     AlbumSerializer,
@@ -12,9 +20,16 @@ from .serializers import (
 )
 
 
-class AlbumViewSet(viewsets.ModelViewSet):
-    queryset = Album.objects.select_related('artist').prefetch_related('genres', 'tracks')
+class AlbumViewSet(CoalescedReadMixin, viewsets.ModelViewSet):
+    queryset = Album.objects.select_related('artist_id').prefetch_related('genres')
     serializer_class = AlbumSerializer
+    filter_backends = [AllowlistedOrderingFilter]
+    # Los índices de álbumes están en (-release_date, title): el orden
+    # ascendente los recorre al revés, con el desempate también invertido
+    ordering_allowlist = {
+        '-release_date': ('-release_date', 'title'),
+        'release_date': ('release_date', '-title'),
+    }
 
     def get_serializer_class(self):
         if self.action == 'create':
@@ -31,11 +46,22 @@ class AlbumViewSet(viewsets.ModelViewSet):
         # Filtros según query parameters
         artist_id = self.request.query_params.get('artist_id')
         status = self.request.query_params.get('status')
+        released = self.request.query_params.get('released')
 
         if artist_id:
             queryset = queryset.filter(artist_id=artist_id)
         if status:
             queryset = queryset.filter(status=status)
+        elif self.action in ('list', 'search'):
+            # Listados públicos: solo álbumes publicados salvo que se pida otro estado
+            queryset = queryset.published()
+
+        if released is not None:
+            # Rango sobre release_date en el mismo índice que el orden del listado
+            if released.lower() == 'true':
+                queryset = queryset.filter(release_date__lte=timezone.localdate())
+            elif released.lower() == 'false':
+                queryset = queryset.filter(release_date__gt=timezone.localdate())
 
         return queryset
 
@@ -67,20 +93,28 @@ class AlbumViewSet(viewsets.ModelViewSet):
 
     def create(self, request, *args, **kwargs):
         """
-        POST /albums - Crear un álbum
+        POST /albums - Crear un álbum (opcionalmente con su tracklist en 'tracks')
         """
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
+        # El tracklist se escribe en el shard del artista del álbum
+        using = DEFAULT_DB_ALIAS
+        if serializer.validated_data.get('tracks'):
+            using = shard_for_artist(serializer.validated_data['artist_id'].pk)
 
         try:
-            album = serializer.save()
+            album = run_write(serializer.save, using=using)
         except Exception as e:
             return Response(
                 {'error': str(e)},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        read_serializer = AlbumSerializer(album)
+        # Con tracklist se devuelve el álbum con sus canciones (ya en memoria)
+        if 'tracks' in request.data:
+            read_serializer = AlbumSongsSerializer(album)
+        else:
+            read_serializer = AlbumSerializer(album)
         return Response(read_serializer.data, status=status.HTTP_201_CREATED)
 
     def partial_update(self, request, *args, **kwargs):
@@ -92,7 +126,7 @@ class AlbumViewSet(viewsets.ModelViewSet):
         serializer.is_valid(raise_exception=True)
 
         try:
-            album = serializer.save()
+            album = run_write(serializer.save)
         except Exception as e:
             return Response(
                 {'error': str(e)},
@@ -107,7 +141,12 @@ class AlbumViewSet(viewsets.ModelViewSet):
         DELETE /albums/{id} - Eliminar álbum
         """
         album = self.get_object()
-        album.delete()
+        # Sus pistas pueden estar en cualquier shard: una transacción en cada base
+        with atomic_on_track_databases():
+            detach_album_tracks([album.pk])
+            album.delete()
+            # Los géneros del álbum dejan de contar para su artista
+            refresh_artist_genres([album.artist_id_id])
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(detail=True, methods=['get'])
@@ -125,12 +164,12 @@ class AlbumViewSet(viewsets.ModelViewSet):
         Búsqueda de álbumes por título o artista
         """
         query = request.query_params.get('q', '')
-        queryset = self.get_queryset()
+        queryset = self.filter_queryset(self.get_queryset())
 
         if query:
             queryset = queryset.filter(
                 Q(title__icontains=query) |
-                Q(artist__name__icontains=query)
+                Q(artist_id__name__icontains=query)
             )
 
         page = self.paginate_queryset(queryset)
@@ -142,4 +181,22 @@ class AlbumViewSet(viewsets.ModelViewSet):
         return Response({
             'items': serializer.data,
             'total': queryset.count()
-        })
\ No newline at end of file
+        })
+
+    @action(detail=False, methods=['get'])
+    def upcoming(self, request):
+        """
+        GET /albums/upcoming - Próximos lanzamientos (borradores con fecha futura)
+        """
+        albums = upcoming_albums().select_related('artist_id').prefetch_related('genres')
+
+        page = self.paginate_queryset(albums)
+        if page is not None:
+            serializer = AlbumSerializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
+
+        serializer = AlbumSerializer(albums, many=True)
+        return Response({
+            'items': serializer.data,
+            'total': albums.count()
+        })
@@ -1,10 +1,20 @@
-from django.db import models
-import uuid
+from django.db import connection, models, transaction
+from django.db.models import F, Func, Value
+from django.db.models.functions import Lower, Trim
+from django.utils import timezone
+from core.ids import CompactUUIDField, new_uuid
+
+
+def _json_path(key):
+    """Ruta JSON de SQLite para una clave de primer nivel"""
+    if '"' in key:
+        raise ValueError("El nombre de la red social no puede contener comillas")
+    return f'$."{key}"'
 
 
 class Artist(models.Model):
     # ID único
-    artist_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    artist_id = CompactUUIDField(primary_key=True, default=new_uuid, editable=False)
 
     # Campos básicos
     name = models.CharField(max_length=200, blank=False, null=False)
@@ -21,14 +31,16 @@ class Artist(models.Model):
         on_delete=models.SET_NULL,
         null=True,
         blank=True,
-        related_name='artists'
+        related_name='artists',
+        db_index=False
     )
     country = models.ForeignKey(
         "country.Country",
         on_delete=models.SET_NULL,
         null=True,
         blank=True,
-        related_name='artists'
+        related_name='artists',
+        db_index=False
     )
 
     # Redes sociales
@@ -50,27 +62,81 @@ class Artist(models.Model):
         verbose_name_plural = 'Artistas'
         indexes = [
             models.Index(fields=['name']),
-            models.Index(fields=['country']),
-            models.Index(fields=['label_id']),
+            # /countries/{id}/artists y /labels/{id}/artists ordenan por nombre
+            models.Index(fields=['country', 'name']),
+            models.Index(fields=['label_id', 'name']),
+        ]
+        constraints = [
+            # Clave normalizada: no puede haber dos artistas que solo difieran
+            # en mayúsculas o espacios al principio/final
+            models.UniqueConstraint(Lower(Trim('name')), name='artists_name_normalized_uniq'),
         ]
 
     def __str__(self):
         return self.name
 
     def add_social_media(self, social_media, url):
-        """Añadir una red social"""
+        """Añadir una red social (UPDATE atómico solo de la columna socials)"""
+        now = timezone.now()
+        queryset = Artist.objects.filter(pk=self.pk)
+
+        if connection.vendor == 'sqlite':
+            queryset.update(
+                socials=Func(
+                    F('socials'), Value(_json_path(social_media)), Value(url),
+                    function='JSON_SET', output_field=models.JSONField()
+                ),
+                updated_at=now,
+            )
+        else:
+            with transaction.atomic():
+                socials = queryset.select_for_update().values_list('socials', flat=True).get()
+                socials[social_media] = url
+                queryset.update(socials=socials, updated_at=now)
+
         self.socials[social_media] = url
-        self.save()
+        self.updated_at = now
+        self._publish_change()
 
     def get_social_media(self, social_media):
         """Obtener URL de una red social específica"""
         return self.socials.get(social_media)
 
     def remove_social_media(self, social_media):
-        """Eliminar una red social"""
-        if social_media in self.socials:
-            del self.socials[social_media]
-            self.save()
+        """Eliminar una red social; devuelve False si no existía"""
+        now = timezone.now()
+        queryset = Artist.objects.filter(pk=self.pk, socials__has_key=social_media)
+
+        if connection.vendor == 'sqlite':
+            removed = queryset.update(
+                socials=Func(
+                    F('socials'), Value(_json_path(social_media)),
+                    function='JSON_REMOVE', output_field=models.JSONField()
+                ),
+                updated_at=now,
+            )
+        else:
+            with transaction.atomic():
+                socials = queryset.select_for_update().values_list('socials', flat=True).first()
+                removed = 0
+                if socials is not None:
+                    socials.pop(social_media, None)
+                    removed = queryset.update(socials=socials, updated_at=now)
+
+        if removed:
+            self.socials.pop(social_media, None)
+            self.updated_at = now
+            self._publish_change()
+        return bool(removed)
+
+    def _publish_change(self):
+        """
+        Los UPDATE de socials no disparan post_save: se publica a mano en el
+        bus de invalidación para que las cachés de respuestas lo vean
+        """
+        # Importación diferida: core.invalidation importa este módulo
+        from core.invalidation import publish
+        publish(self._meta.label_lower, [self.pk])
 
     @property
     def public_social_media(self):
@@ -90,4 +156,28 @@ class Artist(models.Model):
     @property
     def is_signed(self):
         """Verifica si el artista está firmado con un sello"""
-        return self.label_id is not None
\ No newline at end of file
+        return self.label_id is not None
+
+class ArtistGenre(models.Model):
+    """
+    Géneros de cada artista (de sus pistas y de sus álbumes) con su peso.
+    Es una tabla derivada: la mantiene ``core.aggregates.refresh_artist_genres``
+    y ``manage.py rebuild_artist_genres`` la reconstruye.
+    """
+    artist = models.ForeignKey(Artist, on_delete=models.CASCADE, related_name='genre_links', db_index=False)
+    genre = models.ForeignKey('genre.Genre', on_delete=models.CASCADE, related_name='artist_links', db_index=False)
+    track_count = models.PositiveIntegerField(default=0)
+    album_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        db_table = 'artist_genre'
+        constraints = [
+            models.UniqueConstraint(fields=['artist', 'genre'], name='artist_genre_artist_genre_uniq'),
+        ]
+        indexes = [
+            # Filtro ?genre= de /artists: EXISTS por (genre, artist)
+            models.Index(fields=['genre', 'artist']),
+        ]
+
+    def __str__(self):
+        return f'{self.artist_id} - {self.genre_id}'
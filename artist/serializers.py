@@ -1,4 +1,10 @@
 from rest_framework import serializers
+from core.dictionaries import country_data
+from core.relations import BatchedPrimaryKeyRelatedField, BatchedRelationsMixin
+from core.updates import save_changed_fields
+from country.models import Country
+from record_label.models import RecordLabel
+from record_label.serializers import RecordLabelSerializer
 from .models import Artist
 
 
@@ -27,23 +33,26 @@ class ArtistSerializer(serializers.ModelSerializer):
         read_only_fields = ['artist_id', 'created_at', 'updated_at']
 
     def get_label(self, obj):
-        """Importación diferida para label"""
         if obj.label_id:
-            from record_label.serializers import RecordLabelSerializer
             return RecordLabelSerializer(obj.label_id).data
         return None
 
     def get_country(self, obj):
-        """Importación diferida para country"""
-        if obj.country:
-            from country.serializers import CountrySerializer
-            return CountrySerializer(obj.country).data
+        """País desde la copia en memoria de las tablas diccionario (sin consultas)"""
+        if obj.country_id:
+            return country_data(obj.country_id)
         return None
 
 
-class ArtistCreateSerializer(serializers.ModelSerializer):
-    label_id = serializers.UUIDField(required=False, allow_null=True)
-    country_id = serializers.UUIDField(required=False, allow_null=True)
+class ArtistCreateSerializer(BatchedRelationsMixin, serializers.ModelSerializer):
+    label_id = BatchedPrimaryKeyRelatedField(
+        queryset=RecordLabel.objects.all(), required=False, allow_null=True,
+        error_messages={'does_not_exist': 'Sello discográfico no encontrado'}
+    )
+    country_id = BatchedPrimaryKeyRelatedField(
+        source='country', queryset=Country.objects.all(), required=False, allow_null=True,
+        error_messages={'does_not_exist': 'País no encontrado'}
+    )
 
     class Meta:
         model = Artist
@@ -65,39 +74,20 @@ class ArtistCreateSerializer(serializers.ModelSerializer):
         return value
 
     def create(self, validated_data):
-        # Extraer IDs de relaciones
-        label_id = validated_data.pop('label_id', None)
-        country_id = validated_data.pop('country_id', None)
-
-        # Obtener instancias de relaciones
-        if label_id:
-            try:
-                from record_label.models import RecordLabel
-                label = RecordLabel.objects.get(id=label_id)
-                validated_data['label_id'] = label
-            except RecordLabel.DoesNotExist:
-                raise serializers.ValidationError({"label_id": "Sello discográfico no encontrado"})
-        else:
-            validated_data['label_id'] = None
-
-        if country_id:
-            try:
-                from country.models import Country
-                country = Country.objects.get(id=country_id)
-                validated_data['country'] = country
-            except Country.DoesNotExist:
-                raise serializers.ValidationError({"country_id": "País no encontrado"})
-        else:
-            validated_data['country'] = None
-
-        # Crear el artista
+        # Sello y país ya vienen resueltos como instancias
         artist = Artist.objects.create(**validated_data)
         return artist
 
 
-class ArtistUpdateSerializer(serializers.ModelSerializer):
-    label_id = serializers.UUIDField(required=False, allow_null=True)
-    country_id = serializers.UUIDField(required=False, allow_null=True)
+class ArtistUpdateSerializer(BatchedRelationsMixin, serializers.ModelSerializer):
+    label_id = BatchedPrimaryKeyRelatedField(
+        queryset=RecordLabel.objects.all(), required=False, allow_null=True,
+        error_messages={'does_not_exist': 'Sello discográfico no encontrado'}
+    )
+    country_id = BatchedPrimaryKeyRelatedField(
+        source='country', queryset=Country.objects.all(), required=False, allow_null=True,
+        error_messages={'does_not_exist': 'País no encontrado'}
+    )
 
     class Meta:
         model = Artist
@@ -116,35 +106,6 @@ class ArtistUpdateSerializer(serializers.ModelSerializer):
         return value
 
     def update(self, instance, validated_data):
-        # Manejar actualización de relaciones
-        label_id = validated_data.pop('label_id', None)
-        country_id = validated_data.pop('country_id', None)
-
-        if label_id is not None:
-            if label_id:
-                try:
-                    from record_label.models import RecordLabel
-                    label = RecordLabel.objects.get(id=label_id)
-                    instance.label_id = label
-                except RecordLabel.DoesNotExist:
-                    raise serializers.ValidationError({"label_id": "Sello discográfico no encontrado"})
-            else:
-                instance.label_id = None
-
-        if country_id is not None:
-            if country_id:
-                try:
-                    from country.models import Country
-                    country = Country.objects.get(id=country_id)
-                    instance.country = country
-                except Country.DoesNotExist:
-                    raise serializers.ValidationError({"country_id": "País no encontrado"})
-            else:
-                instance.country = None
-
-        # Actualizar los demás campos
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
-
-        instance.save()
-        return instance
\ No newline at end of file
+        # Las relaciones ya vienen resueltas como instancias (o None para quitarlas)
+        save_changed_fields(instance, validated_data)
+        return instance
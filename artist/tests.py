@@ -0,0 +1,74 @@
+from io import StringIO
+
+from django.core.management import call_command
+from rest_framework.test import APIClient
+
+from artist.models import Artist, ArtistGenre
+from core import coalescing
+from core.models import InvalidationEvent
+from core.testing import BASE, CatalogTestCase
+
+
+class ArtistGenreFilterTests(CatalogTestCase):
+    def test_artist_genre_filter_uses_maintained_links(self):
+        client = APIClient()
+        other = Artist.objects.create(name='Otra')
+        client.post(BASE + 'tracks/', {
+            'artist_id': str(other.pk), 'title': 'Suya', 'audio_master_url': 'https://example.com/o.mp3',
+            'genres': [str(self.subgenre.pk)],
+        }, format='json')
+        # Los datos de setUpTestData se crearon con el ORM: se reconstruye la tabla
+        call_command('rebuild_artist_genres', stdout=StringIO())
+        links = ArtistGenre.objects.filter(artist=self.artist).values_list('genre__name', 'track_count', 'album_count')
+        self.assertEqual(sorted(links), [('Indie', 1, 0), ('Rock', 0, 1)])
+
+        def names(query):
+            return [item['name'] for item in client.get(BASE + f'artists/?{query}').json()['items']]
+
+        self.assertEqual(names('genre=rock'), ['Artista'])
+        self.assertEqual(names(f'genre={self.subgenre.pk}'), ['Artista', 'Otra'])
+        self.assertEqual(names('genre=Rock&include_subgenres=true'), ['Artista', 'Otra'])
+        self.assertEqual(names('genre=roc'), [])
+
+        client.patch(BASE + f'albums/{self.album.pk}/', {'genres': []}, format='json')
+        self.assertEqual(names('genre=Rock'), [])
+
+
+class ArtistUniquenessTests(CatalogTestCase):
+    def test_normalized_duplicate_names_are_conflicts(self):
+        client = APIClient()
+        response = client.post(BASE + 'artists/', {'name': '  ARTISTA '}, format='json')
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json(), {'error': 'Ya existe un artista con este nombre'})
+        self.assertEqual(Artist.objects.count(), 1)
+
+        other = Artist.objects.create(name='Otra')
+        response = client.patch(BASE + f'artists/{other.pk}/', {'name': 'artista'}, format='json')
+        self.assertEqual(response.status_code, 409)
+        other.refresh_from_db()
+        self.assertEqual(other.name, 'Otra')
+
+
+class ArtistSocialsTests(CatalogTestCase):
+    def test_social_updates_invalidate_cached_responses(self):
+        # add_social/remove_social escriben con UPDATE, sin post_save
+        coalescing.cache.clear()
+        self.addCleanup(coalescing.cache.clear)
+        client = APIClient()
+        url = BASE + f'artists/{self.artist.pk}/'
+        with self.settings(RESPONSE_CACHE={'ENABLED': True, 'TTL': 60}):
+            self.assertEqual(client.get(url).json()['socials'], {})
+            with self.captureOnCommitCallbacks(execute=True):
+                response = client.post(
+                    url + 'add_social/', {'platform': 'twitter', 'url': 'https://x.com/a'}, format='json'
+                )
+            self.assertEqual(response.status_code, 200, response.content)
+            self.assertEqual(client.get(url).json()['socials'], {'twitter': 'https://x.com/a'})
+
+            with self.captureOnCommitCallbacks(execute=True):
+                response = client.delete(url + 'remove_social/?platform=twitter')
+            self.assertEqual(response.status_code, 200, response.content)
+            self.assertEqual(client.get(url).json()['socials'], {})
+        self.assertEqual(
+            InvalidationEvent.objects.filter(model='artist.artist', object_pk=str(self.artist.pk)).count(), 2
+        )
@@ -1,10 +1,14 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import ArtistViewSet
+from .views import ArtistAlbumsAsyncView, ArtistAsyncDetailView, ArtistTracksAsyncView, ArtistViewSet
 
 router = DefaultRouter()
 router.register(r'artists', ArtistViewSet, basename='artist')
 
 urlpatterns = [
     path('', include(router.urls)),
+    # Lecturas asíncronas (ASGI)
+    path('async/artists/<uuid:pk>/', ArtistAsyncDetailView.as_view(), name='artist-async-detail'),
+    path('async/artists/<uuid:pk>/albums/', ArtistAlbumsAsyncView.as_view(), name='artist-async-albums'),
+    path('async/artists/<uuid:pk>/tracks/', ArtistTracksAsyncView.as_view(), name='artist-async-tracks'),
 ]
\ No newline at end of file
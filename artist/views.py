@@ -1,9 +1,22 @@
+import uuid
+
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
-from django.db.models import Q
-from .models import Artist
+from django.db import IntegrityError
+from django.db.models import Exists, OuterRef, Q
+from core.async_views import AsyncDetailView, AsyncRelatedListView
+from core.coalescing import CoalescedReadMixin
+from core.dictionaries import snapshot
+from core.filters import AllowlistedOrderingFilter
+from core.genre_tree import expand, wants_subgenres
+from core.sharding import sharded_tracks, sharding_enabled
+from core.updates import is_unique_violation
+from core.write_queue import run_write
+from album.serializers import AlbumSerializer
+from track.serializers import TrackSerializer
+from .models import Artist, ArtistGenre
 from .serializers import (
     ArtistSerializer,
     ArtistCreateSerializer,
@@ -11,9 +24,15 @@ from .serializers import (
 )
 
 
-class ArtistViewSet(viewsets.ModelViewSet):
-    queryset = Artist.objects.select_related('label_id', 'country').prefetch_related('albums', 'tracks')
+class ArtistViewSet(CoalescedReadMixin, viewsets.ModelViewSet):
+    # El país anidado sale de la copia en memoria de los diccionarios: sin JOIN con countries
+    queryset = Artist.objects.select_related('label_id').prefetch_related('albums', 'tracks')
     serializer_class = ArtistSerializer
+    filter_backends = [AllowlistedOrderingFilter]
+    ordering_allowlist = {
+        'name': ('name',),
+        '-name': ('-name',),
+    }
 
     def get_serializer_class(self):
         if self.action == 'create':
@@ -30,11 +49,18 @@ class ArtistViewSet(viewsets.ModelViewSet):
         query = self.request.query_params.get('query')
 
         if genre:
-            # Filtrar artistas por género de sus pistas
+            # Género exacto por id o por nombre (copia en memoria de los
+            # géneros); con include_subgenres también sus subgéneros. Un EXISTS
+            # sobre artist_genre (índice genre, artist) conservando el orden por nombre
+            genres = snapshot()
+            try:
+                match = genres.genres.get(uuid.UUID(genre))
+            except ValueError:
+                match = genres.genres_by_name.get(genre.lower())
+            genre_ids = expand([match.pk] if match else [], wants_subgenres(self.request))
             queryset = queryset.filter(
-                Q(tracks__genres__name__icontains=genre) |
-                Q(albums__genres__name__icontains=genre)
-            ).distinct()
+                Exists(ArtistGenre.objects.filter(artist=OuterRef('pk'), genre__in=genre_ids))
+            )
 
         if query:
             queryset = queryset.filter(
@@ -70,20 +96,24 @@ class ArtistViewSet(viewsets.ModelViewSet):
         serializer.is_valid(raise_exception=True)
 
         try:
-            artist = serializer.save()
+            artist = run_write(serializer.save)
+        except IntegrityError as e:
+            if not is_unique_violation(e):
+                return Response(
+                    {'error': str(e)},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            # La restricción UNIQUE de la base de datos detecta el duplicado
+            return Response(
+                {'error': 'Ya existe un artista con este nombre'},
+                status=status.HTTP_409_CONFLICT
+            )
         except Exception as e:
             return Response(
                 {'error': str(e)},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Verificar duplicados (puedes personalizar esta lógica)
-        if Artist.objects.filter(name=artist.name).count() > 1:
-            return Response(
-                {'error': 'Ya existe un artista con este nombre'},
-                status=status.HTTP_409_CONFLICT
-            )
-
         read_serializer = ArtistSerializer(artist)
         return Response(read_serializer.data, status=status.HTTP_201_CREATED)
 
@@ -104,7 +134,18 @@ class ArtistViewSet(viewsets.ModelViewSet):
         serializer.is_valid(raise_exception=True)
 
         try:
-            artist = serializer.save()
+            artist = run_write(serializer.save)
+        except IntegrityError as e:
+            if not is_unique_violation(e):
+                return Response(
+                    {'error': str(e)},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            # La restricción UNIQUE de la base de datos detecta el duplicado
+            return Response(
+                {'error': 'Ya existe un artista con este nombre'},
+                status=status.HTTP_409_CONFLICT
+            )
         except Exception as e:
             return Response(
                 {'error': str(e)},
@@ -137,7 +178,13 @@ class ArtistViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        artist.add_social_media(social_media, url)
+        try:
+            run_write(lambda: artist.add_social_media(social_media, url))
+        except ValueError as e:
+            return Response(
+                {'error': str(e)},
+                status=status.HTTP_400_BAD_REQUEST
+            )
         serializer = self.get_serializer(artist)
         return Response(serializer.data)
 
@@ -155,13 +202,13 @@ class ArtistViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        if platform not in artist.socials:
+        # Un único UPDATE que solo afecta a la fila si la red social existe
+        if not run_write(lambda: artist.remove_social_media(platform)):
             return Response(
                 {'error': 'Red social no encontrada'},
                 status=status.HTTP_404_NOT_FOUND
             )
 
-        artist.remove_social_media(platform)
         serializer = self.get_serializer(artist)
         return Response(serializer.data)
 
@@ -171,8 +218,7 @@ class ArtistViewSet(viewsets.ModelViewSet):
         GET /artists/{artist_id}/albums - Obtener álbumes del artista
         """
         artist = self.get_object()
-        from album.serializers import AlbumSerializer
-        albums = artist.albums.all()
+        albums = artist.albums.published().prefetch_related('genres')
 
         page = self.paginate_queryset(albums)
         if page is not None:
@@ -191,8 +237,12 @@ class ArtistViewSet(viewsets.ModelViewSet):
         GET /artists/{artist_id}/tracks - Obtener pistas del artista
         """
         artist = self.get_object()
-        from track.serializers import TrackSerializer
-        tracks = artist.tracks.all()
+        tracks = artist.tracks.published().select_related('artist_id', 'album_id').prefetch_related(
+            'genres', 'album_id__genres'
+        )
+        if sharding_enabled():
+            # Géneros desde el shard del artista, sin JOIN con default
+            tracks = sharded_tracks(tracks, artist_id=artist.pk)
 
         page = self.paginate_queryset(tracks)
         if page is not None:
@@ -203,4 +253,54 @@ class ArtistViewSet(viewsets.ModelViewSet):
         return Response({
             'items': serializer.data,
             'total': tracks.count()
-        })
\ No newline at end of file
+        })
+
+
+class ArtistAsyncDetailView(AsyncDetailView):
+    """
+    GET /async/artists/{artist_id} - Detalle de un artista (ASGI)
+    """
+    model = Artist
+    serializer_class = ArtistSerializer
+    not_found_message = 'Artista no encontrado'
+
+    def get_queryset(self):
+        return ArtistViewSet.queryset.all()
+
+
+class ArtistAlbumsAsyncView(AsyncRelatedListView):
+    """
+    GET /async/artists/{artist_id}/albums - Álbumes del artista (ASGI)
+    """
+    model = Artist
+    related_name = 'albums'
+    published_only = True
+    prefetch_related = ('genres',)
+    serializer_class = 'album.serializers.AlbumSerializer'
+    not_found_message = 'Artista no encontrado'
+
+    def get_queryset(self):
+        return ArtistViewSet.queryset.all()
+
+
+class ArtistTracksAsyncView(AsyncRelatedListView):
+    """
+    GET /async/artists/{artist_id}/tracks - Pistas del artista (ASGI)
+    """
+    model = Artist
+    related_name = 'tracks'
+    published_only = True
+    select_related = ('artist_id', 'album_id')
+    prefetch_related = ('genres', 'album_id__genres')
+    serializer_class = 'track.serializers.TrackSerializer'
+    not_found_message = 'Artista no encontrado'
+
+    def get_queryset(self):
+        return ArtistViewSet.queryset.all()
+
+    def get_related_queryset(self, parent):
+        tracks = super().get_related_queryset(parent)
+        if sharding_enabled():
+            # Solo el shard del artista, como la acción síncrona
+            return sharded_tracks(tracks, artist_id=parent.pk)
+        return tracks
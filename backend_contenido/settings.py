@@ -13,6 +13,8 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 from pathlib import Path
 import os
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -57,8 +59,39 @@ MIDDLEWARE = [
     "django.contrib.auth.middleware.AuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
+    "core.replicas.ReplicaRoutingMiddleware",
+    "core.invalidation.InvalidationMiddleware",
 ]
 
+# Papel del despliegue: "full" (por defecto) o "api". Con "api" solo se sirve
+# la API JSON: no se cargan el admin, las sesiones, los mensajes, los estáticos
+# ni la API navegable, que alargan el arranque de cada worker
+DEPLOYMENT_ROLE = os.environ.get("DEPLOYMENT_ROLE", "full")
+if DEPLOYMENT_ROLE not in ("full", "api"):
+    raise ImproperlyConfigured(f"DEPLOYMENT_ROLE desconocido: {DEPLOYMENT_ROLE}")
+
+REST_FRAMEWORK = {}
+
+if DEPLOYMENT_ROLE == "api":
+    INSTALLED_APPS = [
+        app for app in INSTALLED_APPS
+        if app not in (
+            "django.contrib.admin",
+            "django.contrib.sessions",
+            "django.contrib.messages",
+            "django.contrib.staticfiles",
+        )
+    ]
+    MIDDLEWARE = [
+        middleware for middleware in MIDDLEWARE
+        if middleware not in (
+            "django.contrib.sessions.middleware.SessionMiddleware",
+            "django.contrib.auth.middleware.AuthenticationMiddleware",
+            "django.contrib.messages.middleware.MessageMiddleware",
+        )
+    ]
+    REST_FRAMEWORK["DEFAULT_RENDERER_CLASSES"] = ["rest_framework.renderers.JSONRenderer"]
+
 ROOT_URLCONF = "backend_contenido.urls"
 
 TEMPLATES = [
@@ -83,13 +116,98 @@ WSGI_APPLICATION = "backend_contenido.wsgi.application"
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Perfil de PRAGMAS de SQLite (ver core/sqlite.py): "production" (WAL, mmap,
+# busy_timeout...) o "default" (valores de fábrica de SQLite)
+SQLITE_PROFILE = os.environ.get("SQLITE_PROFILE", "production")
+
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        # Conexiones persistentes (segundos); 0 cierra la conexión en cada petición
+        "CONN_MAX_AGE": int(os.environ.get("DB_CONN_MAX_AGE", 600)),
+        "CONN_HEALTH_CHECKS": True,
+        "PRAGMAS": SQLITE_PROFILE,
     }
 }
 
+# Réplicas de solo lectura (ver core/replicas.py): rutas separadas por comas
+# en DB_REPLICAS. Se sincronizan con "manage.py sync_replicas".
+DATABASE_REPLICAS = []
+for _index, _path in enumerate(filter(None, os.environ.get("DB_REPLICAS", "").split(",")), start=1):
+    DATABASE_REPLICAS.append(f"replica_{_index}")
+    DATABASES[f"replica_{_index}"] = {
+        **DATABASES["default"],
+        "NAME": _path.strip(),
+        "READ_ONLY": True,
+        "TEST": {"MIRROR": "default"},
+    }
+
+# Sharding de pistas por artista (ver core/sharding.py): rutas separadas por
+# comas en DB_TRACK_SHARDS. DB_TRACK_SHARDS_RETIRED son shards que ya no
+# reciben tráfico y se vacían con "manage.py reshard_tracks".
+TRACK_SHARDS = []
+TRACK_SHARDS_RETIRED = []
+for _aliases, _prefix, _variable in (
+    (TRACK_SHARDS, "track_shard", "DB_TRACK_SHARDS"),
+    (TRACK_SHARDS_RETIRED, "track_shard_retired", "DB_TRACK_SHARDS_RETIRED"),
+):
+    for _index, _path in enumerate(filter(None, os.environ.get(_variable, "").split(",")), start=1):
+        _aliases.append(f"{_prefix}_{_index}")
+        DATABASES[f"{_prefix}_{_index}"] = {
+            **DATABASES["default"],
+            "NAME": _path.strip(),
+            "SHARD": True,
+        }
+
+DATABASE_ROUTERS = ["core.sharding.TrackShardRouter", "core.replicas.ReplicaRouter"]
+
+# Segundos que un cliente sigue leyendo del primario tras escribir
+REPLICA_PIN_SECONDS = int(os.environ.get("REPLICA_PIN_SECONDS", 5))
+
+# Cola de escritura con un único escritor (ver core/write_queue.py)
+WRITE_QUEUE = {
+    "ENABLED": os.environ.get("WRITE_QUEUE_ENABLED", "").lower() in ("1", "true", "yes"),
+    "MAX_BATCH": int(os.environ.get("WRITE_QUEUE_MAX_BATCH", 64)),
+    "MAX_DELAY_MS": float(os.environ.get("WRITE_QUEUE_MAX_DELAY_MS", 0)),
+}
+
+# Bus de invalidación entre procesos (ver core/invalidation.py): cada cuántos
+# segundos lee un proceso los eventos nuevos y cuántos se guardan
+INVALIDATION_POLL_INTERVAL = float(os.environ.get("INVALIDATION_POLL_INTERVAL", 0.5))
+INVALIDATION_RETENTION = int(os.environ.get("INVALIDATION_RETENTION", 3600))
+# Comprobación de respaldo de la versión de países y géneros (core/dictionaries.py)
+DICTIONARY_CHECK_INTERVAL = float(os.environ.get("DICTIONARY_CHECK_INTERVAL", 30))
+# Vigencia de los contadores de artistas y sellos por país, que no versionan la copia
+COUNTRY_COUNTS_INTERVAL = float(os.environ.get("COUNTRY_COUNTS_INTERVAL", 30))
+
+# Lecturas coalescidas y caché de respuestas en memoria (ver core/coalescing.py):
+# segundos de vigencia, de servicio caducado mientras se recalcula y de espera
+# máxima a un cálculo en curso
+RESPONSE_CACHE = {
+    "ENABLED": os.environ.get("RESPONSE_CACHE_ENABLED", "").lower() in ("1", "true", "yes"),
+    "COALESCE": os.environ.get("RESPONSE_COALESCE", "true").lower() in ("1", "true", "yes"),
+    "TTL": float(os.environ.get("RESPONSE_CACHE_TTL", 5)),
+    "STALE_TTL": float(os.environ.get("RESPONSE_CACHE_STALE_TTL", 30)),
+    "WAIT_TIMEOUT": float(os.environ.get("RESPONSE_CACHE_WAIT_TIMEOUT", 5)),
+    "MAX_ENTRIES": int(os.environ.get("RESPONSE_CACHE_MAX_ENTRIES", 1000)),
+}
+
+# Calentamiento al arrancar (ver core/warmup.py): WARMUP_ON_START lo ejecuta al
+# cargar wsgi.py/asgi.py; WARMUP_PATHS son las rutas que se piden por adelantado,
+# separadas por comas
+WARMUP = {
+    "ON_START": os.environ.get("WARMUP_ON_START", "").lower() in ("1", "true", "yes"),
+    "PATHS": [_path.strip() for _path in os.environ.get("WARMUP_PATHS", "").split(",") if _path.strip()],
+}
+
+
+# Claves primarias UUID (ver core/ids.py): "uuid7" (ordenadas por tiempo) o
+# "uuid4" para las filas nuevas; almacenamiento "text" (32 caracteres) o
+# "binary" (BLOB de 16 bytes, tras "manage.py convert_primary_keys --to binary")
+PRIMARY_KEY_SCHEME = os.environ.get("PRIMARY_KEY_SCHEME", "uuid7")
+PRIMARY_KEY_STORAGE = os.environ.get("PRIMARY_KEY_STORAGE", "text")
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -0,0 +1,152 @@
+"""
+Totales de álbum guardados en la propia fila (``track_count``,
+``total_duration_sec`` y ``genre_ids``).
+
+Cada escritura de pistas (altas, bajas, cambios de álbum, de duración o de
+géneros, también las masivas) llama a ``refresh_album_aggregates`` con los
+álbumes afectados. Los totales se recalculan desde la tabla de pistas con
+una consulta agrupada por lote de álbumes, no con sumas incrementales: el
+resultado es exacto aunque la misma pista se procese dos veces. Sin
+sharding se ejecuta en la misma transacción que la escritura de la pista.
+
+``manage.py check_album_aggregates [--repair]`` compara los valores
+guardados con los recalculados y corrige las diferencias.
+
+La tabla ``artist_genre`` (géneros de cada artista con el número de pistas
+y de álbumes que los llevan) se mantiene igual: ``refresh_artist_genres``
+rehace las filas de los artistas afectados cuando cambian los géneros de
+sus pistas o álbumes, o el artista de una pista o de un álbum; las
+escrituras de pistas le pasan los géneros que tocaron y solo se rehacen esos
+pares.
+``manage.py rebuild_artist_genres`` la reconstruye entera.
+"""
+from collections import defaultdict
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Count, Sum
+
+from album.models import Album, AlbumGenre
+from artist.models import ArtistGenre
+from track.models import Track, TrackGenre
+
+from .sharding import IN_BATCH_SIZE, get_retired_shards, get_shards
+
+AGGREGATE_FIELDS = ['track_count', 'total_duration_sec', 'genre_ids']
+
+
+def _chunks(values, size=IN_BATCH_SIZE):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def compute_album_aggregates(album_ids):
+    """{album_id: {campo: valor}} a partir de las pistas de todas las bases"""
+    totals = {pk: {'track_count': 0, 'total_duration_sec': 0} for pk in album_ids}
+    genres = defaultdict(set)
+    for alias in [DEFAULT_DB_ALIAS] + get_shards() + get_retired_shards():
+        for chunk in _chunks(totals):
+            rows = Track.objects.using(alias).filter(album_id__in=chunk).order_by().values(
+                'album_id'
+            ).annotate(count=Count('pk'), duration=Sum('duration_sec'))
+            for row in rows:
+                totals[row['album_id']]['track_count'] += row['count']
+                totals[row['album_id']]['total_duration_sec'] += row['duration'] or 0
+            links = TrackGenre.objects.using(alias).filter(track__album_id__in=chunk).values_list(
+                'track__album_id', 'genre_id'
+            ).distinct()
+            for album_pk, genre_pk in links:
+                genres[album_pk].add(str(genre_pk))
+    for pk, values in totals.items():
+        values['genre_ids'] = sorted(genres[pk])
+    return totals
+
+
+def refresh_album_aggregates(album_ids):
+    """
+    Recalcula y guarda los totales de los álbumes indicados (se ignoran los
+    None); devuelve los valores guardados, ``{album_id: {campo: valor}}``
+    """
+    album_ids = {pk for pk in album_ids if pk is not None}
+    if not album_ids:
+        return {}
+    totals = compute_album_aggregates(album_ids)
+    albums = [Album(pk=pk, **values) for pk, values in totals.items()]
+    # Sin updated_at: los totales son derivados, no una edición del álbum
+    Album.objects.bulk_update(albums, AGGREGATE_FIELDS, batch_size=IN_BATCH_SIZE // 4)
+    return totals
+
+
+def compute_artist_genres(artist_ids, genre_ids=None):
+    """
+    {artist_id: {genre_id: [pistas, álbumes]}} desde las pistas de todas las
+    bases y los álbumes; con ``genre_ids`` solo cuenta esos géneros
+    """
+    weights = {pk: defaultdict(lambda: [0, 0]) for pk in artist_ids}
+    # Con géneros la consulta lleva dos listas IN: cada una con la mitad de parámetros
+    size = IN_BATCH_SIZE if genre_ids is None else IN_BATCH_SIZE // 2
+    only = {} if genre_ids is None else {'genre_id__in': list(genre_ids)}
+    for alias in [DEFAULT_DB_ALIAS] + get_shards() + get_retired_shards():
+        for chunk in _chunks(weights, size):
+            rows = TrackGenre.objects.using(alias).filter(track__artist_id__in=chunk, **only).values_list(
+                'track__artist_id', 'genre_id'
+            ).annotate(count=Count('pk')).order_by()
+            for artist_pk, genre_pk, count in rows:
+                weights[artist_pk][genre_pk][0] += count
+    for chunk in _chunks(weights, size):
+        rows = AlbumGenre.objects.filter(album__artist_id__in=chunk, **only).values_list(
+            'album__artist_id', 'genre_id'
+        ).annotate(count=Count('pk')).order_by()
+        for artist_pk, genre_pk, count in rows:
+            weights[artist_pk][genre_pk][1] += count
+    return weights
+
+
+def refresh_artist_genres(artist_ids, genre_ids=None):
+    """
+    Rehace las filas de ``artist_genre`` de los artistas indicados (se ignoran
+    los None). Con ``genre_ids`` (los géneros que tocó la escritura) solo se
+    recalculan, actualizan, insertan o borran los pares de esos géneros.
+    """
+    artist_ids = {pk for pk in artist_ids if pk is not None}
+    if genre_ids is not None:
+        genre_ids = set(genre_ids)
+        if len(genre_ids) > IN_BATCH_SIZE // 2:
+            # Demasiados para filtrar: sale más barato rehacer los artistas
+            genre_ids = None
+    if not artist_ids or genre_ids == set():
+        return 0
+    weights = compute_artist_genres(artist_ids, genre_ids)
+    if genre_ids is None:
+        rows = [
+            ArtistGenre(artist_id=artist_pk, genre_id=genre_pk, track_count=tracks, album_count=albums)
+            for artist_pk, genres in weights.items()
+            for genre_pk, (tracks, albums) in genres.items()
+        ]
+        with transaction.atomic():
+            for chunk in _chunks(artist_ids):
+                ArtistGenre.objects.filter(artist_id__in=chunk).delete()
+            ArtistGenre.objects.bulk_create(rows, batch_size=IN_BATCH_SIZE // 4)
+        return len(rows)
+
+    with transaction.atomic():
+        changed, stale = [], []
+        for chunk in _chunks(artist_ids, IN_BATCH_SIZE // 2):
+            for row in ArtistGenre.objects.filter(artist_id__in=chunk, genre_id__in=genre_ids):
+                counts = weights[row.artist_id].pop(row.genre_id, None)
+                if counts is None:
+                    stale.append(row.pk)
+                elif [row.track_count, row.album_count] != counts:
+                    row.track_count, row.album_count = counts
+                    changed.append(row)
+        # Lo que queda en weights son pares nuevos
+        rows = [
+            ArtistGenre(artist_id=artist_pk, genre_id=genre_pk, track_count=tracks, album_count=albums)
+            for artist_pk, genres in weights.items()
+            for genre_pk, (tracks, albums) in genres.items()
+        ]
+        for chunk in _chunks(stale):
+            ArtistGenre.objects.filter(pk__in=chunk).delete()
+        ArtistGenre.objects.bulk_update(changed, ['track_count', 'album_count'], batch_size=IN_BATCH_SIZE // 4)
+        ArtistGenre.objects.bulk_create(rows, batch_size=IN_BATCH_SIZE // 4)
+    return len(changed) + len(rows) + len(stale)
@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class CoreConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'core'
+
+    def ready(self):
+        from . import coalescing, dictionaries, invalidation, read_model, sharding, sqlite
+        sqlite.connect_signals()
+        invalidation.connect_signals()
+        dictionaries.connect_signals()
+        read_model.connect_signals()
+        sharding.connect_signals()
+        coalescing.connect_signals()
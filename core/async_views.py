@@ -0,0 +1,104 @@
+"""
+Vistas de lectura asíncronas para ASGI.
+
+DRF no admite vistas ``async``, así que estas vistas son ``View`` de Django
+con ``async def get``. Las consultas usan el ORM asíncrono (``aget``,
+``aexists``, ``aiterator``), que en Django 5.0 ejecuta cada consulta en el
+hilo de la conexión (``sync_to_async``): no hay paralelismo entre ellas, así
+que se lanzan una tras otra. La ventaja frente a WSGI es que el worker no se
+bloquea mientras espera. Los listados cargan las mismas relaciones que las
+acciones síncronas (``select_related``/``prefetch_related``) para no hacer
+una consulta por fila al serializar. La serialización reutiliza los
+serializers de DRF, que pueden leer campos calculados de la base de datos,
+por lo que se ejecuta con ``sync_to_async``.
+
+Las respuestas tienen el mismo formato que las acciones síncronas
+equivalentes de los viewsets.
+"""
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.utils.module_loading import import_string
+from django.views import View
+
+from .sharding import ShardedQuerySet
+
+ITERATOR_CHUNK_SIZE = 500
+
+
+async def alist(queryset):
+    """Materializa un queryset con ``aiterator``"""
+    if isinstance(queryset, ShardedQuerySet):
+        # Pistas repartidas entre shards: no tiene API asíncrona
+        return await sync_to_async(list)(queryset)
+    return [obj async for obj in queryset.aiterator(chunk_size=ITERATOR_CHUNK_SIZE)]
+
+
+async def aserialize(serializer_class, instance, many=False):
+    return await sync_to_async(lambda: serializer_class(instance, many=many).data)()
+
+
+class AsyncReadView(View):
+    """Base: resuelve el serializer (ruta importable) y los 404"""
+    model = None
+    serializer_class = None
+    not_found_message = 'No encontrado'
+
+    def get_serializer_class(self):
+        if isinstance(self.serializer_class, str):
+            # Ruta importable para evitar importaciones circulares entre apps
+            return import_string(self.serializer_class)
+        return self.serializer_class
+
+    def get_queryset(self):
+        return self.model.objects.all()
+
+    def not_found(self):
+        return JsonResponse({'error': self.not_found_message}, status=404)
+
+
+class AsyncDetailView(AsyncReadView):
+    """GET /<recurso>/{pk} con ``aget``"""
+
+    async def get(self, request, pk):
+        try:
+            instance = await self.get_queryset().aget(pk=pk)
+        except self.model.DoesNotExist:
+            return self.not_found()
+        data = await aserialize(self.get_serializer_class(), instance)
+        return JsonResponse(data)
+
+
+class AsyncRelatedListView(AsyncReadView):
+    """
+    GET /<recurso>/{pk}/<subrecurso>: lee el padre (con el queryset del
+    viewset, como ``get_object``) y después la lista por su relación inversa,
+    de modo que cada fila apunta al mismo objeto padre ya cargado.
+    """
+    # Relación inversa en el padre (p. ej. 'albums')
+    related_name = None
+    # Solo lo publicado (listados públicos)
+    published_only = False
+    # Relaciones que lee el serializer (las mismas que la acción síncrona)
+    select_related = ()
+    prefetch_related = ()
+
+    def get_related_queryset(self, parent):
+        queryset = getattr(parent, self.related_name).all()
+        if self.published_only:
+            queryset = queryset.published()
+        if self.select_related:
+            queryset = queryset.select_related(*self.select_related)
+        if self.prefetch_related:
+            queryset = queryset.prefetch_related(*self.prefetch_related)
+        return queryset
+
+    async def get(self, request, pk):
+        try:
+            parent = await self.get_queryset().aget(pk=pk)
+        except self.model.DoesNotExist:
+            return self.not_found()
+
+        # Sin paginación: el total es la longitud de la lista, sin otro COUNT
+        items = await alist(self.get_related_queryset(parent))
+        data = await aserialize(self.get_serializer_class(), items, many=True)
+        return JsonResponse({'items': data, 'total': len(items)})
@@ -0,0 +1,249 @@
+"""
+Exportación del catálogo en streaming.
+
+Las filas se leen con ``values()`` + ``iterator(chunk_size=...)`` (las
+columnas relacionadas se obtienen con JOIN en la misma consulta) y los
+géneros se resuelven con una consulta por bloque, de modo que la memoria
+usada no depende del tamaño del catálogo.
+
+Con sharding, las pistas de cada shard se leen en orden de id y se mezclan;
+artista, álbum y nombres de género se resuelven en ``default`` por bloque,
+ya que no hay JOIN entre bases.
+"""
+import csv
+import heapq
+import json
+import zlib
+from itertools import islice
+from operator import itemgetter
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from album.models import Album
+from artist.models import Artist
+from genre.models import Genre
+from track.models import Track
+
+from .sharding import get_shards, sharding_enabled
+
+
+DEFAULT_CHUNK_SIZE = 2000
+GENRE_SEPARATOR = '|'
+FORMATS = ('ndjson', 'csv')
+
+
+class ExportEntity:
+    """Describe qué columnas se exportan de una tabla y con qué nombre"""
+
+    def __init__(self, model, columns, genres_through=None, genres_fk=None):
+        self.model = model
+        # (nombre de salida, lookup del ORM)
+        self.columns = columns
+        self.genres_through = genres_through
+        self.genres_fk = genres_fk
+
+    @property
+    def pk_name(self):
+        return self.model._meta.pk.name
+
+    @property
+    def header(self):
+        names = [name for name, _ in self.columns]
+        if self.genres_through is not None:
+            names.append('genres')
+        return names
+
+    def queryset(self):
+        lookups = [lookup for _, lookup in self.columns]
+        return self.model.objects.order_by(self.pk_name).values_list(*lookups)
+
+    def genres_for(self, pks):
+        """Nombres de género por pk para un bloque de filas (una consulta)"""
+        genres = {pk: [] for pk in pks}
+        if self.genres_through is None or not pks:
+            return genres
+        rows = self.genres_through.objects.filter(
+            **{f'{self.genres_fk}__in': pks}
+        ).order_by('genre__name').values_list(self.genres_fk, 'genre__name')
+        for pk, name in rows:
+            genres[pk].append(name)
+        return genres
+
+
+ENTITIES = {
+    'tracks': ExportEntity(
+        Track,
+        [
+            ('id', 'id'),
+            ('title', 'title'),
+            ('artist_id', 'artist_id'),
+            ('artist', 'artist_id__name'),
+            ('album_id', 'album_id'),
+            ('album', 'album_id__title'),
+            ('disc_number', 'disc_number'),
+            ('track_number', 'track_number'),
+            ('duration_sec', 'duration_sec'),
+            ('explicit', 'explicit'),
+            ('status', 'status'),
+            ('language', 'language'),
+            ('preview_url', 'preview_url'),
+            ('audio_master_url', 'audio_master_url'),
+        ],
+        genres_through=Track.genres.through,
+        genres_fk='track_id',
+    ),
+    'albums': ExportEntity(
+        Album,
+        [
+            ('id', 'id'),
+            ('title', 'title'),
+            ('artist_id', 'artist_id'),
+            ('artist', 'artist_id__name'),
+            ('release_date', 'release_date'),
+            ('status', 'status'),
+            ('price', 'price'),
+            ('cover_url', 'cover_url'),
+            ('created_at', 'created_at'),
+            ('updated_at', 'updated_at'),
+        ],
+        genres_through=Album.genres.through,
+        genres_fk='album_id',
+    ),
+    'artists': ExportEntity(
+        Artist,
+        [
+            ('artist_id', 'artist_id'),
+            ('name', 'name'),
+            ('bio', 'bio'),
+            ('image_url', 'image_url'),
+            ('country', 'country__iso_code'),
+            ('label_id', 'label_id'),
+            ('label', 'label_id__name'),
+            ('socials', 'socials'),
+            ('created_at', 'created_at'),
+            ('updated_at', 'updated_at'),
+        ],
+    ),
+}
+
+
+def _iter_chunks(entity, chunk_size):
+    """Bloques de filas (tuplas con la pk primero) y sus géneros"""
+    iterator = entity.queryset().iterator(chunk_size=chunk_size)
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield chunk, entity.genres_for([row[0] for row in chunk])
+
+
+def _iter_sharded_track_chunks(entity, chunk_size):
+    """``_iter_chunks`` de las pistas con sharding: sin JOIN entre bases"""
+    lookups = [lookup for _, lookup in entity.columns]
+    local = [lookup for lookup in lookups if '__' not in lookup]
+    position = {lookup: index for index, lookup in enumerate(local)}
+    merged = heapq.merge(
+        *(
+            Track.objects.using(alias).order_by('id').values_list(*local).iterator(chunk_size=chunk_size)
+            for alias in get_shards()
+        ),
+        key=itemgetter(0),
+    )
+    TrackGenre = Track.genres.through
+    while True:
+        chunk = list(islice(merged, chunk_size))
+        if not chunk:
+            return
+
+        # Columnas de las tablas relacionadas (p. ej. artist_id__name) desde default
+        related = {}
+        for lookup in lookups:
+            if '__' in lookup:
+                fk_name, field_name = lookup.split('__', 1)
+                model = Track._meta.get_field(fk_name).related_model
+                pks = {row[position[fk_name]] for row in chunk} - {None}
+                related[lookup] = dict(model.objects.filter(pk__in=pks).values_list('pk', field_name))
+        rows = [
+            tuple(
+                related[lookup].get(row[position[lookup.split('__', 1)[0]]])
+                if '__' in lookup else row[position[lookup]]
+                for lookup in lookups
+            )
+            for row in chunk
+        ]
+
+        pks = [row[0] for row in chunk]
+        links = []
+        for alias in get_shards():
+            links += TrackGenre.objects.using(alias).filter(track_id__in=pks).values_list('track_id', 'genre_id')
+        names = dict(Genre.objects.filter(pk__in={genre_pk for _, genre_pk in links}).values_list('pk', 'name'))
+        genres = {pk: [] for pk in pks}
+        for track_pk, genre_pk in links:
+            if genre_pk in names:
+                genres[track_pk].append(names[genre_pk])
+        for track_genres in genres.values():
+            track_genres.sort()
+        yield rows, genres
+
+
+def iter_rows(entity, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Itera las filas de una entidad como diccionarios ordenados por pk"""
+    header = entity.header
+    if entity.model is Track and sharding_enabled():
+        chunks = _iter_sharded_track_chunks(entity, chunk_size)
+    else:
+        chunks = _iter_chunks(entity, chunk_size)
+    for chunk, genres in chunks:
+        for row in chunk:
+            values = list(row)
+            if entity.genres_through is not None:
+                values.append(genres[row[0]])
+            yield dict(zip(header, values))
+
+
+class _Echo:
+    """Buffer mínimo para que csv.writer devuelva la línea en vez de escribirla"""
+
+    def write(self, value):
+        return value
+
+
+def _csv_value(value):
+    if isinstance(value, list):
+        return GENRE_SEPARATOR.join(value)
+    if isinstance(value, dict):
+        return json.dumps(value, ensure_ascii=False)
+    if value is None:
+        return ''
+    return value
+
+
+def iter_ndjson(rows):
+    for row in rows:
+        yield json.dumps(row, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n'
+
+
+def iter_csv(rows, header):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(header)
+    for row in rows:
+        yield writer.writerow([_csv_value(row[name]) for name in header])
+
+
+def iter_gzip(chunks):
+    """Comprime en gzip un flujo de texto sin acumularlo en memoria"""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode('utf-8'))
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_stream(entity_name, output_format='ndjson', chunk_size=DEFAULT_CHUNK_SIZE):
+    """Devuelve un generador de líneas de texto con la exportación"""
+    entity = ENTITIES[entity_name]
+    rows = iter_rows(entity, chunk_size=chunk_size)
+    if output_format == 'csv':
+        return iter_csv(rows, entity.header)
+    return iter_ndjson(rows)
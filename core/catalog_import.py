@@ -0,0 +1,816 @@
+"""
+Importación masiva del catálogo.
+
+Lee registros en streaming (CSV, JSONL/NDJSON o fixtures JSON de Django),
+resuelve las relaciones por nombre mediante cachés en memoria y escribe en
+lotes con ``bulk_create`` dentro de una transacción por lote. Los registros
+que ya están en la base (por nombre, por (artista, título) en los álbumes y
+por (artista, álbum, disco, título) en las pistas) se cuentan como
+existentes, así que repetir una importación no duplica nada.
+"""
+import csv
+import json
+import os
+import time
+import uuid
+from collections import OrderedDict
+from datetime import date
+from decimal import Decimal
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import Q
+from django.db.models.functions import Lower, Trim
+
+from album.models import Album
+from artist.models import Artist
+from country.models import Country
+from genre.models import Genre
+from record_label.models import RecordLabel
+from track.models import Track
+
+from .aggregates import refresh_artist_genres
+from .dictionaries import bump, expire_country_counts, snapshot
+from .sharding import IN_BATCH_SIZE, bulk_create_tracks, get_retired_shards, get_shards
+
+
+# Orden de escritura dentro de un lote: primero las tablas referenciadas
+MODEL_ORDER = ['country', 'genre', 'record_label', 'artist', 'album', 'track']
+# Tablas que forman la copia en memoria de core.dictionaries y las que cuentan
+# para los contadores por país (que no la versionan)
+DICTIONARY_MODELS = ['country', 'genre']
+COUNTED_MODELS = ['record_label', 'artist']
+
+MODEL_ALIASES = {
+    'country': 'country', 'country.country': 'country', 'countries': 'country',
+    'genre': 'genre', 'genre.genre': 'genre', 'genres': 'genre',
+    'record_label': 'record_label', 'record_label.recordlabel': 'record_label',
+    'label': 'record_label', 'labels': 'record_label',
+    'artist': 'artist', 'artist.artist': 'artist', 'artists': 'artist',
+    'album': 'album', 'album.album': 'album', 'albums': 'album',
+    'track': 'track', 'track.track': 'track', 'tracks': 'track',
+}
+
+GENRE_SEPARATOR = '|'
+
+
+class ImportRowError(Exception):
+    """Registro que no se puede importar (se informa y se descarta)"""
+
+
+# ---------------------------------------------------------------------------
+# Lectura en streaming
+# ---------------------------------------------------------------------------
+
+def detect_format(path):
+    """Deduce el formato a partir de la extensión del fichero"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == '.csv':
+        return 'csv'
+    if extension in ('.jsonl', '.ndjson'):
+        return 'jsonl'
+    if extension == '.json':
+        return 'fixture'
+    raise ValueError(f"No se puede deducir el formato de '{path}'")
+
+
+def read_csv(stream):
+    for row in csv.DictReader(stream):
+        yield {key: value for key, value in row.items() if key is not None}
+
+
+def read_jsonl(stream):
+    for line in stream:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def read_json_array(stream, chunk_size=1 << 16):
+    """Itera los elementos de un array JSON sin cargar el fichero entero"""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    started = False
+    eof = False
+
+    while True:
+        buffer = buffer.lstrip()
+        if not started:
+            if buffer:
+                if buffer[0] != '[':
+                    raise ValueError("Se esperaba un array JSON")
+                buffer = buffer[1:]
+                started = True
+                continue
+        elif buffer[:1] == ',':
+            buffer = buffer[1:]
+            continue
+        elif buffer[:1] == ']':
+            return
+        elif buffer:
+            try:
+                item, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+            else:
+                yield item
+                buffer = buffer[end:]
+                continue
+
+        if eof:
+            if started:
+                raise ValueError("Array JSON incompleto")
+            return
+        chunk = stream.read(chunk_size)
+        if not chunk:
+            eof = True
+        buffer += chunk
+
+
+READERS = {
+    'csv': read_csv,
+    'jsonl': read_jsonl,
+    'fixture': read_json_array,
+}
+
+
+# ---------------------------------------------------------------------------
+# Cachés de búsqueda
+# ---------------------------------------------------------------------------
+
+class LookupCache:
+    """
+    Caché clave -> pk para una tabla.
+
+    Las claves que faltan se resuelven por lotes con una sola consulta
+    ``__in`` y los objetos creados durante la importación se registran al
+    construirse, así que un mismo lote puede referenciar filas nuevas.
+
+    Al llegar a ``max_size`` se descarta la clave usada hace más tiempo
+    (LRU): las que acaba de cargar o consultar el lote en curso se conservan.
+    """
+
+    def __init__(self, model, key_field, max_size=500_000, normalized=False):
+        self.model = model
+        self.key_field = key_field
+        self.max_size = max_size
+        # Claves en minúsculas y sin espacios extremos (p. ej. nombre de artista)
+        self.normalized = normalized
+        self._data = OrderedDict()
+
+    def _key(self, key):
+        if self.normalized and isinstance(key, str):
+            return key.strip().lower()
+        return key
+
+    def _touch(self, key):
+        """True si la clave (ya normalizada) está; la marca como usada"""
+        if key in self._data:
+            self._data.move_to_end(key)
+            return True
+        return False
+
+    def __contains__(self, key):
+        return self._touch(self._key(key))
+
+    def get(self, key):
+        key = self._key(key)
+        return self._data[key] if self._touch(key) else None
+
+    def add(self, key, pk):
+        key = self._key(key)
+        self._data[key] = pk
+        self._data.move_to_end(key)
+        if len(self._data) > self.max_size:
+            self._data.popitem(last=False)
+
+    def prefetch(self, keys):
+        missing = {self._key(key) for key in keys if key and not self._touch(self._key(key))}
+        if not missing:
+            return
+        pk_name = self.model._meta.pk.attname
+        queryset = self.model.objects.all()
+        key_field = self.key_field
+        if self.normalized:
+            queryset = queryset.annotate(_lookup_key=Lower(Trim(key_field)))
+            key_field = '_lookup_key'
+        rows = queryset.filter(**{f'{key_field}__in': missing}).values_list(key_field, pk_name)
+        for key, pk in rows:
+            self.add(key, pk)
+
+
+class AlbumLookupCache(LookupCache):
+    """
+    Los álbumes se identifican por (artista, título). El artista puede venir
+    del fichero como texto (``artist_id``) o de la base como ``uuid.UUID``:
+    la clave siempre lo guarda como ``uuid.UUID``.
+    """
+
+    def __init__(self, max_size=500_000):
+        super().__init__(Album, 'title', max_size)
+
+    def _key(self, key):
+        artist_pk, title = key
+        return _as_uuid(artist_pk), title
+
+    def prefetch(self, keys):
+        missing = {self._key(key) for key in keys}
+        missing = {key for key in missing if key[0] and key[1] and not self._touch(key)}
+        if not missing:
+            return
+        rows = Album.objects.filter(
+            artist_id__in={artist_pk for artist_pk, _ in missing},
+            title__in={title for _, title in missing},
+        ).values_list('artist_id_id', 'title', 'id')
+        for artist_pk, title, pk in rows:
+            self.add((artist_pk, title), pk)
+
+
+class TrackLookupCache(LookupCache):
+    """
+    Pistas ya importadas, por (artista, álbum, disco, título), para no
+    duplicarlas al repetir una importación. Las pistas pueden estar en
+    cualquier shard: se consultan todas las bases.
+    """
+
+    def __init__(self, max_size=500_000):
+        super().__init__(Track, 'title', max_size)
+
+    def _key(self, key):
+        artist_pk, album_pk, disc_number, title = key
+        return _as_uuid(artist_pk), _as_uuid(album_pk), disc_number, title
+
+    def prefetch(self, keys):
+        missing = {self._key(key) for key in keys}
+        missing = [key for key in missing if (key[0] or key[1]) and key[3] and not self._touch(key)]
+        # Tres listas IN por consulta: cada una con un tercio de los parámetros
+        size = IN_BATCH_SIZE // 3
+        for start in range(0, len(missing), size):
+            chunk = missing[start:start + size]
+            owners = (
+                Q(artist_id__in={key[0] for key in chunk if key[0]})
+                | Q(album_id__in={key[1] for key in chunk if key[1]})
+            )
+            for alias in [DEFAULT_DB_ALIAS] + get_shards() + get_retired_shards():
+                rows = Track.objects.using(alias).filter(
+                    owners, title__in={key[3] for key in chunk}
+                ).values_list('artist_id_id', 'album_id_id', 'disc_number', 'title', 'id')
+                for artist_pk, album_pk, disc_number, title, pk in rows:
+                    self.add((artist_pk, album_pk, disc_number, title), pk)
+
+
+# ---------------------------------------------------------------------------
+# Conversión de valores
+# ---------------------------------------------------------------------------
+
+def _clean(value):
+    if isinstance(value, str):
+        value = value.strip()
+        return value or None
+    return value
+
+
+def _as_bool(value, default=False):
+    value = _clean(value)
+    if value is None:
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).lower() in ('1', 'true', 'yes', 'si', 'sí', 't', 'y')
+
+
+def _as_int(value, default=0):
+    value = _clean(value)
+    return default if value is None else int(value)
+
+
+def _as_list(value):
+    value = _clean(value)
+    if value is None:
+        return []
+    if isinstance(value, list):
+        return [str(item).strip() for item in value if str(item).strip()]
+    return [item.strip() for item in str(value).split(GENRE_SEPARATOR) if item.strip()]
+
+
+def _as_dict(value):
+    value = _clean(value)
+    if value is None:
+        return {}
+    if isinstance(value, dict):
+        return value
+    return json.loads(value)
+
+
+def _as_uuid(value):
+    """Devuelve el UUID si el valor es una clave primaria literal"""
+    if value is None or isinstance(value, uuid.UUID):
+        return value
+    try:
+        return uuid.UUID(str(value))
+    except ValueError:
+        return None
+
+
+def _as_date(value):
+    value = _clean(value)
+    if value is None:
+        return None
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(value)
+
+
+# ---------------------------------------------------------------------------
+# Importador
+# ---------------------------------------------------------------------------
+
+class CatalogImporter:
+    """
+    Acumula registros y los escribe por lotes.
+
+    Cada registro es un ``dict`` plano (CSV/JSONL) o una entrada de fixture
+    ``{"model": ..., "pk": ..., "fields": {...}}``.
+    """
+
+    def __init__(self, batch_size=1000, default_model=None, cache_size=500_000):
+        self.batch_size = batch_size
+        self.default_model = default_model
+
+        self.countries_by_iso = LookupCache(Country, 'iso_code', cache_size)
+        self.countries_by_name = LookupCache(Country, 'name', cache_size)
+        self.genres = LookupCache(Genre, 'name', cache_size)
+        self.labels = LookupCache(RecordLabel, 'name', cache_size)
+        self.artists = LookupCache(Artist, 'name', cache_size, normalized=True)
+        self.albums = AlbumLookupCache(cache_size)
+        self.tracks = TrackLookupCache(cache_size)
+
+        self._buffer = {model_key: [] for model_key in MODEL_ORDER}
+        self._pending = 0
+
+        self.created = {model_key: 0 for model_key in MODEL_ORDER}
+        self.existing = 0
+        self.errors = []
+        self.error_count = 0
+
+    # -- API pública ------------------------------------------------------
+
+    def add(self, position, record):
+        """Añade un registro; devuelve True si se ha escrito un lote"""
+        model_key = MODEL_ALIASES.get(str(record.get('model') or self.default_model or '').lower())
+        if model_key is None:
+            self._reject(position, f"Modelo desconocido: {record.get('model')!r}")
+            return False
+
+        self._buffer[model_key].append((position, record))
+        self._pending += 1
+        if self._pending >= self.batch_size:
+            self.flush()
+            return True
+        return False
+
+    def flush(self):
+        """Escribe el lote pendiente en una única transacción"""
+        if not self._pending:
+            return
+        with transaction.atomic():
+            before = dict(self.created)
+            for model_key in MODEL_ORDER:
+                rows = self._buffer[model_key]
+                if rows:
+                    getattr(self, f'_flush_{model_key}')(rows)
+            # bulk_create no envía señales: países y géneros nuevos cambian la
+            # copia en memoria de los diccionarios; sellos y artistas, los contadores
+            if any(self.created[key] != before[key] for key in DICTIONARY_MODELS):
+                bump()
+            if any(self.created[key] != before[key] for key in COUNTED_MODELS):
+                expire_country_counts()
+        self._buffer = {model_key: [] for model_key in MODEL_ORDER}
+        self._pending = 0
+
+    @property
+    def total_created(self):
+        return sum(self.created.values())
+
+    # -- Utilidades -------------------------------------------------------
+
+    def _reject(self, position, message):
+        self.error_count += 1
+        if len(self.errors) < 20:
+            self.errors.append((position, message))
+
+    def _build_all(self, rows, build):
+        objects = []
+        for position, record in rows:
+            try:
+                obj = build(record)
+            except (ImportRowError, ValueError, TypeError, ArithmeticError) as exc:
+                self._reject(position, str(exc))
+                continue
+            if obj is None:
+                self.existing += 1
+            else:
+                objects.append(obj)
+        return objects
+
+    @staticmethod
+    def _fields(record):
+        """Campos de un registro plano o de una entrada de fixture"""
+        if 'fields' in record and isinstance(record['fields'], dict):
+            fields = dict(record['fields'])
+            if record.get('pk') is not None:
+                fields['pk'] = record['pk']
+            return fields
+        return record
+
+    def _country_pk(self, fields):
+        if _clean(fields.get('country_id')):
+            return fields['country_id']
+        value = _clean(fields.get('country'))
+        if value is None:
+            return None
+        if _as_uuid(value):
+            return _as_uuid(value)
+        pk = self.countries_by_iso.get(value.upper()) or self.countries_by_name.get(value)
+        if pk is None:
+            # Códigos ISO-3 y países que ya estaban: copia en memoria de los diccionarios
+            country = snapshot().country_by_code(value) or snapshot().countries_by_name.get(value.lower())
+            pk = country.pk if country else None
+        if pk is None:
+            raise ImportRowError(f"País no encontrado: {value}")
+        return pk
+
+    def _prefetch_countries(self, rows):
+        values = {_clean(self._fields(record).get('country')) for _, record in rows}
+        values.discard(None)
+        known = snapshot()
+        values = {
+            value for value in values
+            if not known.country_by_code(value) and value.lower() not in known.countries_by_name
+        }
+        self.countries_by_iso.prefetch({value.upper() for value in values if len(value) == 2})
+        self.countries_by_name.prefetch(values)
+
+    def _set_pk(self, obj, fields):
+        if fields.get('pk') is not None:
+            obj.pk = fields['pk']
+
+    # -- Países -----------------------------------------------------------
+
+    def _flush_country(self, rows):
+        codes = [_clean(self._fields(record).get('iso_code')) for _, record in rows]
+        self.countries_by_iso.prefetch({code.upper() for code in codes if code})
+
+        def build(record):
+            fields = self._fields(record)
+            iso_code = (_clean(fields.get('iso_code')) or '').upper()
+            name = _clean(fields.get('name'))
+            if len(iso_code) != 2 or not name:
+                raise ImportRowError("Se requieren name e iso_code de 2 caracteres")
+            if iso_code in self.countries_by_iso:
+                return None
+
+            iso_code_3 = _clean(fields.get('iso_code_3'))
+            currency_code = _clean(fields.get('currency_code'))
+            country = Country(
+                name=name,
+                iso_code=iso_code,
+                iso_code_3=iso_code_3.upper() if iso_code_3 else None,
+                continent=_clean(fields.get('continent')) or '',
+                phone_code=_clean(fields.get('phone_code')) or '',
+                currency_code=currency_code.upper() if currency_code else '',
+                currency_name=_clean(fields.get('currency_name')) or '',
+                flag_url=_clean(fields.get('flag_url')) or '',
+                is_active=_as_bool(fields.get('is_active'), default=True),
+            )
+            self._set_pk(country, fields)
+            self.countries_by_iso.add(iso_code, country.pk)
+            self.countries_by_name.add(name, country.pk)
+            return country
+
+        countries = self._build_all(rows, build)
+        Country.objects.bulk_create(countries, batch_size=self.batch_size)
+        self.created['country'] += len(countries)
+
+    # -- Géneros ----------------------------------------------------------
+
+    def _flush_genre(self, rows):
+        names = set()
+        for _, record in rows:
+            fields = self._fields(record)
+            names.add(_clean(fields.get('name')))
+            names.add(_clean(fields.get('parent')))
+        names.discard(None)
+        self.genres.prefetch(names)
+
+        def build(record):
+            fields = self._fields(record)
+            name = _clean(fields.get('name'))
+            if not name:
+                raise ImportRowError("El nombre no puede estar vacío")
+            if name in self.genres:
+                return None
+
+            parent_pk = _clean(fields.get('parent_genre_id')) or _clean(fields.get('parent_genre'))
+            parent_name = _clean(fields.get('parent'))
+            if parent_name:
+                parent_pk = self.genres.get(parent_name)
+                if parent_pk is None:
+                    raise ImportRowError(f"Género padre no encontrado: {parent_name}")
+
+            genre = Genre(
+                name=name,
+                description=_clean(fields.get('description')) or '',
+                parent_genre_id=parent_pk,
+            )
+            self._set_pk(genre, fields)
+            self.genres.add(name, genre.pk)
+            return genre
+
+        genres = self._build_all(rows, build)
+        Genre.objects.bulk_create(genres, batch_size=self.batch_size)
+        self.created['genre'] += len(genres)
+
+    # -- Sellos -----------------------------------------------------------
+
+    def _flush_record_label(self, rows):
+        self._prefetch_countries(rows)
+        self.labels.prefetch({_clean(self._fields(record).get('name')) for _, record in rows} - {None})
+
+        def build(record):
+            fields = self._fields(record)
+            name = _clean(fields.get('name'))
+            if not name:
+                raise ImportRowError("El nombre no puede estar vacío")
+            if name in self.labels:
+                return None
+
+            label = RecordLabel(
+                name=name,
+                contact=_clean(fields.get('contact')) or '',
+                web=_clean(fields.get('web')) or '',
+                country_id=self._country_pk(fields),
+            )
+            self._set_pk(label, fields)
+            self.labels.add(name, label.pk)
+            return label
+
+        labels = self._build_all(rows, build)
+        RecordLabel.objects.bulk_create(labels, batch_size=self.batch_size)
+        self.created['record_label'] += len(labels)
+
+    # -- Artistas ---------------------------------------------------------
+
+    def _flush_artist(self, rows):
+        self._prefetch_countries(rows)
+        names, labels = set(), set()
+        for _, record in rows:
+            fields = self._fields(record)
+            names.add(_clean(fields.get('name')))
+            labels.add(_clean(fields.get('label')))
+        self.artists.prefetch(names - {None})
+        self.labels.prefetch(labels - {None})
+
+        def build(record):
+            fields = self._fields(record)
+            name = _clean(fields.get('name'))
+            if not name:
+                raise ImportRowError("El nombre no puede estar vacío")
+            if name in self.artists:
+                return None
+
+            label_pk = _clean(fields.get('label_id'))
+            label_name = _clean(fields.get('label'))
+            if label_name:
+                label_pk = self.labels.get(label_name)
+                if label_pk is None:
+                    raise ImportRowError(f"Sello discográfico no encontrado: {label_name}")
+
+            artist = Artist(
+                name=name,
+                bio=_clean(fields.get('bio')) or '',
+                label_id_id=label_pk,
+                country_id=self._country_pk(fields),
+                socials=_as_dict(fields.get('socials')),
+            )
+            image_url = _clean(fields.get('image_url'))
+            if image_url:
+                artist.image_url = image_url
+            self._set_pk(artist, fields)
+            self.artists.add(name, artist.pk)
+            return artist
+
+        artists = self._build_all(rows, build)
+        Artist.objects.bulk_create(artists, batch_size=self.batch_size)
+        self.created['artist'] += len(artists)
+
+    # -- Álbumes ----------------------------------------------------------
+
+    def _artist_pk(self, fields, required):
+        if _clean(fields.get('artist_id')):
+            pk = _as_uuid(_clean(fields['artist_id']))
+            if pk is None:
+                raise ImportRowError(f"artist_id no válido: {fields['artist_id']}")
+            return pk
+        name = _clean(fields.get('artist'))
+        if name is None:
+            if required:
+                raise ImportRowError("Se requiere artist o artist_id")
+            return None
+        pk = self.artists.get(name)
+        if pk is None:
+            raise ImportRowError(f"Artista no encontrado: {name}")
+        return pk
+
+    def _genre_pks(self, fields):
+        pks = []
+        for name in _as_list(fields.get('genres')):
+            pk = _as_uuid(name) or self.genres.get(name)
+            if pk is None:
+                raise ImportRowError(f"Género no encontrado: {name}")
+            pks.append(pk)
+        return pks
+
+    def _artist_key(self, fields):
+        """Artista de un registro para precargar cachés (None si no se resuelve)"""
+        if _clean(fields.get('artist_id')):
+            return _as_uuid(_clean(fields['artist_id']))
+        return self.artists.get(_clean(fields.get('artist')))
+
+    def _prefetch_artists_and_genres(self, rows):
+        artists, genres = set(), set()
+        for _, record in rows:
+            fields = self._fields(record)
+            artists.add(_clean(fields.get('artist')))
+            genres.update(_as_list(fields.get('genres')))
+        self.artists.prefetch(artists - {None})
+        self.genres.prefetch(genres)
+
+    def _flush_album(self, rows):
+        self._prefetch_artists_and_genres(rows)
+        keys = set()
+        for _, record in rows:
+            fields = self._fields(record)
+            keys.add((self._artist_key(fields), _clean(fields.get('title'))))
+        self.albums.prefetch(keys)
+
+        album_genres = []
+
+        def build(record):
+            fields = self._fields(record)
+            title = _clean(fields.get('title'))
+            if not title:
+                raise ImportRowError("Se requiere title")
+            artist_pk = self._artist_pk(fields, required=True)
+            if (artist_pk, title) in self.albums:
+                return None
+            release_date = _as_date(fields.get('release_date'))
+            if release_date is None:
+                raise ImportRowError("Se requiere release_date")
+
+            album = Album(
+                artist_id_id=artist_pk,
+                title=title,
+                cover_url=_clean(fields.get('cover_url')),
+                release_date=release_date,
+                price=Decimal(str(_clean(fields.get('price')) or '0')),
+            )
+            status = _clean(fields.get('status'))
+            if status:
+                album.status = status
+            genre_pks = self._genre_pks(fields)
+            self._set_pk(album, fields)
+            self.albums.add((artist_pk, title), album.pk)
+            album_genres.extend((album.pk, genre_pk) for genre_pk in genre_pks)
+            return album
+
+        albums = self._build_all(rows, build)
+        Album.objects.bulk_create(albums, batch_size=self.batch_size)
+        Through = Album.genres.through
+        Through.objects.bulk_create(
+            [Through(album_id=album_pk, genre_id=genre_pk) for album_pk, genre_pk in album_genres],
+            batch_size=self.batch_size,
+            ignore_conflicts=True,
+        )
+        if album_genres:
+            refresh_artist_genres({album.artist_id_id for album in albums})
+        self.created['album'] += len(albums)
+
+    # -- Pistas -----------------------------------------------------------
+
+    def _flush_track(self, rows):
+        self._prefetch_artists_and_genres(rows)
+        keys = set()
+        for _, record in rows:
+            fields = self._fields(record)
+            album_title = _clean(fields.get('album'))
+            if album_title:
+                keys.add((self._artist_key(fields), album_title))
+        self.albums.prefetch(keys)
+        # Con los álbumes ya en caché, las pistas que existen por clave natural
+        track_keys = set()
+        for _, record in rows:
+            fields = self._fields(record)
+            artist_pk = self._artist_key(fields)
+            album_title = _clean(fields.get('album'))
+            album_pk = self.albums.get((artist_pk, album_title)) if album_title else _clean(fields.get('album_id'))
+            try:
+                disc_number = _as_int(fields.get('disc_number'), default=1)
+            except ValueError:
+                continue
+            track_keys.add((artist_pk, album_pk, disc_number, _clean(fields.get('title'))))
+        self.tracks.prefetch(track_keys)
+
+        track_genres = []
+
+        def build(record):
+            fields = self._fields(record)
+            title = _clean(fields.get('title'))
+            audio_master_url = _clean(fields.get('audio_master_url'))
+            if not title or not audio_master_url:
+                raise ImportRowError("Se requieren title y audio_master_url")
+            artist_pk = self._artist_pk(fields, required=False)
+
+            album_pk = _clean(fields.get('album_id'))
+            album_title = _clean(fields.get('album'))
+            if album_title:
+                album_pk = self.albums.get((artist_pk, album_title))
+                if album_pk is None:
+                    raise ImportRowError(f"Álbum no encontrado: {album_title}")
+
+            disc_number = _as_int(fields.get('disc_number'), default=1)
+            # Sin artista ni álbum no hay clave natural con la que reconocerla
+            natural_key = (artist_pk, album_pk, disc_number, title) if artist_pk or album_pk else None
+            if natural_key and natural_key in self.tracks:
+                return None
+
+            track = Track(
+                artist_id_id=artist_pk,
+                album_id_id=album_pk,
+                disc_number=disc_number,
+                track_number=_as_int(fields.get('track_number'), default=None),
+                title=title,
+                duration_sec=_as_int(fields.get('duration_sec')),
+                explicit=_as_bool(fields.get('explicit')),
+                preview_url=_clean(fields.get('preview_url')),
+                audio_master_url=audio_master_url,
+            )
+            for attr in ('status', 'language'):
+                value = _clean(fields.get(attr))
+                if value:
+                    setattr(track, attr, value)
+            self._set_pk(track, fields)
+            track_genres.append((track, self._genre_pks(fields)))
+            if natural_key:
+                self.tracks.add(natural_key, track.pk)
+            return track
+
+        tracks = self._build_all(rows, build)
+        bulk_create_tracks(
+            tracks,
+            [(track, genre_pk) for track, genre_pks in track_genres for genre_pk in genre_pks],
+            batch_size=self.batch_size,
+            ignore_conflicts=True,
+        )
+        self.created['track'] += len(tracks)
+
+
+# ---------------------------------------------------------------------------
+# Puntos de control
+# ---------------------------------------------------------------------------
+
+class Checkpoint:
+    """Posición del último lote confirmado, escrita de forma atómica"""
+
+    def __init__(self, path, source):
+        self.path = path
+        self.source = os.path.abspath(source)
+        self.position = 0
+
+    def load(self):
+        if not self.path or not os.path.exists(self.path):
+            return 0
+        with open(self.path, encoding='utf-8') as handle:
+            data = json.load(handle)
+        if data.get('source') != self.source:
+            raise ValueError(f"El checkpoint {self.path} corresponde a otro fichero")
+        self.position = data.get('position', 0)
+        return self.position
+
+    def save(self, position, created):
+        if not self.path:
+            return
+        self.position = position
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as handle:
+            json.dump({
+                'source': self.source,
+                'position': position,
+                'created': created,
+                'updated_at': time.time(),
+            }, handle)
+        os.replace(tmp_path, self.path)
+
+    def clear(self):
+        if self.path and os.path.exists(self.path):
+            os.remove(self.path)
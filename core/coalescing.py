@@ -0,0 +1,265 @@
+"""
+Lecturas coalescidas (*single-flight*) y caché de respuestas en memoria para
+las acciones de lectura de los viewsets.
+
+Cuando caducaba la página de un artista muy consultado, decenas de peticiones
+iguales reconstruían ``/artists/{id}`` y ``/artists/{id}/albums`` a la vez.
+Con ``CoalescedReadMixin`` las peticiones GET idénticas (misma ruta, mismos
+parámetros en cualquier orden y mismo ``Accept``) que llegan mientras otra
+se está calculando esperan a esa y reciben una copia de su respuesta: una
+sola ejecución de la vista por clave y proceso.
+
+- Quien espera lo hace como mucho ``WAIT_TIMEOUT`` segundos; después, o si
+  la petición que calculaba falló, calcula la suya.
+- Con ``ENABLED`` las respuestas 200 se guardan ``TTL`` segundos. Pasado ese
+  tiempo, y durante ``STALE_TTL`` segundos más, la entrada sigue sirviendo
+  (*stale-while-revalidate*): la primera petición la recalcula y las que
+  llegan mientras tanto reciben la copia anterior sin esperar.
+- Cualquier evento del bus de invalidación (``core.invalidation``) sobre
+  artistas, álbumes, pistas, géneros, países, sellos o los diccionarios
+  vacía la caché, copias caducadas incluidas. Un cálculo que empezó antes
+  del evento no guarda su resultado.
+- Las peticiones que leen del primario (tras escribir, ver
+  ``core.replicas``) o que llevan credenciales no se coalescen ni se
+  guardan.
+
+Configuración (``settings.RESPONSE_CACHE``)::
+
+    RESPONSE_CACHE = {'ENABLED': False, 'COALESCE': True, 'TTL': 5, 'STALE_TTL': 30,
+                      'WAIT_TIMEOUT': 5, 'MAX_ENTRIES': 1000}
+"""
+import functools
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.http import HttpResponse
+
+from .invalidation import TRACKED_MODELS, subscribe
+from .models import DictionaryVersion
+from .replicas import is_pinned
+
+DEFAULTS = {
+    'ENABLED': False,
+    'COALESCE': True,
+    'TTL': 5,
+    'STALE_TTL': 30,
+    'WAIT_TIMEOUT': 5,
+    'MAX_ENTRIES': 1000,
+}
+
+# Cabecera de las copias: 'hit', 'stale' o 'shared'
+CACHE_HEADER = 'X-Response-Cache'
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'RESPONSE_CACHE', {})}
+
+
+class _Stats:
+    computed = 0     # ejecuciones de la vista
+    shared = 0       # respuestas copiadas de un cálculo en curso
+    hits = 0         # respuestas de la caché dentro del TTL
+    stale_hits = 0   # respuestas caducadas servidas mientras otra petición recalcula
+    timeouts = 0     # esperas que superaron WAIT_TIMEOUT
+
+
+_stats = _Stats()
+
+
+class CachedResponse:
+    """Contenido, estado y cabeceras de una respuesta ya renderizada"""
+
+    def __init__(self, response):
+        self.status_code = response.status_code
+        self.content = response.content
+        self.headers = dict(response.items())
+        self.stored_at = time.monotonic()
+
+    @classmethod
+    def of(cls, response):
+        """Copia de ``response``, o None si no se puede compartir (streaming)"""
+        if getattr(response, 'streaming', False):
+            return None
+        if hasattr(response, 'render') and not response.is_rendered:
+            response.render()
+        return cls(response)
+
+    def age(self):
+        return time.monotonic() - self.stored_at
+
+    def response(self, source):
+        response = HttpResponse(self.content, status=self.status_code, headers=self.headers)
+        response[CACHE_HEADER] = source
+        return response
+
+
+class _Flight:
+    """Cálculo en curso de una clave"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.failed = False
+
+
+class SingleFlight:
+    """Una sola ejecución a la vez por clave; las llamadas concurrentes comparten su resultado"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights = {}
+
+    def busy(self, key):
+        return key in self._flights
+
+    def __len__(self):
+        return len(self._flights)
+
+    def run(self, key, func, timeout=None):
+        """Devuelve ``(resultado, compartido)``"""
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+        if not leader:
+            if flight.done.wait(timeout):
+                if not flight.failed:
+                    return flight.result, True
+            else:
+                _stats.timeouts += 1
+            return func(), False
+        try:
+            flight.result = func()
+        except BaseException:
+            flight.failed = True
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+        return flight.result, False
+
+
+class ResponseCache:
+    """Respuestas por clave con expulsión LRU"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        # Cambia con cada invalidación: un cálculo anterior no guarda su resultado
+        self.generation = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry, generation, max_entries):
+        with self._lock:
+            if generation != self.generation:
+                return False
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > max_entries:
+                self._entries.popitem(last=False)
+            return True
+
+    def clear(self, *args):
+        with self._lock:
+            self._entries.clear()
+            self.generation += 1
+
+
+flights = SingleFlight()
+cache = ResponseCache()
+
+
+def request_key(request):
+    """Ruta, parámetros ordenados por nombre y ``Accept`` de la petición"""
+    query = tuple((name, tuple(values)) for name, values in sorted(request.GET.lists()))
+    return request.path, query, request.META.get('HTTP_ACCEPT', '')
+
+
+def serve(key, compute):
+    """Respuesta para ``key``: de la caché, de un cálculo en curso o de ``compute()``"""
+    config = get_config()
+    if config['ENABLED']:
+        entry = cache.get(key)
+        if entry is not None:
+            age = entry.age()
+            if age < config['TTL']:
+                _stats.hits += 1
+                return entry.response('hit')
+            if age < config['TTL'] + config['STALE_TTL'] and flights.busy(key):
+                _stats.stale_hits += 1
+                return entry.response('stale')
+    elif not config['COALESCE']:
+        _stats.computed += 1
+        return compute()
+
+    own = []
+    generation = cache.generation
+
+    def execute():
+        response = compute()
+        own.append(response)
+        _stats.computed += 1
+        entry = CachedResponse.of(response)
+        if entry is not None and config['ENABLED'] and response.status_code == 200:
+            cache.put(key, entry, generation, config['MAX_ENTRIES'])
+        return entry
+
+    if config['COALESCE']:
+        entry, shared = flights.run(key, execute, config['WAIT_TIMEOUT'])
+    else:
+        entry, shared = execute(), False
+    if shared and entry is not None:
+        _stats.shared += 1
+        return entry.response('shared')
+    if not own:
+        # El cálculo en curso no se podía compartir
+        return compute()
+    return own[0]
+
+
+def _coalescible(request):
+    if request.method != 'GET' or is_pinned():
+        return False
+    return 'HTTP_AUTHORIZATION' not in request.META and settings.SESSION_COOKIE_NAME not in request.COOKIES
+
+
+class CoalescedReadMixin:
+    """Coalesce las peticiones GET del viewset (y las guarda si la caché está activada)"""
+
+    def dispatch(self, request, *args, **kwargs):
+        if not _coalescible(request):
+            return super().dispatch(request, *args, **kwargs)
+        return serve(request_key(request), functools.partial(super().dispatch, request, *args, **kwargs))
+
+
+def status():
+    config = get_config()
+    return {
+        'enabled': config['ENABLED'],
+        'coalesce': config['COALESCE'],
+        'entries': len(cache),
+        'in_flight': len(flights),
+        'computed': _stats.computed,
+        'shared': _stats.shared,
+        'hits': _stats.hits,
+        'stale_hits': _stats.stale_hits,
+        'timeouts': _stats.timeouts,
+    }
+
+
+def connect_signals():
+    for model in [*TRACKED_MODELS, DictionaryVersion]:
+        subscribe(model._meta.label_lower, cache.clear)
@@ -0,0 +1,239 @@
+"""
+Copia en memoria de las tablas diccionario: países y géneros.
+
+Las dos tablas son pequeñas y cambian poco, pero cada artista o sello de un
+listado volvía a consultar y serializar su país. ``snapshot()`` devuelve una
+copia inmutable con diccionarios por id, ISO-2, ISO-3 y nombre, la
+representación anidada de cada país (la de ``CountryNestedSerializer``), los
+continentes y la jerarquía de géneros.
+
+La copia lleva la versión de la fila ``dictionary_versions`` con la que se
+construyó. Cada escritura de un país o género incrementa esa versión en la
+misma transacción, descarta la copia del proceso y lo anuncia en el bus de
+invalidación (``core.invalidation``). Los demás procesos, al recibir el
+evento o como mucho cada ``DICTIONARY_CHECK_INTERVAL`` segundos (30 por
+defecto), comparan la versión con una consulta por clave primaria y, si
+cambió, construyen una copia nueva y la sustituyen de una vez: quien esté
+leyendo la anterior la termina sin ver un estado a medias.
+
+Las escrituras masivas sin señales (``bulk_create`` de la importación)
+llaman a ``bump()`` directamente.
+
+Los contadores de artistas y sellos de cada país que ``country_data()`` añade a
+la representación anidada no forman parte de la copia: cambian con cualquier
+alta de artista o sello, y versionarlos invalidaría los diccionarios en todos
+los procesos a cada escritura. Se guardan aparte, se recalculan con una
+consulta agrupada como mucho cada ``COUNTRY_COUNTS_INTERVAL`` segundos (30 por
+defecto) y las escrituras de artistas y sellos solo los caducan en su proceso.
+"""
+import threading
+import time
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, transaction
+from django.db.models import Count, F
+from django.db.models.signals import post_delete, post_save
+
+from artist.models import Artist
+from country.models import Country
+from country.serializers import CountryNestedSerializer
+from genre.models import Genre
+from record_label.models import RecordLabel
+
+from .invalidation import publish, subscribe
+from .models import DictionaryVersion
+
+VERSION_NAME = 'dictionaries'
+
+_lock = threading.Lock()
+_snapshot = None
+_checked_at = 0.0
+
+_counts_lock = threading.Lock()
+# (momento del cálculo, artistas por país, sellos por país)
+_counts = (0.0, {}, {})
+
+
+class Snapshot:
+    """Países y géneros de una versión; no se modifica después de construirse"""
+
+    def __init__(self, version, countries, genres):
+        self.version = version
+        self.countries = {country.pk: country for country in countries}
+        self.countries_by_iso = {country.iso_code.upper(): country for country in countries}
+        self.countries_by_iso3 = {
+            country.iso_code_3.upper(): country for country in countries if country.iso_code_3
+        }
+        self.countries_by_name = {country.name.lower(): country for country in countries}
+
+        self.country_data = {country.pk: CountryNestedSerializer(country).data for country in countries}
+
+        continent_names = dict(Country._meta.get_field('continent').choices)
+        per_continent = Counter(country.continent for country in countries if country.continent)
+        self.continents = [
+            {'code': code, 'name': continent_names.get(code, code), 'countries_count': count}
+            for code, count in sorted(per_continent.items())
+        ]
+
+        self.genres = {genre.pk: genre for genre in genres}
+        self.genres_by_name = {genre.name.lower(): genre for genre in genres}
+        children = defaultdict(list)
+        for genre in genres:
+            if genre.parent_genre_id is not None:
+                children[genre.parent_genre_id].append(genre.pk)
+        self.genre_children = dict(children)
+
+    def country_by_code(self, code):
+        """País por código ISO-2 o ISO-3 (sin distinguir mayúsculas)"""
+        code = code.strip().upper()
+        return self.countries_by_iso.get(code) or self.countries_by_iso3.get(code)
+
+    def genre_pks_matching(self, text):
+        """Ids de los géneros cuyo nombre contiene ``text`` (sin distinguir mayúsculas)"""
+        text = text.lower()
+        return [genre.pk for name, genre in self.genres_by_name.items() if text in name]
+
+
+def _check_interval():
+    return getattr(settings, 'DICTIONARY_CHECK_INTERVAL', 30.0)
+
+
+def _counts_interval():
+    return getattr(settings, 'COUNTRY_COUNTS_INTERVAL', 30.0)
+
+
+def current_version():
+    # Siempre en el primario: una réplica atrasada devolvería una versión vieja
+    row = DictionaryVersion.objects.using(DEFAULT_DB_ALIAS).filter(name=VERSION_NAME).values_list(
+        'version', flat=True
+    ).first()
+    return row or 0
+
+
+def _build(version):
+    countries = list(Country.objects.using(DEFAULT_DB_ALIAS).order_by('name'))
+    genres = list(Genre.objects.using(DEFAULT_DB_ALIAS).order_by('name'))
+    return Snapshot(version, countries, genres)
+
+
+def snapshot():
+    """Copia vigente; se reconstruye si otro proceso cambió la versión"""
+    global _snapshot, _checked_at
+    current = _snapshot
+    if current is not None and time.monotonic() - _checked_at < _check_interval():
+        return current
+    with _lock:
+        if _snapshot is not None and time.monotonic() - _checked_at < _check_interval():
+            return _snapshot
+        version = current_version()
+        if _snapshot is None or _snapshot.version != version:
+            _snapshot = _build(version)
+        _checked_at = time.monotonic()
+        return _snapshot
+
+
+def _owner_counts():
+    """Artistas y sellos por país; se recalculan al caducar, no con la versión"""
+    global _counts
+    current = _counts
+    if current[0] and time.monotonic() - current[0] < _counts_interval():
+        return current
+    with _counts_lock:
+        if _counts[0] and time.monotonic() - _counts[0] < _counts_interval():
+            return _counts
+        artist_counts = dict(
+            Artist.objects.using(DEFAULT_DB_ALIAS).filter(country__isnull=False).order_by().values(
+                'country'
+            ).annotate(count=Count('pk')).values_list('country', 'count')
+        )
+        label_counts = dict(
+            RecordLabel.objects.using(DEFAULT_DB_ALIAS).order_by().values('country').annotate(
+                count=Count('pk')
+            ).values_list('country', 'count')
+        )
+        _counts = (time.monotonic(), artist_counts, label_counts)
+        return _counts
+
+
+def country_data(pk):
+    """
+    Representación anidada del país ``pk``, con sus contadores de artistas y
+    sellos. Si no está en la copia (creado en otro proceso dentro del intervalo
+    de comprobación) se comprueba la versión antes de devolver None.
+    """
+    data = snapshot().country_data.get(pk)
+    if data is None:
+        _expire()
+        data = snapshot().country_data.get(pk)
+    if data is None:
+        return None
+    _, artist_counts, label_counts = _owner_counts()
+    return {
+        **data,
+        'artists_count': artist_counts.get(pk, 0),
+        'record_labels_count': label_counts.get(pk, 0),
+    }
+
+
+def _expire(*args):
+    global _checked_at
+    with _lock:
+        _checked_at = 0.0
+
+
+def expire_country_counts(*args, **kwargs):
+    """Caduca los contadores por país de este proceso (la siguiente lectura los recalcula)"""
+    global _counts
+    with _counts_lock:
+        _counts = (0.0, {}, {})
+
+
+def invalidate():
+    """Descarta la copia de este proceso (la siguiente lectura la reconstruye)"""
+    global _snapshot
+    with _lock:
+        _snapshot = None
+
+
+def bump():
+    """Incrementa la versión compartida y descarta la copia de este proceso"""
+    versions = DictionaryVersion.objects.using(DEFAULT_DB_ALIAS)
+    if not versions.filter(name=VERSION_NAME).update(version=F('version') + 1):
+        try:
+            with transaction.atomic(using=DEFAULT_DB_ALIAS):
+                versions.create(name=VERSION_NAME, version=1)
+        except IntegrityError:
+            # Otro proceso creó la fila a la vez
+            versions.filter(name=VERSION_NAME).update(version=F('version') + 1)
+    invalidate()
+    publish(DictionaryVersion._meta.label_lower, [VERSION_NAME])
+
+
+# ---------------------------------------------------------------------------
+# Señales
+# ---------------------------------------------------------------------------
+
+def _dictionary_changed(sender, **kwargs):
+    bump()
+
+
+def _owner_saved(sender, instance, created, update_fields=None, **kwargs):
+    # Artistas y sellos solo cuentan para el contador de su país, que no versiona la copia
+    if created:
+        if instance.country_id is not None:
+            expire_country_counts()
+    elif update_fields is None or 'country' in update_fields:
+        expire_country_counts()
+
+
+def connect_signals():
+    uid = 'core.dictionaries.'
+    # Otro proceso cambió la versión: se comprueba en la siguiente lectura
+    subscribe(DictionaryVersion._meta.label_lower, _expire)
+    for model in (Country, Genre):
+        post_save.connect(_dictionary_changed, sender=model, dispatch_uid=uid + model._meta.label_lower + '.save')
+        post_delete.connect(_dictionary_changed, sender=model, dispatch_uid=uid + model._meta.label_lower + '.delete')
+    for model in (Artist, RecordLabel):
+        post_save.connect(_owner_saved, sender=model, dispatch_uid=uid + model._meta.label_lower + '.save')
+        post_delete.connect(expire_country_counts, sender=model, dispatch_uid=uid + model._meta.label_lower + '.delete')
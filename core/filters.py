@@ -0,0 +1,26 @@
+"""
+Parámetro ``?ordering=`` restringido a una lista de valores permitidos.
+
+Cada vista declara ``ordering_allowlist``: valor público -> ``order_by``
+completo. Solo se admiten órdenes que sirve un índice (con el desempate
+incluido), de modo que ningún listado ordene en memoria. Un valor fuera de
+la lista responde 400 en lugar de ignorarse.
+"""
+from rest_framework.exceptions import ValidationError
+from rest_framework.filters import BaseFilterBackend
+
+
+class AllowlistedOrderingFilter(BaseFilterBackend):
+    ordering_param = 'ordering'
+
+    def filter_queryset(self, request, queryset, view):
+        value = request.query_params.get(self.ordering_param)
+        if not value:
+            return queryset
+        allowlist = getattr(view, 'ordering_allowlist', {})
+        if value not in allowlist:
+            allowed = ', '.join(allowlist) or 'ninguno'
+            raise ValidationError({
+                self.ordering_param: [f"Orden no permitido: {value}. Valores admitidos: {allowed}"]
+            })
+        return queryset.order_by(*allowlist[value])
@@ -0,0 +1,38 @@
+"""
+Jerarquía de géneros para los filtros con ``include_subgenres``.
+
+Los subgéneros de un género se obtienen recorriendo el diccionario
+``{padre: [hijos]}`` de la copia en memoria de ``core.dictionaries``, sin
+consultas por nivel. Los filtros usan después el conjunto de ids en un
+``EXISTS`` sobre la tabla intermedia, que recorre el índice del orden del
+listado sin JOIN ni DISTINCT aunque el género tenga cientos de miles de
+pistas.
+"""
+from .dictionaries import snapshot
+
+
+def descendant_ids(genre_ids):
+    """Ids de los subgéneros (a cualquier profundidad) de ``genre_ids``, sin incluirlos"""
+    tree = snapshot().genre_children
+    roots = set(genre_ids)
+    found = set()
+    pending = list(roots)
+    while pending:
+        for child in tree.get(pending.pop(), ()):
+            if child not in found and child not in roots:
+                found.add(child)
+                pending.append(child)
+    return found
+
+
+def wants_subgenres(request):
+    """``?include_subgenres=true`` en la petición"""
+    return request.query_params.get('include_subgenres', '').lower() == 'true'
+
+
+def expand(genre_ids, include_subgenres):
+    """``genre_ids`` más sus subgéneros si se piden"""
+    genre_ids = set(genre_ids)
+    if include_subgenres:
+        genre_ids |= descendant_ids(genre_ids)
+    return genre_ids
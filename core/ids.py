@@ -0,0 +1,125 @@
+"""
+Claves primarias UUID ordenadas en el tiempo y almacenamiento compacto.
+
+- ``new_uuid`` genera la clave de las filas nuevas según
+  ``settings.PRIMARY_KEY_SCHEME``: ``'uuid7'`` (por defecto, ordenada por
+  tiempo: las inserciones van al final del índice en vez de repartirse por
+  todo el B-tree) o ``'uuid4'`` (aleatoria, el comportamiento anterior).
+- ``CompactUUIDField`` es un ``UUIDField`` que, con
+  ``settings.PRIMARY_KEY_STORAGE = 'binary'``, guarda los 16 bytes del UUID
+  en un BLOB en lugar de los 32 caracteres hexadecimales. Las claves
+  foráneas y las tablas intermedias heredan la misma representación.
+  Al leer acepta ambos formatos.
+
+Las filas existentes se convierten (y opcionalmente se vuelven a numerar
+con UUIDv7 a partir de ``created_at``) con ``manage.py convert_primary_keys``.
+"""
+import os
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core import exceptions
+from django.db import models
+
+SCHEMES = ('uuid7', 'uuid4')
+STORAGES = ('text', 'binary')
+
+_lock = threading.Lock()
+_last_ms = 0
+_sequence = 0
+
+
+def uuid7(timestamp_ms=None):
+    """
+    UUID versión 7 (RFC 9562): 48 bits de milisegundos Unix, un contador de
+    12 bits que mantiene el orden dentro del mismo milisegundo y 62 bits
+    aleatorios.
+    """
+    global _last_ms, _sequence
+    if timestamp_ms is None:
+        with _lock:
+            timestamp_ms = time.time_ns() // 1_000_000
+            if timestamp_ms <= _last_ms:
+                timestamp_ms = _last_ms
+                _sequence += 1
+                if _sequence > 0xFFF:
+                    # Contador agotado: se toma prestado el siguiente milisegundo
+                    timestamp_ms += 1
+                    _sequence = 0
+            else:
+                # Empezar en la mitad inferior deja margen para el contador
+                _sequence = int.from_bytes(os.urandom(2), 'big') & 0x7FF
+            _last_ms = timestamp_ms
+            sequence = _sequence
+    else:
+        sequence = int.from_bytes(os.urandom(2), 'big') & 0xFFF
+
+    random_bits = int.from_bytes(os.urandom(8), 'big') & ((1 << 62) - 1)
+    value = (
+        (timestamp_ms & ((1 << 48) - 1)) << 80
+        | 0x7 << 76
+        | sequence << 64
+        | 0b10 << 62
+        | random_bits
+    )
+    return uuid.UUID(int=value)
+
+
+def uuid7_timestamp_ms(value):
+    """Milisegundos Unix codificados en un UUIDv7"""
+    return value.int >> 80
+
+
+def get_scheme():
+    scheme = getattr(settings, 'PRIMARY_KEY_SCHEME', 'uuid7')
+    if scheme not in SCHEMES:
+        raise ValueError(f"PRIMARY_KEY_SCHEME no válido: {scheme}")
+    return scheme
+
+
+def binary_storage():
+    storage = getattr(settings, 'PRIMARY_KEY_STORAGE', 'text')
+    if storage not in STORAGES:
+        raise ValueError(f"PRIMARY_KEY_STORAGE no válido: {storage}")
+    return storage == 'binary'
+
+
+def new_uuid():
+    """Valor por defecto de las claves primarias UUID"""
+    return uuid7() if get_scheme() == 'uuid7' else uuid.uuid4()
+
+
+class CompactUUIDField(models.UUIDField):
+    """UUIDField que puede guardarse como BLOB de 16 bytes (ver ``PRIMARY_KEY_STORAGE``)"""
+
+    def get_internal_type(self):
+        # BinaryField -> columna BLOB y sin el conversor de UUID del backend
+        return 'BinaryField' if binary_storage() else 'UUIDField'
+
+    def to_python(self, value):
+        # Los valores leídos sin conversor (p. ej. las columnas extra de
+        # prefetch_related) llegan como los 16 bytes del BLOB
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            value = bytes(value)
+            if len(value) != 16:
+                raise exceptions.ValidationError(
+                    self.error_messages['invalid'], code='invalid', params={'value': value},
+                )
+            return uuid.UUID(bytes=value)
+        return super().to_python(value)
+
+    def get_db_prep_value(self, value, connection, prepared=False):
+        if value is None or not binary_storage():
+            return super().get_db_prep_value(value, connection, prepared)
+        if isinstance(value, (bytes, bytearray, memoryview)) and len(value) == 16:
+            return bytes(value)
+        if not isinstance(value, uuid.UUID):
+            value = self.to_python(value)
+        return value.bytes
+
+    def from_db_value(self, value, expression, connection):
+        if value is None or isinstance(value, uuid.UUID):
+            return value
+        return self.to_python(value)
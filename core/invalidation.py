@@ -0,0 +1,269 @@
+"""
+Bus de invalidación entre procesos (workers de gunicorn y nodos que comparten
+la base de datos).
+
+Las cachés en memoria de un proceso (``core.dictionaries`` y las que se
+añadan) no se enteran de las escrituras que atienden otros procesos. Cada
+escritura de artistas, álbumes, pistas, géneros, países y sellos publica un
+evento ``(modelo, pk, versión)`` en la tabla ``invalidation_events`` de
+``default``; la versión es el id del evento, creciente.
+
+- Los eventos de una transacción se agrupan (un mismo objeto una sola vez) y
+  se escriben con un único INSERT al hacer commit: quien los lea ya puede
+  ver los datos nuevos, y una transacción deshecha no publica nada.
+- ``InvalidationMiddleware`` llama a ``poll()`` antes de cada petición. Como
+  mucho cada ``INVALIDATION_POLL_INTERVAL`` segundos (0.5 por defecto) lee
+  los eventos posteriores al último aplicado (búsqueda por clave primaria),
+  los agrupa por modelo y llama una vez a cada suscriptor con el conjunto de
+  pks. Una petición nunca ve cambios confirmados hace más de ese intervalo.
+- El proceso que escribe aplica sus propios eventos al hacer commit.
+- ``status()`` (``GET /invalidation/status``) mide el retraso: segundos
+  entre el commit de cada evento y su aplicación en este proceso.
+- ``manage.py db_maintenance`` borra los eventos con más de
+  ``INVALIDATION_RETENTION`` segundos (3600). Un proceso que lleva más de
+  ese tiempo sin leer el bus puede haberse perdido eventos: invalida todo.
+
+Los suscriptores reciben el conjunto de pks (como texto) o ``None`` cuando
+hay que descartar todo lo del modelo.
+"""
+import threading
+import time
+from collections import defaultdict
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.db.models import Max
+from django.db.models.signals import post_delete, post_save
+
+from album.models import Album
+from artist.models import Artist
+from country.models import Country
+from genre.models import Genre
+from record_label.models import RecordLabel
+from track.models import Track
+
+from .models import InvalidationEvent
+from .releases import albums_released
+from .sharding import tracks_changed
+
+TRACKED_MODELS = [Artist, Album, Track, Genre, Country, RecordLabel]
+# Eventos leídos por consulta en cada poll
+POLL_BATCH_SIZE = 5000
+
+_subscribers = defaultdict(list)
+_poll_lock = threading.Lock()
+
+
+class _State:
+    last_id = None          # último evento aplicado (None: aún no se ha leído el bus)
+    last_poll = 0.0         # time.monotonic() del último poll
+    last_poll_wall = 0.0    # time.time() del último poll
+    applied = 0             # eventos aplicados desde el arranque
+    last_lag = None         # retraso del evento más antiguo del último poll con eventos
+    max_lag = 0.0           # mayor retraso observado
+    resets = 0              # invalidaciones completas por haber perdido eventos
+
+
+_state = _State()
+
+
+def _poll_interval():
+    return getattr(settings, 'INVALIDATION_POLL_INTERVAL', 0.5)
+
+
+def retention():
+    return getattr(settings, 'INVALIDATION_RETENTION', 3600)
+
+
+def subscribe(label, callback):
+    """``callback(pks)`` para los eventos del modelo ``label`` (p. ej. 'genre.genre')"""
+    if callback not in _subscribers[label]:
+        _subscribers[label].append(callback)
+
+
+def unsubscribe(label, callback):
+    if callback in _subscribers[label]:
+        _subscribers[label].remove(callback)
+
+
+def _dispatch(changes):
+    """Llama a los suscriptores con {modelo: pks | None}"""
+    for label, pks in changes.items():
+        for callback in list(_subscribers.get(label, ())):
+            callback(pks)
+
+
+# ---------------------------------------------------------------------------
+# Publicación
+# ---------------------------------------------------------------------------
+
+class _Batch:
+    """Eventos de una transacción, pendientes de su commit"""
+
+    def __init__(self):
+        self.keys = set()
+        self.done = False
+
+    def flush(self):
+        self.done = True
+        if not self.keys:
+            return
+        now = time.time()
+        InvalidationEvent.objects.using(DEFAULT_DB_ALIAS).bulk_create([
+            InvalidationEvent(model=label, object_pk=pk, created_at=now) for label, pk in sorted(self.keys)
+        ])
+        changes = defaultdict(set)
+        for label, pk in self.keys:
+            changes[label].add(pk)
+        _dispatch(changes)
+
+
+def publish(label, pks, using=DEFAULT_DB_ALIAS):
+    """Publica que cambiaron los objetos ``pks`` del modelo ``label`` al confirmar la transacción de ``using``"""
+    connection = connections[using]
+    batch = getattr(connection, '_invalidation_batch', None)
+    # Se reutiliza el lote pendiente del mismo nivel de savepoint: si ese
+    # savepoint se deshace, Django descarta el lote con él
+    savepoints = set(connection.savepoint_ids)
+    scheduled = batch is not None and not batch.done and any(
+        func == batch.flush and sids == savepoints for sids, func, _ in connection.run_on_commit
+    )
+    if not scheduled:
+        batch = connection._invalidation_batch = _Batch()
+    batch.keys.update((label, str(pk)) for pk in pks)
+    if not scheduled:
+        # Fuera de una transacción on_commit lo ejecuta ya
+        transaction.on_commit(batch.flush, using=using)
+
+
+# ---------------------------------------------------------------------------
+# Lectura
+# ---------------------------------------------------------------------------
+
+def poll_due():
+    return time.monotonic() - _state.last_poll >= _poll_interval()
+
+
+def poll(force=False):
+    """Aplica los eventos nuevos; devuelve cuántos leyó"""
+    if not (force or poll_due()):
+        return 0
+    # Si otro hilo ya está leyendo, este no espera
+    if not _poll_lock.acquire(blocking=False):
+        return 0
+    try:
+        return _poll()
+    finally:
+        _poll_lock.release()
+
+
+def _poll():
+    events = InvalidationEvent.objects.using(DEFAULT_DB_ALIAS)
+    now = time.time()
+    if _state.last_id is None:
+        # Arranque: las cachés están vacías, se empieza por el final del bus
+        _state.last_id = events.aggregate(last=Max('id'))['last'] or 0
+    elif now - _state.last_poll_wall > retention():
+        # Los eventos de ese periodo pueden estar ya purgados
+        _state.resets += 1
+        _dispatch({label: None for label in list(_subscribers)})
+        _state.last_id = events.aggregate(last=Max('id'))['last'] or _state.last_id
+
+    read = 0
+    while True:
+        rows = list(
+            events.filter(id__gt=_state.last_id).order_by('id').values_list(
+                'id', 'model', 'object_pk', 'created_at'
+            )[:POLL_BATCH_SIZE]
+        )
+        if not rows:
+            break
+        changes = defaultdict(set)
+        for _, label, pk, _ in rows:
+            changes[label].add(pk)
+        _dispatch(changes)
+        lag = max(0.0, time.time() - rows[0][3])
+        _state.last_lag = lag
+        _state.max_lag = max(_state.max_lag, lag)
+        _state.last_id = rows[-1][0]
+        _state.applied += len(rows)
+        read += len(rows)
+        if len(rows) < POLL_BATCH_SIZE:
+            break
+
+    _state.last_poll = time.monotonic()
+    _state.last_poll_wall = now
+    return read
+
+
+def status():
+    """Posición y retraso de este proceso en el bus"""
+    head = InvalidationEvent.objects.using(DEFAULT_DB_ALIAS).aggregate(last=Max('id'))['last'] or 0
+    return {
+        'last_event_id': _state.last_id,
+        'head_event_id': head,
+        'pending_events': max(0, head - (_state.last_id or 0)),
+        'seconds_since_poll': round(time.time() - _state.last_poll_wall, 3) if _state.last_poll_wall else None,
+        'poll_interval': _poll_interval(),
+        'events_applied': _state.applied,
+        'last_lag_seconds': None if _state.last_lag is None else round(_state.last_lag, 3),
+        'max_lag_seconds': round(_state.max_lag, 3),
+        'resets': _state.resets,
+    }
+
+
+def prune(older_than=None):
+    """Borra los eventos anteriores a ``older_than`` segundos (por defecto la retención)"""
+    cutoff = time.time() - (retention() if older_than is None else older_than)
+    return InvalidationEvent.objects.using(DEFAULT_DB_ALIAS).filter(created_at__lt=cutoff).delete()[0]
+
+
+class InvalidationMiddleware:
+    """Aplica los eventos del bus antes de atender cada petición"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        poll()
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        # Solo se pasa a un hilo cuando toca leer el bus
+        if poll_due():
+            await sync_to_async(poll)()
+        return await self.get_response(request)
+
+
+# ---------------------------------------------------------------------------
+# Señales
+# ---------------------------------------------------------------------------
+
+def _saved(sender, instance, **kwargs):
+    publish(sender._meta.label_lower, [instance.pk], instance._state.db)
+
+
+def _tracks_changed(sender, track_pks, using, **kwargs):
+    publish(Track._meta.label_lower, track_pks, using)
+
+
+def _albums_released(sender, album_ids, **kwargs):
+    publish(Album._meta.label_lower, album_ids)
+
+
+def connect_signals():
+    uid = 'core.invalidation.'
+    for model in TRACKED_MODELS:
+        for signal in (post_save, post_delete):
+            signal.connect(_saved, sender=model, dispatch_uid=uid + model._meta.label_lower)
+    tracks_changed.connect(_tracks_changed, dispatch_uid=uid + 'tracks_changed')
+    albums_released.connect(_albums_released, dispatch_uid=uid + 'albums_released')
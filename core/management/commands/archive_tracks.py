@@ -0,0 +1,138 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils import timezone
+
+from album.models import Album
+from artist.models import Artist
+from core.aggregates import refresh_album_aggregates, refresh_artist_genres
+from core.choices import ReleaseStatus
+from core.invalidation import publish
+from core.sharding import ARCHIVE_EVENT, get_retired_shards, get_shards, tracks_changed
+from track.models import ArchivedTrack, ArchivedTrackGenre, Track, TrackGenre
+
+
+def _copy(source, target_model, **extra):
+    """Instancia de ``target_model`` con las columnas comunes de ``source``"""
+    values = {
+        field.attname: getattr(source, field.attname)
+        for field in target_model._meta.concrete_fields
+        if hasattr(source, field.attname)
+    }
+    return target_model(**{**values, **extra})
+
+
+class Command(BaseCommand):
+    help = (
+        "Mueve las pistas retiradas hace más de --days días (y sus géneros) a "
+        "las tablas frías tracks_archive / tracks_genres_archive de su misma "
+        "base. Con --restore devuelve pistas archivadas a la tabla de pistas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=180, help="Antigüedad mínima de la retirada")
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help="Solo contar lo que se archivaría")
+        parser.add_argument(
+            '--restore', type=int, nargs='+', metavar='TRACK_ID',
+            help="Ids de pistas archivadas a restaurar (siguen retiradas)"
+        )
+
+    def handle(self, *args, **options):
+        if options['days'] < 0 or options['batch_size'] < 1:
+            raise CommandError("--days no puede ser negativo y --batch-size debe ser mayor que 0")
+
+        changed = []
+        for alias in [DEFAULT_DB_ALIAS] + get_shards() + get_retired_shards():
+            tables = connections[alias].introspection.table_names()
+            if Track._meta.db_table not in tables:
+                continue
+            if not options['dry_run']:
+                self._ensure_archive_tables(alias, tables)
+                changed.append(alias)
+            if options['restore']:
+                restored = self._restore(alias, options['restore'])
+                self.stdout.write(f"{alias}: {restored} pistas restauradas")
+            else:
+                archived = self._archive(alias, options)
+                verb = "se archivarían" if options['dry_run'] else "archivadas"
+                self.stdout.write(f"{alias}: {archived} pistas {verb}")
+        # Los procesos en marcha vuelven a leer las tablas frías al numerar pistas
+        if changed:
+            publish(ARCHIVE_EVENT, changed)
+
+    def _ensure_archive_tables(self, alias, tables):
+        with connections[alias].schema_editor() as editor:
+            for model in (ArchivedTrack, ArchivedTrackGenre):
+                if model._meta.db_table not in tables:
+                    editor.create_model(model)
+
+    def _archive(self, alias, options):
+        now = timezone.now()
+        retired = Track.objects.using(alias).filter(status=ReleaseStatus.RETIRED)
+        if options['dry_run']:
+            # Sin fecha de retirada (anteriores a retired_at) empiezan a contar ahora
+            return retired.filter(retired_at__lt=now - timedelta(days=options['days'])).count()
+        retired.filter(retired_at__isnull=True).update(retired_at=now)
+
+        archived = 0
+        candidates = retired.filter(retired_at__lt=now - timedelta(days=options['days'])).order_by('pk')
+        while True:
+            batch = list(candidates[:options['batch_size']])
+            if not batch:
+                return archived
+            pks = [track.pk for track in batch]
+            links = list(
+                TrackGenre.objects.using(alias).filter(track_id__in=pks).values_list('track_id', 'genre_id')
+            )
+            with transaction.atomic(using=alias):
+                ArchivedTrack.objects.using(alias).bulk_create(
+                    [_copy(track, ArchivedTrack, archived_at=now) for track in batch],
+                    ignore_conflicts=True,
+                )
+                ArchivedTrackGenre.objects.using(alias).bulk_create(
+                    [ArchivedTrackGenre(track_id=track_pk, genre_id=genre_pk) for track_pk, genre_pk in links],
+                    ignore_conflicts=True,
+                )
+                # delete() del ORM: también quita sus filas de géneros
+                Track.objects.using(alias).filter(pk__in=pks).delete()
+                # Las pistas archivadas dejan de contar en los totales de su álbum y artista
+                refresh_album_aggregates({track.album_id_id for track in batch})
+                refresh_artist_genres({track.artist_id_id for track in batch})
+            archived += len(batch)
+
+    def _restore(self, alias, pks):
+        archived = list(ArchivedTrack.objects.using(alias).filter(pk__in=pks))
+        if not archived:
+            return 0
+        pks = [track.pk for track in archived]
+        links = list(ArchivedTrackGenre.objects.using(alias).filter(track_id__in=pks).values_list(
+            'track_id', 'genre_id'
+        ))
+        # El artista o el álbum pueden haberse borrado mientras estaba archivada
+        artists = set(Artist.objects.filter(
+            pk__in={track.artist_id_id for track in archived}
+        ).values_list('pk', flat=True))
+        albums = set(Album.objects.filter(
+            pk__in={track.album_id_id for track in archived}
+        ).values_list('pk', flat=True))
+        for track in archived:
+            if track.artist_id_id not in artists:
+                track.artist_id_id = None
+            if track.album_id_id not in albums:
+                track.album_id_id = None
+
+        with transaction.atomic(using=alias):
+            # retired_at nuevo: la pista no vuelve al archivo en la siguiente pasada
+            Track.objects.using(alias).bulk_create(
+                [_copy(track, Track, retired_at=timezone.now()) for track in archived]
+            )
+            TrackGenre.objects.using(alias).bulk_create(
+                [TrackGenre(track_id=track_pk, genre_id=genre_pk) for track_pk, genre_pk in links]
+            )
+            ArchivedTrack.objects.using(alias).filter(pk__in=pks).delete()
+            refresh_album_aggregates({track.album_id_id for track in archived})
+            refresh_artist_genres({track.artist_id_id for track in archived})
+            tracks_changed.send(sender=Track, track_pks=pks, using=alias)
+        return len(archived)
@@ -0,0 +1,128 @@
+import asyncio
+import os
+import shutil
+import statistics
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.test import AsyncClient, Client
+from django.test.utils import override_settings
+
+from album.models import Album
+from artist.models import Artist
+from core.sharding import bulk_create_tracks
+from country.models import Country
+from track.models import Track
+
+
+def summarize(latencies, elapsed):
+    latencies = sorted(latencies)
+    p99 = latencies[min(len(latencies) - 1, int(0.99 * len(latencies)))]
+    return len(latencies) / elapsed, statistics.median(latencies), p99
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara las acciones de lectura síncronas (WSGI, un hilo por petición) con "
+        "las vistas asíncronas /async/... (ASGI) sobre una base de datos temporal."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=400, help="Peticiones por escenario")
+        parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 8, 32])
+        parser.add_argument('--albums', type=int, default=20, help="Álbumes del artista de prueba")
+        parser.add_argument('--tracks', type=int, default=100, help="Pistas del artista de prueba")
+
+    def handle(self, *args, **options):
+        if options['requests'] < 1 or min(options['concurrency']) < 1:
+            raise CommandError("--requests y --concurrency deben ser mayores que 0")
+
+        db_settings = connections.settings[DEFAULT_DB_ALIAS]
+        original = {key: db_settings.get(key) for key in ('NAME', 'CONN_MAX_AGE')}
+        workdir = tempfile.mkdtemp(prefix='bench_async_')
+        connections[DEFAULT_DB_ALIAS].close()
+        db_settings.update({'NAME': os.path.join(workdir, 'bench.sqlite3'), 'CONN_MAX_AGE': None})
+        try:
+            with override_settings(ALLOWED_HOSTS=['testserver'], DATABASE_REPLICAS=[]):
+                artist, country = self._prepare(options)
+                scenarios = [
+                    ('artist albums', f'/api/v1/artists/{artist.pk}/albums/',
+                     f'/api/v1/async/artists/{artist.pk}/albums/'),
+                    ('artist tracks', f'/api/v1/artists/{artist.pk}/tracks/',
+                     f'/api/v1/async/artists/{artist.pk}/tracks/'),
+                    ('country artists', f'/api/v1/countries/{country.pk}/artists/',
+                     f'/api/v1/async/countries/{country.pk}/artists/'),
+                ]
+                self.stdout.write(
+                    f"{'escenario':<18}{'conc':>5}{'wsgi req/s':>12}{'p50':>8}{'p99':>8}"
+                    f"{'asgi req/s':>12}{'p50':>8}{'p99':>8}"
+                )
+                for name, sync_url, async_url in scenarios:
+                    for concurrency in options['concurrency']:
+                        sync_stats = self._bench_wsgi(sync_url, options['requests'], concurrency)
+                        async_stats = asyncio.run(
+                            self._bench_asgi(async_url, options['requests'], concurrency)
+                        )
+                        self.stdout.write(
+                            f"{name:<18}{concurrency:>5}"
+                            f"{sync_stats[0]:>12.0f}{sync_stats[1]:>8.1f}{sync_stats[2]:>8.1f}"
+                            f"{async_stats[0]:>12.0f}{async_stats[1]:>8.1f}{async_stats[2]:>8.1f}"
+                        )
+        finally:
+            connections.close_all()
+            db_settings.update(original)
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    def _prepare(self, options):
+        call_command('migrate', run_syncdb=True, verbosity=0, interactive=False)
+        country = Country.objects.create(name='Benchmark', iso_code='BX', iso_code_3='BXX')
+        artist = Artist.objects.create(name='Benchmark artist', country=country)
+        Artist.objects.bulk_create([
+            Artist(name=f'Benchmark artist {i}', country=country) for i in range(20)
+        ])
+        albums = Album.objects.bulk_create([
+            Album(artist_id=artist, title=f'Album {i}', release_date='2020-01-01')
+            for i in range(options['albums'])
+        ])
+        bulk_create_tracks([
+            Track(artist_id=artist, album_id=albums[i % len(albums)] if albums else None,
+                  title=f'Track {i}', duration_sec=180,
+                  audio_master_url='https://example.com/master.wav')
+            for i in range(options['tracks'])
+        ])
+        return artist, country
+
+    def _bench_wsgi(self, url, total, concurrency):
+        def call(_):
+            began = time.perf_counter()
+            response = Client().get(url)
+            assert response.status_code == 200, response.status_code
+            return (time.perf_counter() - began) * 1000
+
+        def worker_close(_):
+            connections.close_all()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as pool:
+            latencies = list(pool.map(call, range(total)))
+            list(pool.map(worker_close, range(concurrency)))
+        return summarize(latencies, time.perf_counter() - started)
+
+    async def _bench_asgi(self, url, total, concurrency):
+        semaphore = asyncio.Semaphore(concurrency)
+        client = AsyncClient()
+
+        async def call():
+            async with semaphore:
+                began = time.perf_counter()
+                response = await client.get(url)
+                assert response.status_code == 200, response.status_code
+                return (time.perf_counter() - began) * 1000
+
+        started = time.perf_counter()
+        latencies = await asyncio.gather(*(call() for _ in range(total)))
+        return summarize(latencies, time.perf_counter() - started)
@@ -0,0 +1,175 @@
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.ids import uuid7
+from core.sqlite import pragma_statements
+
+SCENARIOS = [
+    ('uuid4', 'text'),
+    ('uuid7', 'text'),
+    ('uuid4', 'binary'),
+    ('uuid7', 'binary'),
+]
+
+# Mismo esquema que generan los modelos (clave UUID + índices de FK)
+SCHEMA = '''
+CREATE TABLE artists (artist_id {key} NOT NULL PRIMARY KEY, name varchar(200) NOT NULL);
+CREATE TABLE albums (
+    id {key} NOT NULL PRIMARY KEY, artist_id_id {key} NOT NULL REFERENCES artists (artist_id),
+    title varchar(255) NOT NULL, release_date date NOT NULL
+);
+CREATE INDEX albums_artist_release ON albums (artist_id_id, release_date DESC, title);
+CREATE TABLE tracks (
+    id integer NOT NULL PRIMARY KEY AUTOINCREMENT,
+    artist_id_id {key} NULL REFERENCES artists (artist_id),
+    album_id_id {key} NULL REFERENCES albums (id),
+    title varchar(200) NOT NULL, duration_sec integer NOT NULL
+);
+CREATE INDEX tracks_artist_title ON tracks (artist_id_id, title);
+CREATE INDEX tracks_album_title ON tracks (album_id_id, title);
+'''
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara claves UUIDv4/UUIDv7 guardadas como texto o BLOB en un catálogo "
+        "sintético: velocidad de inserción, tamaño de índices y coste de los JOIN."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=1_000_000, help="Pistas del catálogo sintético")
+        parser.add_argument('--tracks-per-album', type=int, default=10)
+        parser.add_argument('--albums-per-artist', type=int, default=5)
+        parser.add_argument('--batch-size', type=int, default=10_000, help="Filas por transacción")
+        parser.add_argument('--joins', type=int, default=2000, help="Consultas de JOIN por artista")
+        parser.add_argument(
+            '--scenarios', nargs='+', default=[f'{scheme}-{storage}' for scheme, storage in SCENARIOS],
+            choices=[f'{scheme}-{storage}' for scheme, storage in SCENARIOS]
+        )
+
+    def handle(self, *args, **options):
+        if min(options['rows'], options['tracks_per_album'], options['albums_per_artist'],
+               options['batch_size'], options['joins']) < 1:
+            raise CommandError("Todos los parámetros deben ser mayores que 0")
+
+        workdir = tempfile.mkdtemp(prefix='bench_pk_')
+        self.stdout.write(
+            f"{options['rows']} pistas, {options['tracks_per_album']} por álbum, "
+            f"{options['albums_per_artist']} álbumes por artista"
+        )
+        self.stdout.write(
+            f"{'escenario':<14}{'filas/s':>10}{'fichero MB':>12}{'índices MB':>12}"
+            f"{'join µs':>10}{'scan join s':>13}"
+        )
+        try:
+            for scenario in options['scenarios']:
+                scheme, storage = scenario.split('-')
+                path = os.path.join(workdir, f'{scenario}.sqlite3')
+                result = self._run(path, scheme, storage, options)
+                self.stdout.write(
+                    f"{scenario:<14}{result['rows_per_sec']:>10.0f}{result['file_mb']:>12.1f}"
+                    f"{result['index_mb']:>12.1f}{result['join_us']:>10.1f}{result['scan_join_s']:>13.2f}"
+                )
+        finally:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    def _run(self, path, scheme, storage, options):
+        generate = uuid7 if scheme == 'uuid7' else uuid.uuid4
+        encode = (lambda value: value.bytes) if storage == 'binary' else (lambda value: value.hex)
+        key_type = 'BLOB' if storage == 'binary' else 'char(32)'
+
+        connection = sqlite3.connect(path, isolation_level=None)
+        for statement in pragma_statements('production'):
+            connection.execute(statement)
+        connection.executescript(SCHEMA.format(key=key_type))
+
+        tracks_per_album = options['tracks_per_album']
+        albums_per_artist = options['albums_per_artist']
+        n_albums = max(1, options['rows'] // tracks_per_album)
+        n_artists = max(1, n_albums // albums_per_artist)
+        batch_size = options['batch_size']
+
+        artists = []
+        inserted = 0
+        started = time.perf_counter()
+        # Las filas se generan en el orden en que llegarían a la aplicación
+        for start in range(0, n_artists, batch_size):
+            batch = [(encode(generate()), f'Artist {i}') for i in range(start, min(n_artists, start + batch_size))]
+            artists.extend(key for key, _ in batch)
+            self._insert(connection, 'INSERT INTO artists VALUES (?, ?)', batch)
+            inserted += len(batch)
+
+        pending_tracks = []
+        for start in range(0, n_albums, batch_size):
+            albums = []
+            for i in range(start, min(n_albums, start + batch_size)):
+                artist = artists[i // albums_per_artist % n_artists]
+                album = encode(generate())
+                albums.append((album, artist, f'Album {i}', '2020-01-01'))
+                pending_tracks.extend(
+                    (artist, album, f'Track {i}-{n}', 180) for n in range(tracks_per_album)
+                )
+            self._insert(connection, 'INSERT INTO albums VALUES (?, ?, ?, ?)', albums)
+            inserted += len(albums)
+            while len(pending_tracks) >= batch_size:
+                batch, pending_tracks = pending_tracks[:batch_size], pending_tracks[batch_size:]
+                self._insert_tracks(connection, batch)
+                inserted += len(batch)
+        if pending_tracks:
+            self._insert_tracks(connection, pending_tracks)
+            inserted += len(pending_tracks)
+        rows_per_sec = inserted / (time.perf_counter() - started)
+
+        connection.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+        connection.execute('ANALYZE')
+        index_bytes = connection.execute(
+            "SELECT COALESCE(SUM(pgsize), 0) FROM dbstat WHERE name IN "
+            "(SELECT name FROM sqlite_schema WHERE type = 'index')"
+        ).fetchone()[0]
+
+        # JOIN pista -> álbum para artistas al azar (lo que hace /artists/{id}/albums)
+        sample = random.sample(artists, min(options['joins'], len(artists)))
+        query = (
+            'SELECT t.id, t.title, a.title FROM albums a '
+            'JOIN tracks t ON t.album_id_id = a.id WHERE a.artist_id_id = ?'
+        )
+        began = time.perf_counter()
+        for artist in sample:
+            connection.execute(query, (artist,)).fetchall()
+        join_us = (time.perf_counter() - began) / len(sample) * 1_000_000
+
+        # JOIN completo: todas las pistas con su álbum y su artista
+        began = time.perf_counter()
+        connection.execute(
+            'SELECT COUNT(*), SUM(LENGTH(ar.name)) FROM tracks t '
+            'JOIN albums a ON a.id = t.album_id_id JOIN artists ar ON ar.artist_id = a.artist_id_id'
+        ).fetchone()
+        scan_join_s = time.perf_counter() - began
+        connection.close()
+
+        return {
+            'rows_per_sec': rows_per_sec,
+            'file_mb': os.path.getsize(path) / 1024 / 1024,
+            'index_mb': index_bytes / 1024 / 1024,
+            'join_us': join_us,
+            'scan_join_s': scan_join_s,
+        }
+
+    def _insert(self, connection, sql, rows):
+        connection.execute('BEGIN')
+        connection.executemany(sql, rows)
+        connection.execute('COMMIT')
+
+    def _insert_tracks(self, connection, rows):
+        self._insert(
+            connection,
+            'INSERT INTO tracks (artist_id_id, album_id_id, title, duration_sec) VALUES (?, ?, ?, ?)',
+            rows
+        )
@@ -0,0 +1,163 @@
+import multiprocessing
+import os
+import random
+import shutil
+import statistics
+import tempfile
+import time
+import uuid
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from core.sqlite import PROFILES
+from genre.models import Genre
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    index = min(len(values) - 1, int(round(pct / 100 * (len(values) - 1))))
+    return values[index]
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide la latencia de lectura (p50/p99) bajo carga de escritura concurrente "
+        "con cada perfil de SQLite, sobre una base de datos temporal."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--profiles', nargs='+', choices=sorted(PROFILES), default=['default', 'production']
+        )
+        parser.add_argument('--readers', type=int, default=8, help="Procesos lectores")
+        parser.add_argument('--writers', type=int, default=4, help="Procesos escritores")
+        parser.add_argument(
+            '--write-rate', type=float, default=25.0,
+            help="Escrituras por segundo de cada escritor, para comparar con la misma carga"
+        )
+        parser.add_argument('--seconds', type=float, default=5.0)
+        parser.add_argument('--rows', type=int, default=5000, help="Filas iniciales")
+
+    def handle(self, *args, **options):
+        if options['readers'] < 1 or options['writers'] < 0 or options['seconds'] <= 0:
+            raise CommandError("Parámetros de carga no válidos")
+
+        db_settings = connections.settings[DEFAULT_DB_ALIAS]
+        if db_settings['ENGINE'] != 'django.db.backends.sqlite3':
+            raise CommandError("benchmark_sqlite solo está disponible para SQLite")
+        original = {key: db_settings.get(key) for key in ('NAME', 'PRAGMAS', 'CONN_MAX_AGE')}
+        workdir = tempfile.mkdtemp(prefix='bench_sqlite_')
+
+        self.stdout.write(
+            f"{options['readers']} lectores, {options['writers']} escritores, {options['seconds']}s"
+        )
+        self.stdout.write(
+            f"{'perfil':<12}{'lecturas':>10}{'p50 ms':>9}{'p99 ms':>9}{'máx ms':>9}"
+            f"{'escrituras':>12}{'errores':>9}"
+        )
+        try:
+            for profile in options['profiles']:
+                connections[DEFAULT_DB_ALIAS].close()
+                # Los DatabaseWrapper de todas las conexiones comparten este diccionario
+                db_settings.update({
+                    'NAME': os.path.join(workdir, f'{profile}.sqlite3'),
+                    'PRAGMAS': profile,
+                    'CONN_MAX_AGE': None,
+                })
+                self._prepare(options['rows'])
+                self._run(profile, options)
+        finally:
+            connections[DEFAULT_DB_ALIAS].close()
+            db_settings.update(original)
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    def _prepare(self, rows):
+        call_command('migrate', run_syncdb=True, verbosity=0, interactive=False)
+        Genre.objects.bulk_create(
+            [Genre(name=f'bench-{i:07d}') for i in range(rows)], batch_size=1000
+        )
+
+    def _run(self, profile, options):
+        # Procesos (fork) en vez de hilos para que el GIL no distorsione las latencias
+        connections.close_all()
+        context = multiprocessing.get_context('fork')
+        stop = context.Event()
+        results = context.Queue()
+        workers = [
+            context.Process(target=_reader, args=(stop, results, options['rows']))
+            for _ in range(options['readers'])
+        ]
+        workers += [
+            context.Process(target=_writer, args=(stop, results, options['rows'], options['write_rate']))
+            for _ in range(options['writers'])
+        ]
+        for worker in workers:
+            worker.start()
+        time.sleep(options['seconds'])
+        stop.set()
+
+        latencies = []
+        writes = errors = 0
+        for _ in workers:
+            kind, values, worker_errors = results.get()
+            errors += worker_errors
+            if kind == 'read':
+                latencies.extend(values)
+            else:
+                writes += values
+        for worker in workers:
+            worker.join()
+
+        self.stdout.write(
+            f"{profile:<12}{len(latencies):>10}"
+            f"{statistics.median(latencies) if latencies else 0:>9.2f}"
+            f"{percentile(latencies, 99):>9.2f}{max(latencies, default=0):>9.2f}"
+            f"{writes:>12}{errors:>9}"
+        )
+
+
+def _reader(stop, results, rows):
+    latencies = []
+    errors = 0
+    try:
+        while not stop.is_set():
+            start = f'bench-{random.randrange(rows):07d}'
+            began = time.perf_counter()
+            try:
+                list(Genre.objects.filter(name__gte=start).order_by('name')[:20])
+            except Exception:
+                errors += 1
+                continue
+            latencies.append((time.perf_counter() - began) * 1000)
+    finally:
+        connections.close_all()
+        results.put(('read', latencies, errors))
+
+
+def _writer(stop, results, rows, write_rate):
+    interval = 1 / write_rate if write_rate > 0 else 0
+    next_write = time.monotonic()
+    writes = errors = 0
+    try:
+        while not stop.is_set():
+            next_write += interval
+            delay = next_write - time.monotonic()
+            if delay > 0 and stop.wait(delay):
+                break
+            try:
+                with transaction.atomic():
+                    Genre.objects.create(name=f'bench-w-{uuid.uuid4().hex}')
+                    Genre.objects.filter(
+                        name=f'bench-{random.randrange(rows):07d}'
+                    ).update(description=uuid.uuid4().hex)
+            except Exception:
+                errors += 1
+                continue
+            writes += 1
+    finally:
+        connections.close_all()
+        results.put(('write', writes, errors))
@@ -0,0 +1,111 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Proceso hijo: carga la aplicación WSGI (como un worker recién creado) y
+# atiende una petición GET sin servidor HTTP
+CHILD = '''
+import io, json, sys, time
+started = time.perf_counter()
+from backend_contenido.wsgi import application
+loaded = time.perf_counter()
+from django.conf import settings
+settings.ALLOWED_HOSTS = [*settings.ALLOWED_HOSTS, 'testserver']
+path, _, query = sys.argv[1].partition('?')
+environ = {
+    'REQUEST_METHOD': 'GET', 'PATH_INFO': path, 'QUERY_STRING': query, 'SERVER_NAME': 'testserver',
+    'SERVER_PORT': '80', 'HTTP_HOST': 'testserver', 'wsgi.url_scheme': 'http', 'wsgi.input': io.BytesIO(),
+    'wsgi.errors': sys.stderr, 'wsgi.version': (1, 0), 'wsgi.multithread': False,
+    'wsgi.multiprocess': True, 'wsgi.run_once': False,
+}
+status = []
+body = b''.join(application(environ, lambda s, headers, exc_info=None: status.append(s)))
+done = time.perf_counter()
+print(json.dumps({
+    'status': status[0], 'bytes': len(body),
+    'load': loaded - started, 'first_response': done - loaded,
+}))
+'''
+
+
+def parse_importtime(stderr):
+    """Líneas de ``-X importtime``: [(módulo, propio µs, acumulado µs)]"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        parts = line[len('import time:'):].split('|')
+        if len(parts) != 3 or not parts[0].strip().isdigit():
+            continue  # cabecera
+        rows.append((parts[2].strip(), int(parts[0]), int(parts[1])))
+    return rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide el arranque en frío: desglose de ``python -X importtime`` por paquete "
+        "y tiempo hasta la primera respuesta de un proceso nuevo, para cada "
+        "DEPLOYMENT_ROLE indicado."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--runs', type=int, default=5, help="Procesos por papel")
+        parser.add_argument('--path', default='/api/v1/genres/', help="Ruta de la primera petición")
+        parser.add_argument('--roles', nargs='+', choices=['full', 'api'], default=['full', 'api'])
+        parser.add_argument('--top', type=int, default=15, help="Paquetes y módulos del desglose")
+
+    def handle(self, *args, **options):
+        if options['runs'] < 1:
+            raise CommandError("--runs debe ser mayor que 0")
+        for role in options['roles']:
+            env = {**os.environ, 'DEPLOYMENT_ROLE': role, 'WARMUP_ON_START': ''}
+            self.stdout.write(self.style.MIGRATE_HEADING(f"DEPLOYMENT_ROLE={role}"))
+            self.import_breakdown(env, options)
+            self.first_response(env, options)
+
+    def run_child(self, env, options, *flags):
+        return subprocess.run(
+            [sys.executable, *flags, '-c', CHILD, options['path']],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+
+    def import_breakdown(self, env, options):
+        result = self.run_child(env, options, '-X', 'importtime')
+        if result.returncode:
+            raise CommandError(result.stderr[-2000:])
+        rows = parse_importtime(result.stderr)
+        per_package = defaultdict(int)
+        for module, own, _ in rows:
+            per_package[module.split('.')[0]] += own
+        total = sum(per_package.values())
+        self.stdout.write(f"Importaciones: {len(rows)} módulos, {total / 1000:.1f} ms (tiempo propio)")
+        for package, own in sorted(per_package.items(), key=lambda item: -item[1])[:options['top']]:
+            self.stdout.write(f"  {package:<28} {own / 1000:8.1f} ms  {100 * own / total:5.1f}%")
+        self.stdout.write("Módulos con más tiempo acumulado:")
+        for module, _, cumulative in sorted(rows, key=lambda row: -row[2])[:options['top']]:
+            self.stdout.write(f"  {module:<48} {cumulative / 1000:8.1f} ms")
+
+    def first_response(self, env, options):
+        walls, loads, firsts = [], [], []
+        for _ in range(options['runs']):
+            started = time.perf_counter()
+            result = self.run_child(env, options)
+            walls.append(time.perf_counter() - started)
+            if result.returncode:
+                raise CommandError(result.stderr[-2000:])
+            report = json.loads(result.stdout.strip().splitlines()[-1])
+            loads.append(report['load'])
+            firsts.append(report['first_response'])
+        self.stdout.write(
+            f"Primera respuesta ({report['status']}, {options['runs']} procesos, mediana): "
+            f"proceso {statistics.median(walls) * 1000:.1f} ms = "
+            f"carga de la aplicación {statistics.median(loads) * 1000:.1f} ms + "
+            f"primera petición {statistics.median(firsts) * 1000:.1f} ms + intérprete"
+        )
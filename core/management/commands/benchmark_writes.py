@@ -0,0 +1,99 @@
+import threading
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections, connection, transaction
+
+from core.write_queue import DEFAULTS, WriteQueue
+from genre.models import Genre
+
+
+BENCHMARK_PREFIX = '__bench_write__'
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara el rendimiento de escritura directa (una transacción por petición) "
+        "con la cola de escritura agrupada, con 1, 8 y 32 escritores concurrentes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--writers', type=int, nargs='+', default=[1, 8, 32],
+            help="Número de hilos escritores a probar (por defecto 1 8 32)"
+        )
+        parser.add_argument(
+            '--ops', type=int, default=200,
+            help="Escrituras por hilo (por defecto 200)"
+        )
+        parser.add_argument(
+            '--mode', choices=['direct', 'queue', 'both'], default='both',
+            help="Camino de escritura a medir"
+        )
+        parser.add_argument('--max-batch', type=int, default=DEFAULTS['MAX_BATCH'])
+        parser.add_argument('--max-delay-ms', type=float, default=DEFAULTS['MAX_DELAY_MS'])
+
+    def handle(self, *args, **options):
+        if options['ops'] < 1 or min(options['writers']) < 1:
+            raise CommandError("--ops y --writers deben ser mayores que 0")
+
+        modes = ['direct', 'queue'] if options['mode'] == 'both' else [options['mode']]
+        self.stdout.write(f"Base de datos: {connection.vendor} ({connection.settings_dict['NAME']})")
+        self.stdout.write(f"{'modo':<8}{'hilos':>6}{'escrituras':>12}{'errores':>9}{'seg':>8}{'escr/s':>10}{'lotes':>7}")
+
+        try:
+            for writers in options['writers']:
+                for mode in modes:
+                    self._run(mode, writers, options)
+        finally:
+            Genre.objects.filter(name__startswith=BENCHMARK_PREFIX).delete()
+
+    def _run(self, mode, writers, options):
+        write_queue = None
+        if mode == 'queue':
+            write_queue = WriteQueue(options['max_batch'], options['max_delay_ms'])
+            write_queue.start()
+
+        errors = []
+        barrier = threading.Barrier(writers + 1)
+
+        def unit():
+            return Genre.objects.create(name=f'{BENCHMARK_PREFIX}{uuid.uuid4().hex}')
+
+        def worker():
+            barrier.wait()
+            try:
+                for _ in range(options['ops']):
+                    try:
+                        if write_queue is not None:
+                            write_queue.run(unit)
+                        else:
+                            with transaction.atomic():
+                                unit()
+                    except Exception as exc:
+                        errors.append(exc)
+            finally:
+                close_old_connections()
+                connection.close()
+
+        threads = [threading.Thread(target=worker) for _ in range(writers)]
+        for thread in threads:
+            thread.start()
+        barrier.wait()
+        started_at = time.monotonic()
+        for thread in threads:
+            thread.join()
+        elapsed = max(time.monotonic() - started_at, 1e-9)
+
+        batches = ''
+        if write_queue is not None:
+            write_queue.stop()
+            batches = write_queue.batches
+
+        done = writers * options['ops'] - len(errors)
+        self.stdout.write(
+            f"{mode:<8}{writers:>6}{done:>12}{len(errors):>9}{elapsed:>8.2f}{done / elapsed:>10.0f}{batches:>7}"
+        )
+        if errors:
+            self.stderr.write(f"  primer error: {errors[0]!r}")
@@ -0,0 +1,140 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+
+from album.models import Album
+from core.aggregates import refresh_album_aggregates
+from core.sharding import (
+    IN_BATCH_SIZE, assign_track_numbers, get_retired_shards, get_shards, tracks_changed,
+)
+from track.models import Track
+
+# Tabla de la antigua relación Album.track_list (ManyToMany con Track)
+LEGACY_TABLE = 'albums_track_list'
+
+
+def _chunks(values, size=IN_BATCH_SIZE):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+class Command(BaseCommand):
+    help = (
+        "Pasa la antigua relación Album.track_list (tabla albums_track_list) a "
+        "Track.album_id y numera las pistas de álbum sin track_number en el "
+        "orden anterior (por título). Ejecuta antes sync_schema para crear las "
+        "columnas disc_number y track_number."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Solo contar los cambios")
+        parser.add_argument(
+            '--keep-table', action='store_true', help=f"No eliminar {LEGACY_TABLE} al terminar"
+        )
+
+    def handle(self, *args, **options):
+        aliases = [DEFAULT_DB_ALIAS] + get_shards() + get_retired_shards()
+        aliases = [
+            alias for alias in aliases
+            if Track._meta.db_table in connections[alias].introspection.table_names()
+        ]
+        for alias in aliases:
+            with connections[alias].cursor() as cursor:
+                columns = {
+                    column.name
+                    for column in connections[alias].introspection.get_table_description(
+                        cursor, Track._meta.db_table
+                    )
+                }
+            if 'track_number' not in columns:
+                raise CommandError(f"{alias}: falta la columna tracks.track_number; ejecuta sync_schema")
+
+        dry_run = options['dry_run']
+        touched = set()
+        adopted, skipped = self._adopt_legacy(aliases, dry_run, touched)
+        self.stdout.write(f"{adopted} pistas pasan a su álbum de track_list, {skipped} se quedan como estaban")
+        numbered = self._number(aliases, dry_run)
+        self.stdout.write(f"{numbered} pistas numeradas")
+        if dry_run:
+            self.stdout.write("Simulación: no se ha modificado ninguna base")
+            return
+
+        refresh_album_aggregates(touched)
+        if not options['keep_table']:
+            for alias in aliases:
+                with connections[alias].schema_editor() as editor:
+                    editor.execute(f'DROP TABLE IF EXISTS {editor.quote_name(LEGACY_TABLE)}')
+            self.stdout.write(f"{LEGACY_TABLE} eliminada")
+
+    def _legacy_links(self):
+        """{pk de pista: pk del álbum}; si una pista estaba en varios, el de fecha más antigua"""
+        connection = connections[DEFAULT_DB_ALIAS]
+        if LEGACY_TABLE not in connection.introspection.table_names():
+            return {}, 0
+        quote = connection.ops.quote_name
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT l.track_id, l.album_id FROM {quote(LEGACY_TABLE)} l "
+                f"JOIN {quote(Album._meta.db_table)} a ON a.id = l.album_id "
+                f"ORDER BY a.release_date, a.id"
+            )
+            rows = cursor.fetchall()
+        pk_field = Album._meta.pk
+        links = {}
+        for track_pk, album_pk in rows:
+            links.setdefault(track_pk, pk_field.from_db_value(album_pk, None, connection))
+        return links, len(rows) - len(links)
+
+    def _adopt_legacy(self, aliases, dry_run, touched):
+        """Asigna el álbum de track_list a las pistas que no tienen álbum"""
+        links, duplicated = self._legacy_links()
+        by_album = defaultdict(list)
+        for track_pk, album_pk in links.items():
+            by_album[album_pk].append(track_pk)
+
+        adopted = 0
+        for alias in aliases:
+            tracks = Track.objects.using(alias).filter(album_id__isnull=True)
+            with transaction.atomic(using=alias):
+                for album_pk, track_pks in by_album.items():
+                    for chunk in _chunks(track_pks):
+                        pending = tracks.filter(pk__in=chunk)
+                        count = pending.count() if dry_run else pending.update(album_id=album_pk)
+                        if count:
+                            adopted += count
+                            touched.add(album_pk)
+                            if not dry_run:
+                                tracks_changed.send(sender=Track, track_pks=chunk, using=alias)
+        # Pistas repetidas en varios álbumes o que ya tenían otro álbum
+        return adopted, duplicated + len(links) - adopted
+
+    def _number(self, aliases, dry_run):
+        """Numera por título las pistas de cada álbum que aún no tienen número"""
+        album_pks = set()
+        for alias in aliases:
+            album_pks.update(
+                Track.objects.using(alias).filter(
+                    album_id__isnull=False, track_number__isnull=True
+                ).order_by().values_list('album_id', flat=True).distinct()
+            )
+
+        numbered = 0
+        for chunk in _chunks(sorted(album_pks)):
+            tracks = []
+            for alias in aliases:
+                tracks += Track.objects.using(alias).filter(album_id__in=chunk, track_number__isnull=True)
+            # Cada disco se numera por separado, en el orden que tenía (título)
+            tracks.sort(key=lambda track: (track.title, track.pk))
+            assign_track_numbers(tracks)
+            numbered += len(tracks)
+            if dry_run:
+                continue
+            by_alias = defaultdict(list)
+            for track in tracks:
+                by_alias[track._state.db].append(track)
+            for alias, group in by_alias.items():
+                Track.objects.using(alias).bulk_update(group, ['track_number'], batch_size=IN_BATCH_SIZE // 2)
+                tracks_changed.send(sender=Track, track_pks=[track.pk for track in group], using=alias)
+        return numbered
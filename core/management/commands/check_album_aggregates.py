@@ -0,0 +1,56 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from album.models import Album
+from core.aggregates import AGGREGATE_FIELDS, compute_album_aggregates
+from core.sharding import IN_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = (
+        "Compara los totales guardados en cada álbum (track_count, "
+        "total_duration_sec, genre_ids) con los calculados desde sus pistas. "
+        "Con --repair guarda los valores correctos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repair', action='store_true', help="Corregir los álbumes con diferencias")
+        parser.add_argument('--batch-size', type=int, default=IN_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        if not 0 < options['batch_size'] <= IN_BATCH_SIZE:
+            raise CommandError(f"--batch-size debe estar entre 1 y {IN_BATCH_SIZE}")
+
+        checked = wrong = 0
+        last_pk = None
+        while True:
+            # Recorrido por clave primaria: cada lote es una búsqueda por índice
+            albums = Album.objects.order_by('pk').only('pk', *AGGREGATE_FIELDS)
+            if last_pk is not None:
+                albums = albums.filter(pk__gt=last_pk)
+            batch = list(albums[:options['batch_size']])
+            if not batch:
+                break
+            last_pk = batch[-1].pk
+
+            expected = compute_album_aggregates([album.pk for album in batch])
+            stale = []
+            for album in batch:
+                values = expected[album.pk]
+                diffs = [
+                    f"{name} {getattr(album, name)!r} -> {values[name]!r}"
+                    for name in AGGREGATE_FIELDS if getattr(album, name) != values[name]
+                ]
+                if diffs:
+                    self.stdout.write(f"  {album.pk}: {', '.join(diffs)}")
+                    for name in AGGREGATE_FIELDS:
+                        setattr(album, name, values[name])
+                    stale.append(album)
+            if options['repair'] and stale:
+                Album.objects.bulk_update(stale, AGGREGATE_FIELDS, batch_size=IN_BATCH_SIZE // 4)
+            checked += len(batch)
+            wrong += len(stale)
+
+        verb = "corregidos" if options['repair'] else "con diferencias"
+        self.stdout.write(f"{checked} álbumes revisados, {wrong} {verb}")
+        if wrong and not options['repair']:
+            self.stdout.write("Ejecuta check_album_aggregates --repair para corregirlos")
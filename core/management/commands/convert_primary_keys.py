@@ -0,0 +1,194 @@
+import uuid
+from collections import defaultdict
+from datetime import timezone as dt_timezone
+
+from django.apps import apps
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils.dateparse import parse_datetime
+
+from core.ids import CompactUUIDField, uuid7
+from core.sharding import get_retired_shards, get_shards
+
+# Correspondencia clave antigua -> nueva mientras dura el renumerado
+REKEY_TABLE = 'pk_rekey_map'
+BATCH_SIZE = 5000
+
+
+def uuid_columns():
+    """{modelo: [(tabla, columna)]} de cada PK UUID y de las columnas que la referencian"""
+    targets = {
+        model for model in apps.get_models()
+        if isinstance(model._meta.pk, CompactUUIDField)
+    }
+    columns = defaultdict(list)
+    for model in apps.get_models(include_auto_created=True):
+        for field in model._meta.concrete_fields:
+            if field.primary_key and model in targets:
+                columns[model].append((model._meta.db_table, field.column))
+            elif field.is_relation and field.related_model in targets:
+                columns[field.related_model].append((model._meta.db_table, field.column))
+    return columns
+
+
+def _to_blob(value):
+    return uuid.UUID(value).bytes if isinstance(value, str) else value
+
+
+def _decode(value):
+    if isinstance(value, (bytes, memoryview)):
+        return uuid.UUID(bytes=bytes(value))
+    return uuid.UUID(value)
+
+
+def _encode(value, binary):
+    return value.bytes if binary else value.hex
+
+
+class Command(BaseCommand):
+    help = (
+        "Convierte las claves UUID (y las columnas que las referencian) entre texto "
+        "y BLOB de 16 bytes y, con --rekey, renumera las filas con UUIDv7 según created_at."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--to', choices=['binary', 'text'], default='binary')
+        parser.add_argument(
+            '--rekey', action='store_true',
+            help="Sustituir las claves no ordenadas por UUIDv7 derivados de created_at"
+        )
+        parser.add_argument(
+            '--database', action='append', dest='databases',
+            help="Alias a convertir (por defecto default y los shards de pistas)"
+        )
+
+    def handle(self, *args, **options):
+        aliases = options['databases'] or [DEFAULT_DB_ALIAS] + get_shards() + get_retired_shards()
+        for alias in aliases:
+            if alias not in connections.settings:
+                raise CommandError(f"Base de datos desconocida: {alias}")
+            if connections[alias].vendor != 'sqlite':
+                raise CommandError("convert_primary_keys solo está disponible para SQLite")
+
+        binary = options['to'] == 'binary'
+        columns = uuid_columns()
+
+        for alias in aliases:
+            converted = self._convert(alias, columns, binary)
+            self.stdout.write(f"{alias}: {converted} valores convertidos a {options['to']}")
+
+        if options['rekey']:
+            self._rekey(aliases, columns, binary)
+
+        if getattr(settings, 'PRIMARY_KEY_STORAGE', 'text') != options['to']:
+            self.stdout.write(self.style.WARNING(
+                f"Recuerde configurar PRIMARY_KEY_STORAGE={options['to']} antes de arrancar la aplicación"
+            ))
+        self.stdout.write(self.style.SUCCESS("Conversión completada"))
+
+    def _existing(self, alias, columns):
+        tables = set(connections[alias].introspection.table_names())
+        return [
+            (table, column)
+            for pairs in columns.values()
+            for table, column in pairs
+            if table in tables
+        ]
+
+    def _convert(self, alias, columns, binary):
+        connection = connections[alias]
+        quote = connection.ops.quote_name
+        connection.ensure_connection()
+        connection.connection.create_function('uuid_to_blob', 1, _to_blob, deterministic=True)
+
+        converted = 0
+        # Una transacción por base: las claves foráneas (diferidas) se
+        # comprueban al final, cuando padres e hijos ya están convertidos
+        with transaction.atomic(using=alias), connection.cursor() as cursor:
+            for table, column in self._existing(alias, columns):
+                table, column = quote(table), quote(column)
+                if binary:
+                    cursor.execute(
+                        f"UPDATE {table} SET {column} = uuid_to_blob({column}) "
+                        f"WHERE typeof({column}) = 'text'"
+                    )
+                else:
+                    cursor.execute(
+                        f"UPDATE {table} SET {column} = lower(hex({column})) "
+                        f"WHERE typeof({column}) = 'blob'"
+                    )
+                converted += cursor.rowcount
+        return converted
+
+    def _build_rekey_map(self, columns, binary):
+        """Crea (una sola vez) la correspondencia en default, para poder reanudar"""
+        connection = connections[DEFAULT_DB_ALIAS]
+        with transaction.atomic(using=DEFAULT_DB_ALIAS), connection.cursor() as cursor:
+            if REKEY_TABLE in connection.introspection.table_names():
+                return
+            cursor.execute(f'CREATE TABLE {REKEY_TABLE} (old_key PRIMARY KEY, new_key NOT NULL)')
+            quote = connection.ops.quote_name
+            for model in columns:
+                if not any(field.name == 'created_at' for field in model._meta.fields):
+                    continue
+                # SQL directo: los valores pueden no estar aún en el formato configurado
+                pk_column = quote(model._meta.pk.column)
+                with connection.cursor() as reader:
+                    reader.execute(
+                        f"SELECT {pk_column}, created_at FROM {quote(model._meta.db_table)} "
+                        f"ORDER BY created_at, {pk_column}"
+                    )
+                    batch = []
+                    for pk, created_at in reader:
+                        pk = _decode(pk)
+                        if pk.version == 7:
+                            continue
+                        created_at = parse_datetime(str(created_at))
+                        if created_at.tzinfo is None:
+                            # Django guarda las fechas de SQLite en UTC sin zona
+                            created_at = created_at.replace(tzinfo=dt_timezone.utc)
+                        timestamp_ms = int(created_at.timestamp() * 1000)
+                        batch.append((_encode(pk, binary), _encode(uuid7(timestamp_ms), binary)))
+                        if len(batch) >= BATCH_SIZE:
+                            cursor.executemany(f'INSERT INTO {REKEY_TABLE} VALUES (%s, %s)', batch)
+                            batch = []
+                    if batch:
+                        cursor.executemany(f'INSERT INTO {REKEY_TABLE} VALUES (%s, %s)', batch)
+
+    def _rekey(self, aliases, columns, binary):
+        self._build_rekey_map(columns, binary)
+        with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+            cursor.execute(f'SELECT old_key, new_key FROM {REKEY_TABLE}')
+            mapping = cursor.fetchall()
+        self.stdout.write(f"Renumerando {len(mapping)} claves")
+
+        # default al final: si algo falla, la correspondencia sigue allí
+        ordered = [alias for alias in aliases if alias != DEFAULT_DB_ALIAS]
+        if DEFAULT_DB_ALIAS in aliases:
+            ordered.append(DEFAULT_DB_ALIAS)
+
+        for alias in ordered:
+            connection = connections[alias]
+            quote = connection.ops.quote_name
+            existing = self._existing(alias, columns)
+            with transaction.atomic(using=alias), connection.cursor() as cursor:
+                if alias != DEFAULT_DB_ALIAS:
+                    cursor.execute(f'CREATE TEMP TABLE {REKEY_TABLE} (old_key PRIMARY KEY, new_key NOT NULL)')
+                    for start in range(0, len(mapping), BATCH_SIZE):
+                        cursor.executemany(
+                            f'INSERT INTO {REKEY_TABLE} VALUES (%s, %s)', mapping[start:start + BATCH_SIZE]
+                        )
+                updated = 0
+                for table, column in existing:
+                    table, column = quote(table), quote(column)
+                    cursor.execute(
+                        f"UPDATE {table} SET {column} = "
+                        f"(SELECT new_key FROM {REKEY_TABLE} WHERE old_key = {table}.{column}) "
+                        f"WHERE {column} IN (SELECT old_key FROM {REKEY_TABLE})"
+                    )
+                    updated += cursor.rowcount
+                cursor.execute(f'DROP TABLE {REKEY_TABLE}')
+            self.stdout.write(f"{alias}: {updated} valores renumerados")
+        # albums.genre_ids guarda ids de géneros dentro de un JSON: no es una columna de clave
+        self.stdout.write("Ejecuta check_album_aggregates --repair para renumerar los genre_ids de los álbumes")
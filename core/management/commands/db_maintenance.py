@@ -0,0 +1,87 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from core.invalidation import prune
+from core.models import InvalidationEvent
+
+
+class Command(BaseCommand):
+    help = (
+        "Mantenimiento de SQLite: ANALYZE, PRAGMA optimize, vacuum incremental "
+        "y checkpoint del WAL."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default=DEFAULT_DB_ALIAS)
+        parser.add_argument(
+            '--vacuum-pages', type=int, default=0,
+            help="Páginas libres a devolver con incremental_vacuum (0 = todas)"
+        )
+        parser.add_argument(
+            '--enable-incremental-vacuum', action='store_true',
+            help="Activar auto_vacuum=INCREMENTAL (requiere un VACUUM completo)"
+        )
+        parser.add_argument(
+            '--checkpoint-mode', choices=['PASSIVE', 'FULL', 'RESTART', 'TRUNCATE'],
+            default='TRUNCATE', help="Modo de wal_checkpoint (por defecto TRUNCATE)"
+        )
+        parser.add_argument('--skip-analyze', action='store_true', help="No ejecutar ANALYZE")
+
+    def handle(self, *args, **options):
+        connection = connections[options['database']]
+        if connection.vendor != 'sqlite':
+            raise CommandError("db_maintenance solo está disponible para SQLite")
+        if options['vacuum_pages'] < 0:
+            raise CommandError("--vacuum-pages no puede ser negativo")
+
+        if options['database'] == DEFAULT_DB_ALIAS and (
+            InvalidationEvent._meta.db_table in connection.introspection.table_names()
+        ):
+            # Antes del vacuum: las páginas de los eventos purgados se devuelven
+            self.stdout.write(f"Eventos de invalidación antiguos eliminados: {prune()}")
+
+        with connection.cursor() as cursor:
+            if not options['skip_analyze']:
+                cursor.execute('ANALYZE')
+                self.stdout.write("ANALYZE completado")
+
+            cursor.execute('PRAGMA optimize')
+            self.stdout.write("PRAGMA optimize completado")
+
+            cursor.execute('PRAGMA auto_vacuum')
+            auto_vacuum = cursor.fetchone()[0]
+            if options['enable_incremental_vacuum'] and auto_vacuum != 2:
+                # El cambio de modo solo se hace efectivo tras un VACUUM completo
+                cursor.execute('PRAGMA auto_vacuum = INCREMENTAL')
+                cursor.execute('VACUUM')
+                auto_vacuum = 2
+                self.stdout.write("auto_vacuum=INCREMENTAL activado (VACUUM completo)")
+
+            cursor.execute('PRAGMA freelist_count')
+            free_pages = cursor.fetchone()[0]
+            if auto_vacuum == 2:
+                cursor.execute(f"PRAGMA incremental_vacuum({options['vacuum_pages']})")
+                cursor.fetchall()
+                cursor.execute('PRAGMA freelist_count')
+                remaining = cursor.fetchone()[0]
+                self.stdout.write(f"Vacuum incremental: {free_pages - remaining} páginas liberadas")
+            else:
+                self.stdout.write(
+                    f"auto_vacuum no es INCREMENTAL ({free_pages} páginas libres); "
+                    "use --enable-incremental-vacuum para activarlo"
+                )
+
+            cursor.execute('PRAGMA journal_mode')
+            journal_mode = cursor.fetchone()[0]
+            if journal_mode.lower() == 'wal':
+                cursor.execute(f"PRAGMA wal_checkpoint({options['checkpoint_mode']})")
+                busy, log_frames, checkpointed = cursor.fetchone()
+                self.stdout.write(
+                    f"Checkpoint WAL ({options['checkpoint_mode']}): "
+                    f"{checkpointed}/{log_frames} frames"
+                    + (" (bloqueado por otra conexión)" if busy else "")
+                )
+            else:
+                self.stdout.write(f"journal_mode={journal_mode}: no hay WAL que consolidar")
+
+        self.stdout.write(self.style.SUCCESS("Mantenimiento completado"))
@@ -0,0 +1,44 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.catalog_export import DEFAULT_CHUNK_SIZE, ENTITIES, FORMATS, export_stream, iter_gzip
+
+
+class Command(BaseCommand):
+    help = "Exporta pistas, álbumes o artistas en streaming como NDJSON o CSV."
+
+    def add_arguments(self, parser):
+        parser.add_argument('entity', choices=sorted(ENTITIES))
+        parser.add_argument('--format', choices=FORMATS, default='ndjson')
+        parser.add_argument(
+            '--output', '-o', default='-',
+            help="Fichero de salida ('-' para stdout)"
+        )
+        parser.add_argument('--gzip', action='store_true', help="Comprimir la salida con gzip")
+        parser.add_argument(
+            '--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+            help=f"Filas leídas por bloque (por defecto {DEFAULT_CHUNK_SIZE})"
+        )
+
+    def handle(self, *args, **options):
+        if options['chunk_size'] < 1:
+            raise CommandError("--chunk-size debe ser mayor que 0")
+
+        stream = export_stream(options['entity'], options['format'], chunk_size=options['chunk_size'])
+        to_stdout = options['output'] == '-'
+
+        if options['gzip']:
+            output = sys.stdout.buffer if to_stdout else open(options['output'], 'wb')
+            stream = iter_gzip(stream)
+        else:
+            output = sys.stdout if to_stdout else open(options['output'], 'w', encoding='utf-8', newline='')
+
+        try:
+            for chunk in stream:
+                output.write(chunk)
+        finally:
+            if to_stdout:
+                output.flush()
+            else:
+                output.close()
@@ -0,0 +1,121 @@
+import sys
+import time
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.catalog_import import (
+    MODEL_ALIASES,
+    READERS,
+    CatalogImporter,
+    Checkpoint,
+    detect_format,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa el catálogo en streaming desde CSV, JSONL/NDJSON o fixtures JSON "
+        "usando bulk_create por lotes, con checkpoints para reanudar."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Fichero de entrada ('-' para stdin)")
+        parser.add_argument(
+            '--format', choices=sorted(READERS), default=None,
+            help="Formato de entrada (por defecto se deduce de la extensión)"
+        )
+        parser.add_argument(
+            '--model', choices=sorted(set(MODEL_ALIASES.values())), default=None,
+            help="Modelo de los registros que no indican el campo 'model'"
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help="Registros por lote y transacción (por defecto 1000)"
+        )
+        parser.add_argument(
+            '--checkpoint', default=None,
+            help="Fichero de checkpoint (por defecto <path>.checkpoint)"
+        )
+        parser.add_argument(
+            '--no-checkpoint', action='store_true',
+            help="No escribir checkpoints"
+        )
+        parser.add_argument(
+            '--restart', action='store_true',
+            help="Ignorar el checkpoint existente y empezar desde el principio"
+        )
+        parser.add_argument(
+            '--report-every', type=int, default=10,
+            help="Informar del rendimiento cada N lotes (por defecto 10)"
+        )
+
+    def handle(self, *args, **options):
+        path = options['path']
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError("--batch-size debe ser mayor que 0")
+        if options['report_every'] < 1:
+            raise CommandError("--report-every debe ser mayor que 0")
+
+        try:
+            input_format = options['format'] or detect_format(path)
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        checkpoint_path = None
+        if not options['no_checkpoint'] and path != '-':
+            checkpoint_path = options['checkpoint'] or f'{path}.checkpoint'
+        checkpoint = Checkpoint(checkpoint_path, path)
+
+        start_position = 0
+        if options['restart']:
+            checkpoint.clear()
+        else:
+            try:
+                start_position = checkpoint.load()
+            except ValueError as exc:
+                raise CommandError(str(exc))
+        if start_position:
+            self.stdout.write(f"Reanudando desde el registro {start_position}")
+
+        importer = CatalogImporter(batch_size=batch_size, default_model=options['model'])
+        stream = sys.stdin if path == '-' else open(path, encoding='utf-8', newline='')
+
+        started_at = time.monotonic()
+        position = start_position
+        batches = 0
+        try:
+            records = islice(READERS[input_format](stream), start_position, None)
+            for position, record in enumerate(records, start=start_position + 1):
+                if importer.add(position, record):
+                    batches += 1
+                    checkpoint.save(position, importer.created)
+                    if batches % options['report_every'] == 0:
+                        self._report(importer, position - start_position, started_at)
+
+            importer.flush()
+            checkpoint.save(position, importer.created)
+        finally:
+            if stream is not sys.stdin:
+                stream.close()
+
+        self._report(importer, position - start_position, started_at)
+        for row_position, message in importer.errors:
+            self.stderr.write(f"  registro {row_position}: {message}")
+        if importer.error_count > len(importer.errors):
+            self.stderr.write(f"  ... y {importer.error_count - len(importer.errors)} errores más")
+
+        created = ', '.join(f"{name}={count}" for name, count in importer.created.items() if count)
+        self.stdout.write(self.style.SUCCESS(
+            f"Importación completada: {importer.total_created} creados ({created or 'ninguno'}), "
+            f"{importer.existing} ya existentes, {importer.error_count} descartados"
+        ))
+        checkpoint.clear()
+
+    def _report(self, importer, processed, started_at):
+        elapsed = max(time.monotonic() - started_at, 1e-9)
+        self.stdout.write(
+            f"{processed} registros procesados, {importer.total_created} creados "
+            f"en {elapsed:.1f}s ({processed / elapsed:.0f} registros/s)"
+        )
@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from artist.models import Artist, ArtistGenre
+from core.aggregates import refresh_artist_genres
+from core.sharding import IN_BATCH_SIZE
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstruye artist_genre (géneros de cada artista con el número de "
+        "pistas y de álbumes que los llevan) desde las pistas y los álbumes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=IN_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        if not 0 < options['batch_size'] <= IN_BATCH_SIZE:
+            raise CommandError(f"--batch-size debe estar entre 1 y {IN_BATCH_SIZE}")
+        if ArtistGenre._meta.db_table not in connection.introspection.table_names():
+            raise CommandError(f"Falta la tabla {ArtistGenre._meta.db_table}; ejecuta sync_schema")
+
+        artists = rows = 0
+        last_pk = None
+        while True:
+            # Recorrido por clave primaria: cada lote es una búsqueda por índice
+            pks = Artist.objects.order_by('pk').values_list('pk', flat=True)
+            if last_pk is not None:
+                pks = pks.filter(pk__gt=last_pk)
+            batch = list(pks[:options['batch_size']])
+            if not batch:
+                break
+            last_pk = batch[-1]
+            rows += refresh_artist_genres(batch)
+            artists += len(batch)
+
+        self.stdout.write(f"{artists} artistas revisados, {rows} filas en {ArtistGenre._meta.db_table}")
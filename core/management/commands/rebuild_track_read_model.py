@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections
+
+from core.read_model import rebuild
+from core.sharding import IN_BATCH_SIZE, get_retired_shards, get_shards
+from track.models import Track, TrackReadModel
+
+
+class Command(BaseCommand):
+    help = (
+        "Reconstruye track_read_model (una fila por pista con artista, sello, "
+        "país, álbum y géneros) en default y en los shards de pistas."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=IN_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        if not 0 < options['batch_size'] <= IN_BATCH_SIZE:
+            raise CommandError(f"--batch-size debe estar entre 1 y {IN_BATCH_SIZE}")
+
+        for alias in [DEFAULT_DB_ALIAS] + get_shards() + get_retired_shards():
+            tables = connections[alias].introspection.table_names()
+            if Track._meta.db_table not in tables:
+                continue
+            if TrackReadModel._meta.db_table not in tables:
+                raise CommandError(f"{alias}: falta la tabla {TrackReadModel._meta.db_table}; ejecuta sync_schema")
+            rows, orphans = rebuild(alias, options['batch_size'])
+            self.stdout.write(f"{alias}: {rows} filas reconstruidas, {orphans} huérfanas eliminadas")
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from core.releases import due_albums, release_due_albums
+
+
+class Command(BaseCommand):
+    help = (
+        "Publica los álbumes en borrador cuya fecha de lanzamiento ya llegó (y "
+        "sus pistas en borrador). Con --interval repite la pasada cada N segundos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval', type=int, default=0,
+            help="Segundos entre pasadas; 0 = una sola pasada"
+        )
+        parser.add_argument('--dry-run', action='store_true', help="Solo contar los álbumes vencidos")
+
+    def handle(self, *args, **options):
+        if options['interval'] < 0:
+            raise CommandError("--interval no puede ser negativo")
+        if options['dry_run']:
+            self.stdout.write(f"{due_albums().count()} álbumes pendientes de publicar")
+            return
+
+        while True:
+            released = release_due_albums()
+            if released or not options['interval']:
+                self.stdout.write(f"{len(released)} álbumes publicados")
+            if not options['interval']:
+                return
+            # Proceso de larga duración: no conservar conexiones caducadas
+            close_old_connections()
+            time.sleep(options['interval'])
@@ -0,0 +1,63 @@
+from collections import Counter, defaultdict
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS
+
+from core.sharding import (
+    ensure_shard_schema, get_retired_shards, get_shards, move_tracks, shard_for_track
+)
+from track.models import Track
+
+
+class Command(BaseCommand):
+    help = (
+        "Mueve cada pista (y sus géneros) al shard que le corresponde según su "
+        "artista. Recorre default, los shards y los shards retirados; sin "
+        "shards configurados devuelve las pistas a default."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000)
+        parser.add_argument('--dry-run', action='store_true', help="Solo contar lo que se movería")
+        parser.add_argument(
+            '--skip-migrate', action='store_true',
+            help="No crear las tablas de pistas en los shards"
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError("--batch-size debe ser mayor que 0")
+        shards = get_shards()
+        sources = [DEFAULT_DB_ALIAS] + shards + get_retired_shards()
+        if len(sources) == 1:
+            raise CommandError("No hay shards configurados (DB_TRACK_SHARDS / DB_TRACK_SHARDS_RETIRED)")
+
+        if not options['skip_migrate'] and not options['dry_run']:
+            for alias in sources[1:]:
+                ensure_shard_schema(alias)
+
+        moved = Counter()
+        for source in sources:
+            last_pk = 0
+            while True:
+                batch = list(
+                    Track.objects.using(source).filter(pk__gt=last_pk).order_by('pk')[:options['batch_size']]
+                )
+                if not batch:
+                    break
+                last_pk = batch[-1].pk
+
+                targets = defaultdict(list)
+                for track in batch:
+                    target = shard_for_track(track) if shards else DEFAULT_DB_ALIAS
+                    if target != source:
+                        targets[target].append(track)
+                for target, tracks in targets.items():
+                    if not options['dry_run']:
+                        move_tracks(tracks, source, target)
+                    moved[(source, target)] += len(tracks)
+
+        for (source, target), count in sorted(moved.items()):
+            self.stdout.write(f"{source} -> {target}: {count} pistas")
+        verb = "se moverían" if options['dry_run'] else "movidas"
+        self.stdout.write(self.style.SUCCESS(f"Resharding completado: {sum(moved.values())} pistas {verb}"))
@@ -0,0 +1,128 @@
+from django.apps import apps
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, connections, router, transaction
+from django.db.models import UniqueConstraint
+
+from core.sharding import get_retired_shards, get_shards
+
+
+class Command(BaseCommand):
+    help = (
+        "Crea en una base existente los índices declarados en los modelos que "
+        "faltan, también los UNIQUE (unique=True, unique_together y "
+        "UniqueConstraint), y, con --drop, elimina los que ya no se declaran. "
+        "Las apps no tienen migraciones: es la forma de aplicar cambios de índices."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database', action='append', dest='databases',
+            help="Alias a sincronizar (por defecto default y los shards de pistas)"
+        )
+        parser.add_argument(
+            '--drop', action='store_true',
+            help="Eliminar los índices (no UNIQUE) que no declara ningún modelo"
+        )
+        parser.add_argument('--dry-run', action='store_true', help="Solo mostrar los cambios")
+
+    def handle(self, *args, **options):
+        aliases = options['databases'] or [DEFAULT_DB_ALIAS] + get_shards() + get_retired_shards()
+        for alias in aliases:
+            if alias not in connections.settings:
+                raise CommandError(f"Base de datos desconocida: {alias}")
+
+        for alias in aliases:
+            created, dropped = self._sync(alias, options['drop'], options['dry_run'])
+            self.stdout.write(f"{alias}: {created} índices creados, {dropped} eliminados")
+        if options['dry_run']:
+            self.stdout.write("Simulación: no se ha modificado ninguna base")
+
+    def _expected(self, editor, model):
+        """{nombre: SQL de creación} de los índices que declara el modelo"""
+        expected = {index.name: index.create_sql(model, editor) for index in model._meta.indexes}
+        for field in model._meta.local_fields:
+            # Mismo criterio y nombre que usa Django al crear la tabla
+            if editor._field_should_be_indexed(model, field):
+                name = editor._create_index_name(model._meta.db_table, [field.column], suffix='')
+                expected[name] = editor._create_index_sql(model, fields=[field], name=name)
+        return expected
+
+    def _expected_unique(self, editor, model):
+        """
+        {nombre: (columnas, SQL de creación)} de las restricciones UNIQUE del
+        modelo. Con columnas, también cuenta como existente una restricción
+        UNIQUE sin ese nombre sobre las mismas columnas (p. ej. la que SQLite
+        crea dentro del CREATE TABLE).
+        """
+        table = model._meta.db_table
+        expected = {}
+        for field in model._meta.local_concrete_fields:
+            if field.unique and not field.primary_key:
+                name = editor._create_index_name(table, [field.column], suffix='_uniq')
+                expected[name] = ([field.column], editor._create_unique_sql(model, [field], name=name))
+        for field_names in model._meta.unique_together:
+            fields = [model._meta.get_field(field_name) for field_name in field_names]
+            columns = [field.column for field in fields]
+            name = editor._create_index_name(table, columns, suffix='_uniq')
+            expected[name] = (columns, editor._create_unique_sql(model, fields, name=name))
+        for constraint in model._meta.constraints:
+            if not isinstance(constraint, UniqueConstraint):
+                continue
+            columns = None
+            if constraint.fields and constraint.condition is None:
+                columns = [model._meta.get_field(field_name).column for field_name in constraint.fields]
+            expected[constraint.name] = (columns, constraint.create_sql(model, editor))
+        return expected
+
+    def _sync(self, alias, drop, dry_run):
+        connection = connections[alias]
+        tables = set(connection.introspection.table_names())
+        created = dropped = 0
+        with connection.schema_editor(collect_sql=dry_run) as editor:
+            for model in apps.get_models(include_auto_created=True):
+                table = model._meta.db_table
+                if table not in tables or not router.allow_migrate_model(alias, model):
+                    continue
+                with connection.cursor() as cursor:
+                    constraints = connection.introspection.get_constraints(cursor, table)
+                existing = {
+                    name for name, info in constraints.items()
+                    if info['index'] and not info['unique'] and not info['primary_key']
+                }
+                expected = self._expected(editor, model)
+
+                changed = False
+                for name, statement in expected.items():
+                    if name not in existing:
+                        self.stdout.write(f"  + {table}.{name}")
+                        editor.execute(statement)
+                        created += 1
+                        changed = True
+
+                unique_columns = [info['columns'] for info in constraints.values() if info['unique']]
+                for name, (columns, statement) in self._expected_unique(editor, model).items():
+                    if name in constraints or (columns and columns in unique_columns):
+                        continue
+                    self.stdout.write(f"  + {table}.{name} (UNIQUE)")
+                    try:
+                        # Savepoint: con filas duplicadas falla solo este índice
+                        with transaction.atomic(using=alias):
+                            editor.execute(statement)
+                    except IntegrityError as exc:
+                        self.stderr.write(
+                            f"  ! {table}.{name}: hay filas duplicadas ({exc}); "
+                            "corrígelas y vuelve a ejecutar el comando"
+                        )
+                        continue
+                    created += 1
+                    changed = True
+                if drop:
+                    for name in sorted(existing - set(expected)):
+                        self.stdout.write(f"  - {table}.{name}")
+                        editor.execute(editor._delete_index_sql(model, name))
+                        dropped += 1
+                        changed = True
+                if changed and not dry_run:
+                    # Estadísticas nuevas para que el planificador elija bien
+                    editor.execute(f'ANALYZE {editor.quote_name(table)}')
+        return created, dropped
@@ -0,0 +1,40 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.replicas import get_replicas, replica_lag, sync_replica
+
+
+class Command(BaseCommand):
+    help = "Copia el primario SQLite en las réplicas de solo lectura (API de backup)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'aliases', nargs='*',
+            help="Alias de las réplicas a sincronizar (por defecto todas)"
+        )
+        parser.add_argument(
+            '--watch', type=float, default=0,
+            help="Repetir la sincronización cada N segundos"
+        )
+
+    def handle(self, *args, **options):
+        replicas = get_replicas()
+        aliases = options['aliases'] or replicas
+        unknown = set(aliases) - set(replicas)
+        if unknown:
+            raise CommandError(f"Réplicas desconocidas: {', '.join(sorted(unknown))}")
+        if not aliases:
+            raise CommandError("No hay réplicas configuradas (DB_REPLICAS)")
+
+        while True:
+            for alias in aliases:
+                started_at = time.monotonic()
+                sync_replica(alias)
+                self.stdout.write(
+                    f"{alias}: sincronizada en {time.monotonic() - started_at:.2f}s "
+                    f"(retraso {replica_lag(alias):.2f}s)"
+                )
+            if options['watch'] <= 0:
+                return
+            time.sleep(options['watch'])
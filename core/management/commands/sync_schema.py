@@ -0,0 +1,105 @@
+from django.apps import apps
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, router
+from django.db.migrations.state import ProjectState
+
+from core.sharding import get_retired_shards, get_shards
+
+
+class Command(BaseCommand):
+    help = (
+        "Crea en una base existente las tablas y columnas declaradas en los "
+        "modelos que faltan y después sincroniza los índices (sync_indexes). "
+        "Las apps no tienen migraciones: es la forma de añadir campos nuevos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--database', action='append', dest='databases',
+            help="Alias a sincronizar (por defecto default y los shards de pistas)"
+        )
+        parser.add_argument('--dry-run', action='store_true', help="Solo mostrar los cambios")
+
+    def handle(self, *args, **options):
+        aliases = options['databases'] or [DEFAULT_DB_ALIAS] + get_shards() + get_retired_shards()
+        for alias in aliases:
+            if alias not in connections.settings:
+                raise CommandError(f"Base de datos desconocida: {alias}")
+
+        for alias in aliases:
+            tables, columns = self._sync(alias, options['dry_run'])
+            self.stdout.write(f"{alias}: {tables} tablas creadas, {columns} columnas añadidas")
+        if options['dry_run']:
+            self.stdout.write("Simulación: no se ha modificado ninguna base")
+
+        index_options = {'dry_run': options['dry_run']}
+        if options['databases']:
+            index_options['databases'] = options['databases']
+        call_command('sync_indexes', stdout=self.stdout, **index_options)
+
+    def _sync(self, alias, dry_run):
+        connection = connections[alias]
+        tables = set(connection.introspection.table_names())
+        created = added = 0
+        # Las tablas M2M automáticas se crean con su modelo (create_model las incluye)
+        models = [
+            model for model in apps.get_models()
+            if model._meta.managed and not model._meta.proxy and router.allow_migrate_model(alias, model)
+        ]
+        with connection.schema_editor(collect_sql=dry_run) as editor:
+            for model in models:
+                table = model._meta.db_table
+                if table not in tables:
+                    self.stdout.write(f"  + {table}")
+                    editor.create_model(model)
+                    created += 1
+                    continue
+                with connection.cursor() as cursor:
+                    existing = {
+                        column.name for column in connection.introspection.get_table_description(cursor, table)
+                    }
+                missing = [field for field in model._meta.local_concrete_fields if field.column not in existing]
+                for field in missing:
+                    self.stdout.write(f"  + {table}.{field.column}")
+                if missing:
+                    self._add_fields(editor, model, missing)
+                    added += len(missing)
+                for field in model._meta.local_many_to_many:
+                    through = field.remote_field.through
+                    if (
+                        through._meta.auto_created and through._meta.db_table not in tables
+                        and router.allow_migrate_model(alias, through)
+                    ):
+                        self.stdout.write(f"  + {through._meta.db_table}")
+                        editor.create_model(through)
+                        created += 1
+        return created, added
+
+    def _add_fields(self, editor, model, fields):
+        """
+        Añade las columnas como AddField en una migración: de una en una y
+        partiendo de un estado sin las que faltan (SQLite rehace la tabla
+        copiando las columnas que el modelo cree que ya existen). Los índices
+        de esas columnas los crea después sync_indexes.
+        """
+        # Las columnas NOT NULL nuevas necesitan default en el modelo
+        key = (model._meta.app_label, model._meta.model_name)
+        names = {field.name for field in fields}
+        state = ProjectState.from_apps(apps)
+        options = state.models[key].options
+        options['indexes'] = [index for index in options['indexes'] if not names & set(index.fields)]
+        constraints = options['constraints']
+        options['constraints'] = [
+            constraint for constraint in constraints if not names & set(getattr(constraint, 'fields', ()))
+        ]
+        for name in names:
+            state.models[key].fields.pop(name)
+        for field in fields:
+            new_state = state.clone()
+            new_state.add_field(*key, field.name, field.clone(), preserve_default=True)
+            editor.add_field(state.apps.get_model(*key), new_state.apps.get_model(*key)._meta.get_field(field.name))
+            state = new_state
+        for constraint in constraints:
+            if constraint not in options['constraints']:
+                editor.add_constraint(model, constraint)
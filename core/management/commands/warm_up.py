@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from core.warmup import get_config, warm_up
+
+
+class Command(BaseCommand):
+    help = (
+        "Calienta el proceso como al arrancar: importa vistas y serializers, "
+        "construye la copia de países y géneros y pide las rutas de WARMUP['PATHS'] "
+        "(o las indicadas), mostrando el tiempo de cada fase."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='*', help="Rutas a pedir (por defecto WARMUP['PATHS'])")
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or get_config()['PATHS']
+        # Sin la fase de fork: este proceso no va a crear workers
+        report = warm_up(paths, fork=False)
+        self.stdout.write(f"Módulos importados: {report['modules']}")
+        self.stdout.write(f"Copia de diccionarios: {report['countries']} países, {report['genres']} géneros")
+        for path, status_code in report['responses'].items():
+            self.stdout.write(f"  {status_code} {path}")
+        for name, seconds in report['seconds'].items():
+            self.stdout.write(f"{name:<14} {seconds * 1000:9.1f} ms")
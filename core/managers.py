@@ -0,0 +1,22 @@
+"""
+Managers de contenido con estado de publicación (pistas y álbumes).
+
+``objects`` sigue devolviendo todas las filas (admin, escrituras,
+importación, mantenimiento). Los endpoints públicos parten de
+``published``, que solo ve ``status='published'``: sus consultas coinciden
+con la condición de los índices parciales y no recorren borradores ni
+contenido retirado.
+"""
+from django.db import models
+
+from .choices import ReleaseStatus
+
+
+class ReleaseQuerySet(models.QuerySet):
+    def published(self):
+        return self.filter(status=ReleaseStatus.PUBLISHED)
+
+
+class PublishedManager(models.Manager.from_queryset(ReleaseQuerySet)):
+    def get_queryset(self):
+        return super().get_queryset().published()
@@ -1,3 +1,41 @@
 from django.db import models
 
-# Create your models here.
+
+class DictionaryVersion(models.Model):
+    """
+    Versión de las tablas diccionario (países y géneros). Cada escritura la
+    incrementa y los procesos la comparan con la de su copia en memoria
+    (``core.dictionaries``) para saber si deben reconstruirla.
+    """
+    name = models.CharField(max_length=50, primary_key=True)
+    version = models.PositiveBigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'dictionary_versions'
+
+    def __str__(self):
+        return f'{self.name} v{self.version}'
+
+
+class InvalidationEvent(models.Model):
+    """
+    Evento del bus de invalidación (``core.invalidation``): el objeto ``object_pk``
+    del modelo ``model`` cambió. El id es la versión del bus: cada proceso
+    recuerda el último que aplicó y lee solo los posteriores.
+    """
+    id = models.BigAutoField(primary_key=True)
+    model = models.CharField(max_length=100)
+    object_pk = models.CharField(max_length=64)
+    # time.time() del commit: con él se mide el retraso de cada proceso
+    created_at = models.FloatField()
+
+    class Meta:
+        db_table = 'invalidation_events'
+        indexes = [
+            # Purga de eventos antiguos (db_maintenance)
+            models.Index(fields=['created_at']),
+        ]
+
+    def __str__(self):
+        return f'{self.id}: {self.model} {self.object_pk}'
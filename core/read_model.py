@@ -0,0 +1,278 @@
+"""
+Tabla de lectura ``track_read_model``: una fila por pista con los datos que
+muestran los listados (artista, sello, país, álbum, géneros y duración
+formateada), para servir ``/tracks/?flat=true`` y ``/tracks/search/?flat=true``
+desde una sola tabla.
+
+Las filas viven en la misma base que su pista (también en los shards) y se
+rehacen por pista, borrando e insertando, así que repetir una actualización
+no cambia el resultado:
+
+- ``post_save``/``post_delete`` de pistas y de sus géneros, y ``m2m_changed``
+  de ``Track.genres``, para las escrituras de una en una;
+- ``tracks_changed`` (``core.sharding``) para las escrituras masivas, que
+  no disparan ``post_save``;
+- al cambiar un campo que copian las filas (nombre del artista, título del
+  álbum, código del país...) o al borrar un artista, álbum, sello, país o
+  género se rehacen las filas que lo muestran, por lotes y al confirmar la
+  transacción; ``albums_released`` rehace las pistas de los álbumes
+  publicados.
+
+``manage.py rebuild_track_read_model`` la reconstruye entera.
+"""
+from collections import defaultdict
+
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+
+from album.models import Album
+from artist.models import Artist
+from country.models import Country
+from genre.models import Genre
+from record_label.models import RecordLabel
+from track.models import Track, TrackGenre, TrackReadModel
+
+from .releases import albums_released
+from .sharding import IN_BATCH_SIZE, get_retired_shards, get_shards, tracks_changed
+
+
+def _chunks(values, size=IN_BATCH_SIZE):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _aliases():
+    return [DEFAULT_DB_ALIAS] + get_shards() + get_retired_shards()
+
+
+def build_rows(tracks, using):
+    """Filas de lectura de ``tracks`` (pistas de la base ``using``)"""
+    artists = Artist.objects.select_related('label_id', 'country').in_bulk(
+        {track.artist_id_id for track in tracks if track.artist_id_id}
+    )
+    albums = Album.objects.only('title', 'cover_url').in_bulk(
+        {track.album_id_id for track in tracks if track.album_id_id}
+    )
+    links = defaultdict(list)
+    for track_pk, genre_pk in TrackGenre.objects.using(using).filter(
+        track_id__in=[track.pk for track in tracks]
+    ).values_list('track_id', 'genre_id'):
+        links[track_pk].append(genre_pk)
+    genres = Genre.objects.only('name').in_bulk({pk for pks in links.values() for pk in pks})
+
+    rows = []
+    for track in tracks:
+        artist = artists.get(track.artist_id_id)
+        label = artist.label_id if artist else None
+        country = artist.country if artist else None
+        album = albums.get(track.album_id_id)
+        track_genres = sorted((genres[pk] for pk in links[track.pk] if pk in genres), key=lambda genre: genre.name)
+        rows.append(TrackReadModel(
+            id=track.pk,
+            title=track.title,
+            status=track.status,
+            disc_number=track.disc_number,
+            track_number=track.track_number,
+            duration_sec=track.duration_sec,
+            duration_formatted=track.duration_formatted,
+            explicit=track.explicit,
+            language=track.language,
+            preview_url=track.preview_url,
+            audio_master_url=track.audio_master_url,
+            artist_id=artist.pk if artist else None,
+            artist_name=artist.name if artist else None,
+            label_id=label.pk if label else None,
+            label_name=label.name if label else None,
+            country_id=country.pk if country else None,
+            country_iso=country.iso_code if country else None,
+            album_id=album.pk if album else None,
+            album_title=album.title if album else None,
+            cover_url=album.cover_url if album else None,
+            genre_ids=[str(genre.pk) for genre in track_genres],
+            genre_names=[genre.name for genre in track_genres],
+        ))
+    return rows
+
+
+def refresh_tracks(track_pks, using=DEFAULT_DB_ALIAS):
+    """Rehace las filas de las pistas indicadas; las que ya no existen se borran"""
+    for chunk in _chunks(set(track_pks)):
+        tracks = list(Track.objects.using(using).filter(pk__in=chunk))
+        rows = build_rows(tracks, using)
+        with transaction.atomic(using=using):
+            TrackReadModel.objects.using(using).filter(pk__in=chunk).delete()
+            TrackReadModel.objects.using(using).bulk_create(rows)
+
+
+def refresh_related(field, pks):
+    """Rehace las filas cuyo ``field`` (artist_id, album_id, label_id...) está en ``pks``"""
+    pks = list(pks)
+    for alias in _aliases():
+        for chunk in _chunks(pks):
+            track_pks = TrackReadModel.objects.using(alias).filter(
+                **{f'{field}__in': chunk}
+            ).values_list('pk', flat=True)
+            refresh_tracks(list(track_pks), alias)
+
+
+def refresh_genres(genre_pks):
+    """Rehace las filas de las pistas de esos géneros"""
+    genre_pks = list(genre_pks)
+    for alias in _aliases():
+        for chunk in _chunks(genre_pks):
+            track_pks = TrackGenre.objects.using(alias).filter(genre_id__in=chunk).values_list(
+                'track_id', flat=True
+            )
+            refresh_tracks(list(track_pks), alias)
+
+
+def rebuild(using, batch_size=IN_BATCH_SIZE):
+    """Reconstruye la tabla de una base; devuelve (filas escritas, huérfanas borradas)"""
+    total = 0
+    last_pk = 0
+    while True:
+        track_pks = list(
+            Track.objects.using(using).filter(pk__gt=last_pk).order_by('pk').values_list('pk', flat=True)[:batch_size]
+        )
+        if not track_pks:
+            break
+        refresh_tracks(track_pks, using)
+        last_pk = track_pks[-1]
+        total += len(track_pks)
+    # Filas de pistas que ya no existen
+    orphans = TrackReadModel.objects.using(using).exclude(
+        pk__in=Track.objects.using(using).values('pk')
+    ).delete()[0]
+    return total, orphans
+
+
+# ---------------------------------------------------------------------------
+# Señales
+# ---------------------------------------------------------------------------
+
+def _track_saved(sender, instance, **kwargs):
+    # create_track la rehace con tracks_changed una vez insertados los géneros
+    if getattr(instance, '_read_model_pending', False):
+        return
+    refresh_tracks([instance.pk], instance._state.db)
+
+
+def _track_deleted(sender, instance, **kwargs):
+    TrackReadModel.objects.using(instance._state.db).filter(pk=instance.pk).delete()
+
+
+def _track_genre_changed(sender, instance, origin=None, **kwargs):
+    # Géneros borrados en cascada con su pista: ya la quita _track_deleted
+    if isinstance(origin, Track) or getattr(origin, 'model', None) is Track:
+        return
+    refresh_tracks([instance.track_id], instance._state.db)
+
+
+def _track_genres_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if not reverse:
+        refresh_tracks([instance.pk], instance._state.db)
+    elif pk_set:
+        # genre.tracks.add(...): pk_set son pistas (en la base de la consulta)
+        refresh_tracks(pk_set, kwargs.get('using') or DEFAULT_DB_ALIAS)
+
+
+def _tracks_changed(sender, track_pks, using, **kwargs):
+    refresh_tracks(track_pks, using)
+
+
+def _albums_released(sender, album_ids, **kwargs):
+    refresh_related('album_id', album_ids)
+
+
+# Modelo -> (columna de track_read_model que guarda su id, campos que copia la fila)
+RELATED_FIELDS = {
+    Artist: ('artist_id', ('name', 'label_id', 'country')),
+    Album: ('album_id', ('title', 'cover_url')),
+    RecordLabel: ('label_id', ('name',)),
+    Country: ('country_id', ('iso_code',)),
+    Genre: (None, ('name',)),
+}
+
+
+class _Pending:
+    """Filas por rehacer de una transacción, pendientes de su commit"""
+
+    def __init__(self):
+        self.related = defaultdict(set)
+        self.done = False
+
+    def flush(self):
+        self.done = True
+        for field, pks in self.related.items():
+            if field is None:
+                refresh_genres(pks)
+            else:
+                refresh_related(field, pks)
+
+
+def _schedule(sender, pk, using):
+    """Rehace las filas que muestran ``pk`` al confirmar la transacción de ``using``"""
+    connection = transaction.get_connection(using)
+    pending = getattr(connection, '_read_model_pending', None)
+    # Igual que core.invalidation.publish: un lote por nivel de savepoint
+    savepoints = set(connection.savepoint_ids)
+    scheduled = pending is not None and not pending.done and any(
+        func == pending.flush and sids == savepoints for sids, func, _ in connection.run_on_commit
+    )
+    if not scheduled:
+        pending = connection._read_model_pending = _Pending()
+    pending.related[RELATED_FIELDS[sender][0]].add(pk)
+    if not scheduled:
+        transaction.on_commit(pending.flush, using=using)
+
+
+def _copied_fields(sender):
+    """Nombres y attnames de los campos que copia track_read_model"""
+    fields = [sender._meta.get_field(name) for name in RELATED_FIELDS[sender][1]]
+    return {field.name for field in fields} | {field.attname for field in fields}
+
+
+def _related_saving(sender, instance, update_fields=None, **kwargs):
+    # Un save() completo (sin update_fields) no dice qué cambió: se leen los valores anteriores
+    if instance._state.adding or update_fields is not None:
+        return
+    attnames = [sender._meta.get_field(name).attname for name in RELATED_FIELDS[sender][1]]
+    instance._read_model_old = sender._base_manager.using(instance._state.db).filter(
+        pk=instance.pk
+    ).values(*attnames).first()
+
+
+def _related_saved(sender, instance, created, update_fields=None, **kwargs):
+    # Nadie muestra todavía un objeto recién creado
+    if created:
+        return
+    if update_fields is not None:
+        changed = bool(set(update_fields) & _copied_fields(sender))
+    else:
+        old = instance.__dict__.pop('_read_model_old', None)
+        changed = old is None or any(getattr(instance, attname) != value for attname, value in old.items())
+    if changed:
+        _schedule(sender, instance.pk, instance._state.db)
+
+
+def _related_deleted(sender, instance, **kwargs):
+    _schedule(sender, instance.pk, instance._state.db)
+
+
+def connect_signals():
+    uid = 'core.read_model.'
+    post_save.connect(_track_saved, sender=Track, dispatch_uid=uid + 'track_saved')
+    post_delete.connect(_track_deleted, sender=Track, dispatch_uid=uid + 'track_deleted')
+    for signal in (post_save, post_delete):
+        signal.connect(_track_genre_changed, sender=TrackGenre, dispatch_uid=uid + 'track_genre_changed')
+    for model in RELATED_FIELDS:
+        label = model._meta.label_lower
+        pre_save.connect(_related_saving, sender=model, dispatch_uid=uid + label + '.saving')
+        post_save.connect(_related_saved, sender=model, dispatch_uid=uid + label + '.saved')
+        post_delete.connect(_related_deleted, sender=model, dispatch_uid=uid + label + '.deleted')
+    m2m_changed.connect(_track_genres_changed, sender=TrackGenre, dispatch_uid=uid + 'track_genres_changed')
+    tracks_changed.connect(_tracks_changed, dispatch_uid=uid + 'tracks_changed')
+    albums_released.connect(_albums_released, dispatch_uid=uid + 'albums_released')
@@ -0,0 +1,208 @@
+"""
+Resolución de claves primarias por lotes para los serializers de escritura.
+
+``PrimaryKeyRelatedField`` hace un ``get()`` por cada id recibido. Los campos
+de este módulo comparten una caché por serialización (guardada en el
+contexto del serializer raíz) y resuelven todos los ids de un mismo modelo
+con un único ``pk__in``. Las instancias resueltas quedan en
+``validated_data`` y se reutilizan en ``create``/``update``.
+"""
+from collections.abc import Mapping
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
+
+RESOLVER_CONTEXT_KEY = 'relation_resolver'
+
+
+class RelationResolver:
+    """Caché (modelo, pk) -> instancia compartida durante una serialización"""
+
+    _MISSING = object()
+
+    def __init__(self):
+        self._cache = {}
+
+    @staticmethod
+    def to_pk(model, value):
+        """Normaliza un id recibido al tipo de la clave primaria del modelo"""
+        if value is None or isinstance(value, (bool, dict, list)):
+            raise TypeError
+        return model._meta.pk.to_python(value)
+
+    def prefetch(self, queryset, values):
+        """Carga con una sola consulta los ids que aún no están en caché"""
+        model = queryset.model
+        pks = set()
+        for value in values:
+            try:
+                pk = self.to_pk(model, value)
+            except (TypeError, ValueError, DjangoValidationError):
+                continue
+            if (model, pk) not in self._cache:
+                pks.add(pk)
+        if not pks:
+            return
+        found = queryset.in_bulk(list(pks))
+        for pk in pks:
+            self._cache[(model, pk)] = found.get(pk, self._MISSING)
+
+    def get(self, queryset, pk):
+        """Devuelve la instancia o None si no existe"""
+        key = (queryset.model, pk)
+        if key not in self._cache:
+            self.prefetch(queryset, [pk])
+        instance = self._cache[key]
+        return None if instance is self._MISSING else instance
+
+
+def set_prefetched(instance, name, objects):
+    """Rellena la caché de prefetch de una relación con objetos ya en memoria"""
+    queryset = getattr(instance, name).all()
+    queryset._result_cache = list(objects)
+    queryset._prefetch_done = True
+    if not hasattr(instance, '_prefetched_objects_cache'):
+        instance._prefetched_objects_cache = {}
+    instance._prefetched_objects_cache[name] = queryset
+
+
+def get_resolver(field):
+    """Resolver guardado en el contexto del serializer raíz"""
+    context = field.context
+    resolver = context.get(RESOLVER_CONTEXT_KEY)
+    if resolver is None:
+        resolver = RelationResolver()
+        if isinstance(context, dict):
+            context[RESOLVER_CONTEXT_KEY] = resolver
+    return resolver
+
+
+class BatchedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """PrimaryKeyRelatedField que resuelve los ids a través del RelationResolver"""
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BatchedManyRelatedField(**list_kwargs)
+
+    def _to_pk(self, data):
+        if self.pk_field is not None:
+            data = self.pk_field.to_internal_value(data)
+        try:
+            return RelationResolver.to_pk(self.get_queryset().model, data)
+        except (TypeError, ValueError, DjangoValidationError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+    def to_internal_value(self, data):
+        pk = self._to_pk(data)
+        instance = get_resolver(self).get(self.get_queryset(), pk)
+        if instance is None:
+            self.fail('does_not_exist', pk_value=data)
+        return instance
+
+
+class BatchedManyRelatedField(serializers.ManyRelatedField):
+    """Lista de ids resuelta con una única consulta"""
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) or not hasattr(data, '__iter__'):
+            self.fail('not_a_list', input_type=type(data).__name__)
+        if not self.allow_empty and len(data) == 0:
+            self.fail('empty')
+
+        child = self.child_relation
+        get_resolver(self).prefetch(child.get_queryset(), list(data))
+
+        instances = []
+        seen = set()
+        for item in data:
+            instance = child.to_internal_value(item)
+            if instance.pk not in seen:
+                seen.add(instance.pk)
+                instances.append(instance)
+        return instances
+
+
+def _collect_relation_ids(serializer, payloads, wanted):
+    """Recorre los campos (y serializers anidados) acumulando ids por modelo"""
+    payloads = [payload for payload in payloads if isinstance(payload, Mapping)]
+    if not payloads:
+        return
+
+    for field in serializer.fields.values():
+        if field.read_only:
+            continue
+        values = [payload[field.field_name] for payload in payloads if field.field_name in payload]
+        if not values:
+            continue
+
+        if isinstance(field, BatchedManyRelatedField):
+            queryset = field.child_relation.get_queryset()
+            ids = [item for value in values if isinstance(value, (list, tuple)) for item in value]
+        elif isinstance(field, BatchedPrimaryKeyRelatedField):
+            queryset = field.get_queryset()
+            ids = values
+        elif isinstance(field, serializers.ListSerializer):
+            nested = [item for value in values if isinstance(value, (list, tuple)) for item in value]
+            _collect_relation_ids(field.child, nested, wanted)
+            continue
+        elif isinstance(field, serializers.BaseSerializer):
+            _collect_relation_ids(field, values, wanted)
+            continue
+        else:
+            continue
+
+        entry = wanted.setdefault(queryset.model, (queryset, []))
+        entry[1].extend(ids)
+
+
+def prefetch_relations(serializer, payloads):
+    """Resuelve por adelantado todos los ids del payload: un pk__in por modelo"""
+    wanted = {}
+    _collect_relation_ids(serializer, payloads, wanted)
+    resolver = get_resolver(serializer)
+    for queryset, ids in wanted.values():
+        resolver.prefetch(queryset, ids)
+
+
+class BatchedListSerializer(serializers.ListSerializer):
+    """Para cargas masivas: resuelve los ids de todos los elementos a la vez"""
+
+    def to_internal_value(self, data):
+        if isinstance(data, (list, tuple)):
+            prefetch_relations(self.child, data)
+        return super().to_internal_value(data)
+
+
+class BatchedRelationsMixin:
+    """
+    Mixin para ModelSerializer de escritura.
+
+    Las relaciones generadas automáticamente (p. ej. ``genres``) usan
+    ``BatchedPrimaryKeyRelatedField`` y, antes de validar, se resuelven todos
+    los ids del payload (incluidos los de serializers anidados).
+    """
+    serializer_related_field = BatchedPrimaryKeyRelatedField
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        meta = getattr(cls, 'Meta', None)
+        if meta is not None and not hasattr(meta, 'list_serializer_class'):
+            meta.list_serializer_class = BatchedListSerializer
+
+    def build_relational_field(self, field_name, relation_info):
+        # DRF deja en solo lectura las M2M con tabla intermedia explícita; las
+        # nuestras (TrackGenre, AlbumGenre) solo añaden índices y se escriben igual
+        if relation_info.to_many and relation_info.has_through_model:
+            through = relation_info.model_field.remote_field.through
+            if all(field.primary_key or field.is_relation for field in through._meta.concrete_fields):
+                relation_info = relation_info._replace(has_through_model=False)
+        return super().build_relational_field(field_name, relation_info)
+
+    def to_internal_value(self, data):
+        prefetch_relations(self, [data])
+        return super().to_internal_value(data)
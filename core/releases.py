@@ -0,0 +1,74 @@
+"""
+Publicación programada de álbumes.
+
+Un álbum en borrador con ``release_date`` pasa a publicado cuando llega su
+fecha; sus pistas en borrador se publican con él. ``release_due_albums``
+encuentra los álbumes vencidos con el índice parcial de borradores por
+fecha y los publica con un UPDATE por lote (no se evalúa nada por fila en
+Python); las pistas del lote se publican en la misma unidad de escritura,
+con un UPDATE por base, de modo que un lote no queda a medias. Al terminar envía ``albums_released`` con los ids publicados, para
+que quien mantenga datos derivados de los álbumes los invalide.
+
+Se ejecuta con ``manage.py release_albums`` (una pasada, p. ej. desde cron)
+o ``manage.py release_albums --interval 60`` (proceso que repite la pasada).
+"""
+from django.db import DEFAULT_DB_ALIAS
+from django.dispatch import Signal
+from django.utils import timezone
+
+from album.models import Album
+from track.models import Track
+
+from .choices import ReleaseStatus
+from .sharding import IN_BATCH_SIZE, atomic_on_track_databases, get_retired_shards, get_shards
+from .write_queue import run_write
+
+# Enviada tras cada pasada con álbumes publicados: album_ids=[...]
+albums_released = Signal()
+
+
+def due_albums(today=None):
+    """Borradores cuya fecha de lanzamiento ya llegó"""
+    today = today or timezone.localdate()
+    return Album.objects.filter(status=ReleaseStatus.DRAFT, release_date__lte=today)
+
+
+def upcoming_albums(today=None):
+    """Borradores con fecha futura, en el orden en que se publicarán"""
+    today = today or timezone.localdate()
+    return Album.objects.filter(
+        status=ReleaseStatus.DRAFT, release_date__gt=today
+    ).order_by('release_date', 'title')
+
+
+def _publish(album_ids, now):
+    """Publica un lote de álbumes y sus pistas en borrador, todo o nada en cada base"""
+    with atomic_on_track_databases():
+        # status='draft' otra vez: un álbum editado entre la lectura y el UPDATE no se toca
+        published = Album.objects.filter(pk__in=album_ids, status=ReleaseStatus.DRAFT).update(
+            status=ReleaseStatus.PUBLISHED, updated_at=now
+        )
+        # Las pistas pueden estar en default o repartidas por los shards
+        for alias in [DEFAULT_DB_ALIAS] + get_shards() + get_retired_shards():
+            Track.objects.using(alias).filter(
+                album_id__in=album_ids, status=ReleaseStatus.DRAFT
+            ).update(status=ReleaseStatus.PUBLISHED)
+    return published
+
+
+def release_due_albums(today=None, batch_size=IN_BATCH_SIZE):
+    """Publica los álbumes vencidos y sus pistas en borrador; devuelve los ids publicados"""
+    now = timezone.now()
+    released = []
+    while True:
+        album_ids = list(
+            due_albums(today).order_by('release_date', 'title').values_list('pk', flat=True)[:batch_size]
+        )
+        if not album_ids:
+            break
+        run_write(lambda: _publish(album_ids, now))
+        released += album_ids
+
+    if released:
+        albums_released.send(sender=Album, album_ids=released)
+    return released
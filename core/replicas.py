@@ -0,0 +1,164 @@
+"""
+Réplicas de solo lectura.
+
+- ``ReplicaRouter`` envía las lecturas a uno de los alias de
+  ``settings.DATABASE_REPLICAS`` y las escrituras siempre a ``default``.
+- ``ReplicaRoutingMiddleware`` fija el primario durante las peticiones que no
+  son seguras (POST, PATCH, DELETE...) y, tras una escritura, durante
+  ``REPLICA_PIN_SECONDS`` más mediante la cookie/cabecera ``db-primary-until``
+  para que el cliente lea sus propias escrituras.
+- Cualquier escritura dentro de una petición fija el primario para el resto
+  de la petición.
+- ``sync_replica`` copia el primario con la API de backup de SQLite y deja un
+  *heartbeat* con el que se calcula el retraso (``replica_lag``).
+"""
+import contextvars
+import random
+import sqlite3
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections
+
+PIN_COOKIE = 'db-primary-until'
+PIN_HEADER = 'X-DB-Primary-Until'
+HEARTBEAT_TABLE = 'replica_heartbeat'
+
+_use_primary = contextvars.ContextVar('use_primary', default=False)
+
+
+def get_replicas():
+    return list(getattr(settings, 'DATABASE_REPLICAS', []))
+
+
+def pin_primary():
+    """Las siguientes lecturas de este contexto (petición) van al primario"""
+    _use_primary.set(True)
+
+
+def is_pinned():
+    return _use_primary.get()
+
+
+class ReplicaRouter:
+    """Lecturas repartidas entre las réplicas; escrituras al primario"""
+
+    def db_for_read(self, model, **hints):
+        replicas = get_replicas()
+        if not replicas or _use_primary.get():
+            return DEFAULT_DB_ALIAS
+        return random.choice(replicas)
+
+    def db_for_write(self, model, **hints):
+        # Leer lo recién escrito en la misma petición
+        pin_primary()
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Réplicas y primario contienen los mismos datos
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db not in get_replicas()
+
+
+def _pinned_until(request):
+    value = request.COOKIES.get(PIN_COOKIE) or request.headers.get(PIN_HEADER)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class ReplicaRoutingMiddleware:
+    """Fija el primario en escrituras y durante el periodo de 'read your writes'"""
+
+    SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        # Bajo ASGI no se fuerza a las vistas asíncronas a pasar por un hilo
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        unsafe = request.method not in self.SAFE_METHODS
+        token = _use_primary.set(unsafe or _pinned_until(request) > time.time())
+        try:
+            response = self.get_response(request)
+        finally:
+            _use_primary.reset(token)
+        return self._pin_response(request, response)
+
+    async def __acall__(self, request):
+        unsafe = request.method not in self.SAFE_METHODS
+        token = _use_primary.set(unsafe or _pinned_until(request) > time.time())
+        try:
+            response = await self.get_response(request)
+        finally:
+            _use_primary.reset(token)
+        return self._pin_response(request, response)
+
+    def _pin_response(self, request, response):
+        unsafe = request.method not in self.SAFE_METHODS
+        if unsafe and response.status_code < 400:
+            pin_seconds = getattr(settings, 'REPLICA_PIN_SECONDS', 5)
+            until = f'{time.time() + pin_seconds:.3f}'
+            response.set_cookie(PIN_COOKIE, until, max_age=pin_seconds, httponly=True, samesite='Lax')
+            response[PIN_HEADER] = until
+        return response
+
+
+def _write_heartbeat(connection):
+    connection.execute(
+        f'CREATE TABLE IF NOT EXISTS {HEARTBEAT_TABLE} (id INTEGER PRIMARY KEY, synced_at REAL NOT NULL)'
+    )
+    connection.execute(
+        f'INSERT OR REPLACE INTO {HEARTBEAT_TABLE} (id, synced_at) VALUES (1, ?)', (time.time(),)
+    )
+    connection.commit()
+
+
+def sync_replica(alias, pages=-1):
+    """
+    Copia el primario en la réplica ``alias`` con la API de backup de SQLite.
+
+    Antes de copiar se registra un heartbeat en el primario, de modo que el
+    heartbeat leído en la réplica indica hasta cuándo está al día.
+    """
+    primary_path = str(connections[DEFAULT_DB_ALIAS].settings_dict['NAME'])
+    replica_path = str(connections[alias].settings_dict['NAME'])
+    connections[alias].close()
+
+    source = sqlite3.connect(primary_path, timeout=30)
+    target = sqlite3.connect(replica_path, timeout=30)
+    try:
+        _write_heartbeat(source)
+        source.backup(target, pages=pages)
+    finally:
+        target.close()
+        source.close()
+
+
+def replica_lag(alias):
+    """Segundos desde el último heartbeat copiado a la réplica (None si nunca se sincronizó)"""
+    with connections[alias].cursor() as cursor:
+        try:
+            cursor.execute(f'SELECT synced_at FROM {HEARTBEAT_TABLE} WHERE id = 1')
+        except DatabaseError:
+            return None
+        row = cursor.fetchone()
+    return None if row is None else max(0.0, time.time() - row[0])
+
+
+def replica_status():
+    return [
+        {'alias': alias, 'lag_seconds': replica_lag(alias)}
+        for alias in get_replicas()
+    ]
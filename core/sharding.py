@@ -0,0 +1,636 @@
+"""
+Sharding horizontal de las pistas (opt-in).
+
+Con ``DB_TRACK_SHARDS`` (rutas SQLite separadas por comas) las filas de
+``tracks`` y de su tabla de géneros (``tracks_genres``) se reparten entre los
+alias de ``settings.TRACK_SHARDS`` según un hash estable del ``artist_id``.
+El resto de tablas sigue en ``default``.
+
+- ``TrackShardRouter`` envía las lecturas/escrituras con instancia al shard
+  que corresponde y solo crea las tablas de pistas en los shards.
+- ``ShardedQuerySet`` lanza la consulta en cada shard y mezcla los
+  resultados (ya ordenados por cada shard) con ``heapq.merge``.
+- Como no hay JOIN entre bases de datos, artista y álbum se cargan desde
+  ``default`` y los géneros de cada pista con ``attach_track_relations``.
+- Los ids de las pistas se reservan en ``default`` (``allocate_track_ids``)
+  para que no se repitan entre shards.
+- ``manage.py reshard_tracks`` mueve las pistas que no están en su shard
+  (al cambiar el número de shards o al activar el sharding).
+
+Los alias de ``TRACK_SHARDS_RETIRED`` (``DB_TRACK_SHARDS_RETIRED``) no
+reciben tráfico: solo sirven para vaciarlos con ``reshard_tracks``.
+"""
+import functools
+import heapq
+import uuid
+import zlib
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+from itertools import islice
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, DatabaseError, connections, router, transaction
+from django.db.models import Max, prefetch_related_objects
+from django.dispatch import Signal
+
+from genre.models import Genre
+from track.models import ArchivedTrack, Track, TrackReadModel
+
+from .relations import set_prefetched
+from .replicas import pin_primary
+
+SEQUENCE_TABLE = 'shard_sequences'
+TRACK_SEQUENCE = 'tracks'
+# Parámetros por consulta IN (por debajo del límite de variables de SQLite)
+IN_BATCH_SIZE = 900
+
+# Modelos cuyas filas viven en los shards
+SHARDED_MODELS = {
+    'track.track', 'track.trackgenre', 'track.archivedtrack', 'track.archivedtrackgenre', 'track.trackreadmodel',
+}
+
+# Enviada por los helpers de escritura masiva (que no disparan post_save):
+# track_pks=[...], using=alias
+tracks_changed = Signal()
+
+
+def get_shards():
+    return list(getattr(settings, 'TRACK_SHARDS', []))
+
+
+def get_retired_shards():
+    return list(getattr(settings, 'TRACK_SHARDS_RETIRED', []))
+
+
+def sharding_enabled():
+    return bool(get_shards())
+
+
+def shard_for_artist(artist_pk):
+    """Alias del shard de un artista (las pistas sin artista van al primero)"""
+    shards = get_shards()
+    if not shards:
+        return DEFAULT_DB_ALIAS
+    if artist_pk is None:
+        return shards[0]
+    key = artist_pk if isinstance(artist_pk, uuid.UUID) else uuid.UUID(str(artist_pk))
+    return shards[zlib.crc32(key.bytes) % len(shards)]
+
+
+def shard_for_track(track):
+    return shard_for_artist(track.artist_id_id)
+
+
+class TrackShardRouter:
+    """Enruta las pistas a su shard; el resto de modelos pasa al siguiente router"""
+
+    def _db_for_instance(self, model, hints):
+        if not sharding_enabled() or model._meta.label_lower not in SHARDED_MODELS:
+            return None
+        instance = hints.get('instance')
+        if instance is None:
+            return None
+        if isinstance(instance, Track):
+            # Una pista ya guardada sigue en su base hasta que se reubica
+            if instance._state.db is not None:
+                return instance._state.db
+            return shard_for_track(instance)
+        if instance._meta.label_lower == 'artist.artist':
+            return shard_for_artist(instance.pk)
+        if instance._meta.label_lower == 'album.album':
+            # Las pistas de un álbum se crean con el artista del álbum
+            return shard_for_artist(instance.artist_id_id)
+        return None
+
+    def db_for_read(self, model, **hints):
+        return self._db_for_instance(model, hints)
+
+    def db_for_write(self, model, **hints):
+        alias = self._db_for_instance(model, hints)
+        if alias is not None:
+            pin_primary()
+        return alias
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db not in get_shards() + get_retired_shards():
+            return None
+        return f'{app_label}.{model_name}' in SHARDED_MODELS
+
+
+def ensure_shard_schema(alias):
+    """Crea las tablas de pistas, de sus géneros y de lectura en un shard nuevo"""
+    connection = connections[alias]
+    if Track._meta.db_table in connection.introspection.table_names():
+        return False
+    with connection.schema_editor() as editor:
+        editor.create_model(Track)
+        editor.create_model(Track.genres.through)
+        editor.create_model(TrackReadModel)
+    # El editor de esquema vuelve a activar las claves foráneas en esta conexión
+    connection.close()
+    return True
+
+
+# ---------------------------------------------------------------------------
+# Escrituras
+# ---------------------------------------------------------------------------
+
+# Tablas frías: las de pistas archivadas (las crean sync_schema o
+# archive_tracks) y las de pistas de los shards retirados, que no reciben
+# escrituras. Se miran una vez por proceso y no en cada escritura;
+# archive_tracks anuncia sus cambios en el bus de invalidación con
+# ARCHIVE_EVENT y cada proceso las vuelve a leer en la siguiente numeración
+ARCHIVE_EVENT = ArchivedTrack._meta.label_lower
+_archive_tables = {}
+_cold_track_numbers = None
+
+
+def _has_archive_table(alias):
+    if alias not in _archive_tables:
+        _archive_tables[alias] = ArchivedTrack._meta.db_table in connections[alias].introspection.table_names()
+    return _archive_tables[alias]
+
+
+def _cold_numbers():
+    """Último número de pista por (álbum, disco) en las tablas frías"""
+    global _cold_track_numbers
+    numbers = _cold_track_numbers
+    if numbers is not None:
+        return numbers
+    last = defaultdict(int)
+    aliases = [DEFAULT_DB_ALIAS] + get_shards() + get_retired_shards()
+    sources = [(alias, ArchivedTrack) for alias in aliases if _has_archive_table(alias)]
+    sources += [(alias, Track) for alias in get_retired_shards()]
+    for alias, model in sources:
+        try:
+            rows = list(model.objects.using(alias).exclude(album_id=None).order_by().values(
+                'album_id', 'disc_number'
+            ).annotate(last=Max('track_number')))
+        except DatabaseError:
+            # Shard retirado sin tablas
+            rows = []
+        for row in rows:
+            key = (row['album_id'], row['disc_number'])
+            last[key] = max(last[key], row['last'] or 0)
+    _cold_track_numbers = numbers = dict(last)
+    return numbers
+
+
+def forget_cold_tracks(*args):
+    """Descarta lo leído de las tablas frías en este proceso"""
+    global _cold_track_numbers
+    _archive_tables.clear()
+    _cold_track_numbers = None
+
+
+def connect_signals():
+    # Importación diferida: core.invalidation importa este módulo
+    from .invalidation import subscribe
+    subscribe(ARCHIVE_EVENT, forget_cold_tracks)
+
+
+def _max_track_id():
+    """Mayor id de pista en todas las bases, incluidas las pistas archivadas"""
+    maximum = 0
+    for alias in [DEFAULT_DB_ALIAS] + get_shards() + get_retired_shards():
+        try:
+            value = Track.objects.using(alias).aggregate(value=Max('id'))['value']
+        except DatabaseError:
+            if alias == DEFAULT_DB_ALIAS:
+                raise
+            # Shard todavía sin tablas
+            value = None
+        maximum = max(maximum, value or 0)
+        if _has_archive_table(alias):
+            value = ArchivedTrack.objects.using(alias).aggregate(value=Max('id'))['value']
+            maximum = max(maximum, value or 0)
+    return maximum
+
+
+def allocate_track_ids(count):
+    """Reserva ``count`` ids consecutivos en la secuencia global de ``default``"""
+    if count < 1:
+        return range(0)
+    with transaction.atomic(using=DEFAULT_DB_ALIAS):
+        with connections[DEFAULT_DB_ALIAS].cursor() as cursor:
+            cursor.execute(
+                f'CREATE TABLE IF NOT EXISTS {SEQUENCE_TABLE} '
+                '(name TEXT PRIMARY KEY, value INTEGER NOT NULL)'
+            )
+            # El UPDATE toma el bloqueo de escritura antes de leer el valor
+            cursor.execute(
+                f'UPDATE {SEQUENCE_TABLE} SET value = value + %s WHERE name = %s',
+                [count, TRACK_SEQUENCE]
+            )
+            if cursor.rowcount == 0:
+                cursor.execute(
+                    f'INSERT INTO {SEQUENCE_TABLE} (name, value) VALUES (%s, %s)',
+                    [TRACK_SEQUENCE, _max_track_id() + count]
+                )
+            cursor.execute(f'SELECT value FROM {SEQUENCE_TABLE} WHERE name = %s', [TRACK_SEQUENCE])
+            last = cursor.fetchone()[0]
+    return range(last - count + 1, last + 1)
+
+
+def _group_new_tracks(tracks):
+    """Agrupa pistas nuevas por alias (None = enrutado normal) asignando ids globales"""
+    if not sharding_enabled():
+        return {None: list(tracks)}
+    pending = [track for track in tracks if track.pk is None]
+    for track, pk in zip(pending, allocate_track_ids(len(pending))):
+        track.pk = pk
+    groups = defaultdict(list)
+    for track in tracks:
+        groups[shard_for_track(track)].append(track)
+    return groups
+
+
+def _refresh_aggregates(tracks, genre_pks):
+    """
+    Recalcula los totales de álbum y los géneros de artista afectados por una
+    escritura; ``genre_pks`` son los géneros que añadió o quitó. Los álbumes
+    que las pistas ya tienen en memoria reciben los totales nuevos sin
+    volver a leerlos.
+    """
+    # Importación diferida: core.aggregates importa este módulo
+    from .aggregates import refresh_album_aggregates, refresh_artist_genres
+    totals = refresh_album_aggregates({track.album_id_id for track in tracks})
+    album_field = Track._meta.get_field('album_id')
+    for track in tracks:
+        if track.album_id_id in totals and album_field.is_cached(track):
+            for name, value in totals[track.album_id_id].items():
+                setattr(track.album_id, name, value)
+    refresh_artist_genres({track.artist_id_id for track in tracks}, genre_pks)
+
+
+def assign_track_numbers(tracks):
+    """
+    Numera las pistas con álbum y sin ``track_number`` a continuación de la
+    última de su disco (en todas las bases, archivadas incluidas), en el
+    orden en que se reciben. Solo se consultan las tablas que reciben
+    escrituras; las frías se leen una vez por proceso (``_cold_numbers``).
+    """
+    pending = [track for track in tracks if track.album_id_id is not None and track.track_number is None]
+    if not pending:
+        return
+    album_pks = {track.album_id_id for track in pending}
+    cold = _cold_numbers()
+    last = defaultdict(int)
+    for key in {(track.album_id_id, track.disc_number) for track in pending}:
+        last[key] = cold.get(key, 0)
+    for alias in [DEFAULT_DB_ALIAS] + get_shards():
+        for chunk in _chunks(album_pks):
+            try:
+                rows = list(Track.objects.using(alias).filter(album_id__in=chunk).order_by().values(
+                    'album_id', 'disc_number'
+                ).annotate(last=Max('track_number')))
+            except DatabaseError:
+                if alias == DEFAULT_DB_ALIAS:
+                    raise
+                # Shard todavía sin tablas
+                rows = []
+            for row in rows:
+                key = (row['album_id'], row['disc_number'])
+                last[key] = max(last[key], row['last'] or 0)
+    for track in pending:
+        key = (track.album_id_id, track.disc_number)
+        last[key] += 1
+        track.track_number = last[key]
+
+
+def create_track(track, genre_pks=()):
+    """Inserta una pista y sus géneros en la base que le corresponde"""
+    assign_track_numbers([track])
+    if sharding_enabled() and track.pk is None:
+        track.pk = allocate_track_ids(1)[0]
+    with transaction.atomic(using=router.db_for_write(Track, instance=track)):
+        # La fila de lectura se construye una vez, con los géneros ya
+        # insertados (tracks_changed), no también en el post_save
+        track._read_model_pending = True
+        try:
+            track.save(force_insert=True)
+        finally:
+            del track._read_model_pending
+        TrackGenre = Track.genres.through
+        TrackGenre.objects.using(track._state.db).bulk_create([
+            TrackGenre(track_id=track.pk, genre_id=genre_pk) for genre_pk in genre_pks
+        ])
+        _refresh_aggregates([track], genre_pks)
+        tracks_changed.send(sender=Track, track_pks=[track.pk], using=track._state.db)
+    return track
+
+
+def bulk_create_tracks(tracks, track_genres=(), batch_size=None, ignore_conflicts=False):
+    """
+    ``bulk_create`` de pistas nuevas y de sus géneros (pares ``(pista, pk del
+    género)``). Con sharding cada shard recibe su grupo en una transacción.
+    """
+    tracks = list(tracks)
+    if not tracks:
+        # Lote sin pistas válidas (todas descartadas por el importador)
+        return tracks
+    genre_pks = defaultdict(list)
+    for track, genre_pk in track_genres:
+        genre_pks[id(track)].append(genre_pk)
+
+    assign_track_numbers(tracks)
+    TrackGenre = Track.genres.through
+    for alias, group in _group_new_tracks(tracks).items():
+        with transaction.atomic(using=alias):
+            Track.objects.db_manager(alias).bulk_create(group, batch_size=batch_size)
+            TrackGenre.objects.db_manager(alias).bulk_create(
+                [
+                    TrackGenre(track_id=track.pk, genre_id=genre_pk)
+                    for track in group
+                    for genre_pk in genre_pks[id(track)]
+                ],
+                batch_size=batch_size,
+                ignore_conflicts=ignore_conflicts,
+            )
+            _refresh_aggregates(group, {genre_pk for track in group for genre_pk in genre_pks[id(track)]})
+            tracks_changed.send(sender=Track, track_pks=[track.pk for track in group], using=group[0]._state.db)
+    return tracks
+
+
+def set_track_genres(track, genres):
+    """Equivalente a ``track.genres.set()`` sin JOIN con la tabla de géneros"""
+    TrackGenre = Track.genres.through
+    links = TrackGenre.objects.using(track._state.db).filter(track_id=track.pk)
+    new_pks = {genre.pk for genre in genres}
+    old_pks = set(links.values_list('genre_id', flat=True))
+    if old_pks != new_pks:
+        with transaction.atomic(using=track._state.db):
+            if old_pks - new_pks:
+                links.filter(genre_id__in=old_pks - new_pks).delete()
+            TrackGenre.objects.using(track._state.db).bulk_create([
+                TrackGenre(track_id=track.pk, genre_id=pk) for pk in new_pks - old_pks
+            ])
+            _refresh_aggregates([track], old_pks ^ new_pks)
+            tracks_changed.send(sender=Track, track_pks=[track.pk], using=track._state.db)
+    set_prefetched(track, 'genres', sorted(genres, key=lambda genre: genre.name))
+
+
+def move_tracks(tracks, source, target):
+    """Copia pistas (con sus géneros) de ``source`` a ``target`` y las borra del origen"""
+    if not tracks or source == target:
+        return 0
+    TrackGenre = Track.genres.through
+    pks = [track.pk for track in tracks]
+    links = []
+    for chunk in _chunks(pks):
+        links += TrackGenre.objects.using(source).filter(track_id__in=chunk).values_list(
+            'track_id', 'genre_id'
+        )
+
+    # Primero se inserta en el destino: si algo falla entre los dos pasos,
+    # repetir el movimiento es idempotente
+    with transaction.atomic(using=target):
+        Track.objects.using(target).bulk_create(tracks, ignore_conflicts=True)
+        TrackGenre.objects.using(target).bulk_create(
+            [TrackGenre(track_id=track_pk, genre_id=genre_pk) for track_pk, genre_pk in links],
+            ignore_conflicts=True,
+        )
+    with transaction.atomic(using=source):
+        for chunk in _chunks(pks):
+            TrackGenre.objects.using(source).filter(track_id__in=chunk).delete()
+            Track.objects.using(source).filter(pk__in=chunk).delete()
+
+    for track in tracks:
+        track._state.db = target
+    # En el origen las borra el delete() del ORM (post_delete)
+    tracks_changed.send(sender=Track, track_pks=pks, using=target)
+    return len(tracks)
+
+
+@contextmanager
+def atomic_on_track_databases():
+    """
+    Una transacción en ``default`` y en cada shard (también los retirados),
+    para escrituras que tocan las pistas de cualquier base: un error las
+    deshace en todas
+    """
+    with ExitStack() as transactions:
+        for alias in [DEFAULT_DB_ALIAS] + get_shards() + get_retired_shards():
+            transactions.enter_context(transaction.atomic(using=alias))
+        yield
+
+
+def detach_album_tracks(album_pks):
+    """
+    Deja sin álbum las pistas de los shards de los álbumes ``album_pks``: el
+    ``SET_NULL`` del ``delete()`` del ORM solo llega a las de ``default``.
+    Devuelve cuántas pistas cambió.
+    """
+    album_pks = list(album_pks)
+    detached = 0
+    for alias in get_shards() + get_retired_shards():
+        for chunk in _chunks(album_pks):
+            tracks = Track.objects.using(alias).filter(album_id__in=chunk)
+            track_pks = list(tracks.values_list('pk', flat=True))
+            if not track_pks:
+                continue
+            tracks.update(album_id=None)
+            tracks_changed.send(sender=Track, track_pks=track_pks, using=alias)
+            detached += len(track_pks)
+    return detached
+
+
+def relocate_track(track):
+    """Mueve la pista a otro shard si su artista cambió; devuelve True si se movió"""
+    if not sharding_enabled():
+        return False
+    target = shard_for_track(track)
+    if track._state.db in (None, target):
+        return False
+    return bool(move_tracks([track], track._state.db, target))
+
+
+# ---------------------------------------------------------------------------
+# Lecturas
+# ---------------------------------------------------------------------------
+
+def _chunks(values, size=IN_BATCH_SIZE):
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def attach_track_relations(tracks):
+    """
+    Carga artista y álbum con sus géneros (``default``) y los géneros de cada
+    pista (tabla intermedia de su shard + un ``in_bulk`` de géneros), sin JOIN
+    entre bases.
+    """
+    tracks = list(tracks)
+    if not tracks:
+        return tracks
+    prefetch_related_objects(tracks, 'artist_id', 'album_id', 'album_id__genres')
+
+    by_alias = defaultdict(list)
+    for track in tracks:
+        by_alias[track._state.db].append(track.pk)
+
+    TrackGenre = Track.genres.through
+    links = defaultdict(list)
+    for alias, pks in by_alias.items():
+        for chunk in _chunks(pks):
+            rows = TrackGenre.objects.using(alias).filter(track_id__in=chunk).values_list(
+                'track_id', 'genre_id'
+            )
+            for track_pk, genre_pk in rows:
+                links[track_pk].append(genre_pk)
+
+    genres = {}
+    for chunk in _chunks({pk for pks in links.values() for pk in pks}):
+        genres.update(Genre.objects.in_bulk(chunk))
+    for track in tracks:
+        track_genres = [genres[pk] for pk in links[track.pk] if pk in genres]
+        set_prefetched(track, 'genres', sorted(track_genres, key=lambda genre: genre.name))
+    return tracks
+
+
+def _ordering_key(model, ordering):
+    """Clave de ordenación en Python equivalente al ORDER BY de SQLite (NULL primero)"""
+    fields = []
+    for name in ordering:
+        descending = name.startswith('-')
+        name = name.lstrip('-')
+        if '__' in name:
+            raise ValueError(f"Orden no soportado entre shards: {name}")
+        attname = model._meta.pk.attname if name == 'pk' else model._meta.get_field(name).attname
+        fields.append((attname, descending))
+
+    def compare(a, b):
+        for attname, descending in fields:
+            x, y = getattr(a, attname), getattr(b, attname)
+            if x == y:
+                continue
+            if x is None:
+                result = -1
+            elif y is None:
+                result = 1
+            else:
+                result = -1 if x < y else 1
+            return -result if descending else result
+        return 0
+
+    return functools.cmp_to_key(compare)
+
+
+class ShardedQuerySet:
+    """
+    Consulta de solo lectura repartida entre varios shards.
+
+    Admite lo que usan las vistas (``filter``, ``exclude``, ``order_by``,
+    ``get``, ``count``, iteración y slicing). Cada shard devuelve sus filas ya
+    ordenadas (con ``pk`` como desempate) y se mezclan sin reordenar; un
+    slice ``[a:b]`` pide solo ``b`` filas a cada shard.
+    """
+
+    def __init__(self, queryset, aliases):
+        self.model = queryset.model
+        self._queryset = queryset
+        self.aliases = list(aliases)
+        self._result_cache = None
+
+    def _clone(self, queryset):
+        return ShardedQuerySet(queryset, self.aliases)
+
+    def all(self):
+        return self._clone(self._queryset.all())
+
+    def filter(self, *args, **kwargs):
+        return self._clone(self._queryset.filter(*args, **kwargs))
+
+    def exclude(self, *args, **kwargs):
+        return self._clone(self._queryset.exclude(*args, **kwargs))
+
+    def order_by(self, *fields):
+        return self._clone(self._queryset.order_by(*fields))
+
+    @property
+    def ordering(self):
+        ordering = list(self._queryset.query.order_by or self.model._meta.ordering)
+        return ordering + ['pk']
+
+    def _shard_querysets(self):
+        ordering = self.ordering
+        return [self._queryset.using(alias).order_by(*ordering) for alias in self.aliases]
+
+    def _merge(self, limit=None):
+        querysets = self._shard_querysets()
+        if limit is not None:
+            querysets = [queryset[:limit] for queryset in querysets]
+        merged = heapq.merge(*querysets, key=_ordering_key(self.model, self.ordering))
+        return merged if limit is None else islice(merged, limit)
+
+    def _attach(self, rows):
+        # Las filas de track_read_model ya llevan los nombres: no hay relaciones que cargar
+        if self.model is Track:
+            return attach_track_relations(rows)
+        return list(rows)
+
+    def _fetch_all(self):
+        if self._result_cache is None:
+            self._result_cache = self._attach(self._merge())
+        return self._result_cache
+
+    def __iter__(self):
+        return iter(self._fetch_all())
+
+    def __len__(self):
+        return len(self._fetch_all())
+
+    def __bool__(self):
+        return bool(self._fetch_all())
+
+    def __getitem__(self, key):
+        if self._result_cache is not None:
+            return self._result_cache[key]
+        if isinstance(key, int):
+            if key < 0:
+                raise ValueError("No se admiten índices negativos")
+            return self[key:key + 1][0]
+        if key.step is not None or (key.start or 0) < 0 or (key.stop is not None and key.stop < 0):
+            raise ValueError("Solo se admiten slices positivos sin paso")
+        if key.stop is None:
+            return self._fetch_all()[key]
+        rows = list(islice(self._merge(limit=key.stop), key.start or 0, key.stop))
+        return self._attach(rows)
+
+    def count(self):
+        if self._result_cache is not None:
+            return len(self._result_cache)
+        return sum(self._queryset.using(alias).count() for alias in self.aliases)
+
+    def exists(self):
+        return any(self._queryset.using(alias).exists() for alias in self.aliases)
+
+    def get(self, *args, **kwargs):
+        found = []
+        for alias in self.aliases:
+            found += self._queryset.using(alias).filter(*args, **kwargs)[:2]
+        if not found:
+            raise self.model.DoesNotExist(f"{self.model._meta.object_name} matching query does not exist.")
+        if len(found) > 1:
+            raise self.model.MultipleObjectsReturned(
+                f"get() returned more than one {self.model._meta.object_name}"
+            )
+        return self._attach(found)[0]
+
+
+def sharded_tracks(queryset, artist_id=None):
+    """
+    ``ShardedQuerySet`` de pistas (o de ``track_read_model``): si se filtra
+    por artista solo se consulta su shard; si no, todos.
+    """
+    aliases = get_shards()
+    if artist_id:
+        try:
+            aliases = [shard_for_artist(artist_id)]
+        except ValueError:
+            pass
+    return ShardedQuerySet(queryset.select_related(None).prefetch_related(None), aliases)
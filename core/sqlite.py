@@ -0,0 +1,74 @@
+"""
+Perfil de motor para SQLite.
+
+Los PRAGMA de conexión se aplican cada vez que Django abre una conexión
+(señal ``connection_created``). Se configuran por base de datos con la clave
+``PRAGMAS`` de ``DATABASES``: el nombre de uno de los perfiles de este módulo
+o un diccionario con los PRAGMA::
+
+    DATABASES = {'default': {..., 'PRAGMAS': 'production'}}
+
+Con ``READ_ONLY: True`` además se activa ``query_only`` (réplicas) y con
+``SHARD: True`` se desactivan las claves foráneas (shards de pistas).
+"""
+from django.db.backends.signals import connection_created
+
+PROFILES = {
+    # Valores por defecto de SQLite (journal en modo rollback, sin mmap...)
+    'default': {},
+    'production': {
+        # Los lectores no se bloquean detrás del escritor
+        'journal_mode': 'WAL',
+        # Con WAL, NORMAL solo hace fsync en los checkpoints
+        'synchronous': 'NORMAL',
+        'mmap_size': 256 * 1024 * 1024,
+        # Negativo = KiB (64 MiB de caché de páginas por conexión)
+        'cache_size': -64 * 1024,
+        'temp_store': 'MEMORY',
+        # Esperar al bloqueo de escritura en vez de fallar con 'database is locked'
+        'busy_timeout': 5000,
+    },
+}
+
+ALLOWED_PRAGMAS = {
+    'journal_mode', 'synchronous', 'mmap_size', 'cache_size', 'temp_store',
+    'busy_timeout', 'wal_autocheckpoint', 'journal_size_limit', 'auto_vacuum',
+}
+
+
+def pragma_statements(pragmas):
+    """Sentencias PRAGMA para un perfil; rechaza nombres o valores no válidos"""
+    if isinstance(pragmas, str):
+        if pragmas not in PROFILES:
+            raise ValueError(f"Perfil de SQLite desconocido: {pragmas}")
+        pragmas = PROFILES[pragmas]
+    statements = []
+    for name, value in pragmas.items():
+        if name not in ALLOWED_PRAGMAS:
+            raise ValueError(f"PRAGMA no permitido: {name}")
+        if not str(value).lstrip('-').isalnum():
+            raise ValueError(f"Valor no válido para PRAGMA {name}: {value!r}")
+        statements.append(f'PRAGMA {name} = {value}')
+    return statements
+
+
+def apply_pragmas(sender, connection, **kwargs):
+    """Receptor de ``connection_created``: aplica los PRAGMA configurados"""
+    if connection.vendor != 'sqlite':
+        return
+    statements = pragma_statements(connection.settings_dict.get('PRAGMAS') or {})
+    if connection.settings_dict.get('READ_ONLY'):
+        # Réplicas: cualquier escritura por esta conexión falla
+        statements.append('PRAGMA query_only = ON')
+    if connection.settings_dict.get('SHARD'):
+        # Shards de pistas: artistas, álbumes y géneros están en otra base
+        statements.append('PRAGMA foreign_keys = OFF')
+    if not statements:
+        return
+    with connection.cursor() as cursor:
+        for statement in statements:
+            cursor.execute(statement)
+
+
+def connect_signals():
+    connection_created.connect(apply_pragmas, dispatch_uid='core.sqlite.apply_pragmas')
@@ -0,0 +1,51 @@
+"""
+Datos comunes de los tests de las apps: un país, un sello, un artista, un
+género con un subgénero, un álbum publicado y una pista publicada.
+
+El bus de invalidación solo se lee cuando un test lo pide
+(``invalidation.poll(force=True)``): una lectura por tiempo en medio de una
+petición añadiría consultas a las que cuentan los tests.
+"""
+from datetime import date
+
+from django.test import TestCase, override_settings
+
+from album.models import Album
+from artist.models import Artist
+from country.models import Country
+from genre.models import Genre
+from record_label.models import RecordLabel
+from track.models import Track
+
+from . import dictionaries, invalidation, sharding
+
+BASE = '/api/v1/'
+
+
+@override_settings(INVALIDATION_POLL_INTERVAL=3600)
+class CatalogTestCase(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.country = Country.objects.create(name='España', iso_code='ES', continent='EU')
+        cls.label = RecordLabel.objects.create(name='Sello', country=cls.country)
+        cls.artist = Artist.objects.create(name='Artista', label_id=cls.label, country=cls.country)
+        cls.genre = Genre.objects.create(name='Rock')
+        cls.subgenre = Genre.objects.create(name='Indie', parent_genre=cls.genre)
+        cls.album = Album.objects.create(
+            artist_id=cls.artist, title='Álbum', release_date=date(2020, 1, 1), status='published'
+        )
+        cls.album.genres.add(cls.genre)
+        cls.track = Track.objects.create(
+            artist_id=cls.artist, album_id=cls.album, title='Pista', status='published',
+            audio_master_url='https://example.com/a.mp3'
+        )
+        cls.track.genres.add(cls.subgenre)
+
+    def setUp(self):
+        super().setUp()
+        invalidation.poll(force=True)
+        # Los contadores por país y lo leído de las tablas frías no vuelven atrás
+        # con el rollback de cada test
+        dictionaries.expire_country_counts()
+        sharding.forget_cold_tracks()
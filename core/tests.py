@@ -1,3 +1,925 @@
-from django.test import TestCase
+import contextvars
+import csv
+import gzip
+import json
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+import time
+from contextlib import closing
+from datetime import date
+from io import StringIO
+from unittest import mock, skipUnless
 
-# Create your tests here.
+from asgiref.sync import async_to_sync
+
+from django.conf import settings
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, OperationalError, connection, connections, transaction
+from django.db.models import F
+from django.http import HttpResponse
+from django.test import AsyncClient, RequestFactory, SimpleTestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from rest_framework.test import APIClient
+
+from album.models import Album
+from artist.models import Artist
+from core import coalescing, dictionaries, invalidation, replicas, sqlite, warmup
+from core.catalog_import import Checkpoint, LookupCache
+from core.models import DictionaryVersion, InvalidationEvent
+from core.relations import set_prefetched
+from core.sharding import create_track, relocate_track, shard_for_artist
+from core.testing import BASE, CatalogTestCase
+from core.updates import is_unique_violation
+from core.write_queue import WriteQueue, get_write_queue, run_write
+from country.models import Country
+from genre.models import Genre
+from record_label.models import RecordLabel
+from track.models import Track, TrackReadModel
+from track.serializers import TrackCreateSerializer
+
+# Tablas diccionario (decenas/cientos de filas): recorrerlas enteras es
+# aceptable, p. ej. para un LIKE '%texto%' sobre el nombre del género
+DICTIONARY_TABLES = {'genres', 'countries'}
+
+FULL_SCAN = re.compile(r'\bSCAN (\w+)$')
+TABLE_ACCESS = re.compile(r'\b(?:SCAN|SEARCH) (\w+)')
+# prefetch_related: WHERE ... IN (<lista de ids>) ordenado en memoria; el
+# conjunto está acotado por la página ya leída, así que se admite
+PREFETCH = re.compile(r'\bIN \((?!SELECT)')
+
+
+class QueryPlanTests(CatalogTestCase):
+    """
+    Ejecuta cada endpoint de lectura, captura sus consultas y comprueba con
+    EXPLAIN QUERY PLAN que ninguna recorre entera una tabla grande ni ordena
+    con un B-tree temporal (es decir, que los índices cubren filtro y orden).
+    """
+
+    def endpoints(self):
+        artist, album, track = self.artist.pk, self.album.pk, self.track.pk
+        country, genre, label = self.country.pk, self.genre.pk, self.label.pk
+        return [
+            'tracks/',
+            'tracks/?ordering=-title',
+            'tracks/?status=published',
+            'tracks/?status=retired',
+            f'tracks/?album_id={album}',
+            f'tracks/?artist_id={artist}',
+            f'tracks/?artist_id={artist}&album_id={album}',
+            'tracks/?genre=ind',
+            'tracks/?genre=rock&include_subgenres=true',
+            'tracks/search/?q=pis',
+            'tracks/?flat=true',
+            f'tracks/?flat=true&album_id={album}',
+            f'tracks/?flat=true&artist_id={artist}',
+            'tracks/?flat=true&genre=ind',
+            'tracks/search/?q=art&flat=true',
+            f'tracks/{track}/',
+            'albums/',
+            'albums/?ordering=release_date',
+            'albums/?status=published',
+            'albums/?status=draft',
+            f'albums/?artist_id={artist}',
+            f'albums/?artist_id={artist}&status=published',
+            'albums/search/?q=alb',
+            'albums/?released=true',
+            'albums/?released=false',
+            'albums/upcoming/',
+            f'albums/{album}/',
+            f'albums/{album}/album_songs/',
+            'artists/',
+            'artists/?ordering=-name',
+            'artists/?genre=Rock',
+            f'artists/?genre={genre}&include_subgenres=true',
+            'artists/?query=art',
+            f'artists/{artist}/',
+            f'artists/{artist}/albums/',
+            f'artists/{artist}/tracks/',
+            'countries/',
+            'countries/?continent=EU',
+            'countries/?is_active=true',
+            'countries/?search=es',
+            f'countries/{country}/',
+            f'countries/{country}/artists/',
+            f'countries/{country}/record_labels/',
+            'countries/continents/',
+            'countries/ES/',
+            'genres/',
+            'genres/?is_subgenre=true',
+            f'genres/?parent_genre_id={genre}',
+            f'genres/{genre}/',
+            f'genres/{genre}/subgenres/',
+            f'genres/{genre}/tracks/',
+            f'genres/{genre}/albums/',
+            f'genres/{genre}/tracks/?include_subgenres=true',
+            f'genres/{genre}/albums/?include_subgenres=true',
+            'genres/hierarchy/',
+            'labels/',
+            'labels/?ordering=-created_at',
+            'labels/search/?q=sel',
+            f'labels/{label}/',
+            f'labels/{label}/artists/',
+            f'labels/{label}/albums/',
+        ]
+
+    def bounded_sorts(self):
+        """Endpoints donde ordenar en memoria es deliberado"""
+        return {
+            # Álbumes de los artistas de un sello: ordenar las pocas decenas de
+            # filas sale más barato que recorrer entero el índice de álbumes
+            f'labels/{self.label.pk}/albums/',
+        }
+
+    def query_plan(self, sql):
+        with connection.cursor() as cursor:
+            cursor.execute(f'EXPLAIN QUERY PLAN {sql}')
+            return [row[-1] for row in cursor.fetchall()]
+
+    def plan_problems(self, sql, allow_sort=False):
+        plan = self.query_plan(sql)
+        tables = {match.group(1) for line in plan for match in TABLE_ACCESS.finditer(line)}
+        if tables and tables <= DICTIONARY_TABLES:
+            return []
+        problems = []
+        for line in plan:
+            match = FULL_SCAN.search(line)
+            if match and match.group(1) not in DICTIONARY_TABLES:
+                problems.append(line)
+            elif 'USE TEMP B-TREE' in line and not (allow_sort or PREFETCH.search(sql)):
+                problems.append(line)
+        return problems
+
+    def test_read_endpoints_use_indexes(self):
+        client = APIClient()
+        bounded_sorts = self.bounded_sorts()
+        for path in self.endpoints():
+            with self.subTest(path=path):
+                with CaptureQueriesContext(connection) as captured:
+                    response = client.get(BASE + path)
+                self.assertEqual(response.status_code, 200, response.content)
+                for query in captured.captured_queries:
+                    sql = query['sql']
+                    if not sql.startswith('SELECT'):
+                        continue
+                    self.assertEqual(self.plan_problems(sql, path in bounded_sorts), [], sql)
+
+    def test_ordering_outside_allowlist_is_rejected(self):
+        response = APIClient().get(BASE + 'tracks/?ordering=duration_sec')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('ordering', response.json())
+
+
+class DictionarySnapshotTests(CatalogTestCase):
+    def test_nested_countries_come_from_dictionary_snapshot(self):
+        client = APIClient()
+        client.get(BASE + 'artists/')
+
+        with CaptureQueriesContext(connection) as queries:
+            artists = client.get(BASE + 'artists/').json()['items']
+            labels = client.get(BASE + 'labels/').json()['items']
+            continents = client.get(BASE + 'countries/continents/').json()
+        self.assertFalse([query for query in queries if '"countries"' in query['sql']])
+        self.assertEqual(artists[0]['country']['iso_code'], 'ES')
+        self.assertEqual(artists[0]['country']['artists_count'], 1)
+        self.assertEqual(labels[0]['country']['record_labels_count'], 1)
+        self.assertEqual(continents, [{'code': 'EU', 'name': 'Europa', 'countries_count': 1}])
+        self.assertEqual(client.get(BASE + 'countries/es/').json()['id'], str(self.country.pk))
+
+        # Otro proceso cambia el país (UPDATE sin señales) e incrementa la versión
+        Country.objects.filter(pk=self.country.pk).update(name='Reino de España')
+        DictionaryVersion.objects.filter(name='dictionaries').update(version=F('version') + 1)
+        with self.settings(DICTIONARY_CHECK_INTERVAL=0):
+            artist = client.get(BASE + f'artists/{self.artist.pk}/').json()
+        self.assertEqual(artist['country']['name'], 'Reino de España')
+
+    def test_artist_and_label_writes_do_not_bump_the_version(self):
+        client = APIClient()
+        version = dictionaries.current_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.patch(BASE + f'artists/{self.artist.pk}/', {'name': 'Otro'}, format='json')
+            self.assertEqual(response.status_code, 200, response.content)
+            Artist.objects.create(name='Nuevo', country=self.country)
+        self.assertEqual(dictionaries.current_version(), version)
+        self.assertFalse(InvalidationEvent.objects.filter(model='core.dictionaryversion').exists())
+
+        # El contador caduca en este proceso sin tocar la copia de los diccionarios
+        artist = client.get(BASE + f'artists/{self.artist.pk}/').json()
+        self.assertEqual(artist['country']['artists_count'], 2)
+        self.assertEqual(dictionaries.snapshot().version, version)
+
+
+class InvalidationBusTests(CatalogTestCase):
+    def test_invalidation_events_are_coalesced_per_model(self):
+        received = []
+        invalidation.subscribe('genre.genre', received.append)
+        self.addCleanup(invalidation.unsubscribe, 'genre.genre', received.append)
+        invalidation.poll(force=True)
+
+        # Una transacción: un único evento por objeto, publicado al confirmar
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                self.genre.description = 'Guitarras'
+                self.genre.save()
+                self.genre.save()
+                self.subgenre.save()
+        events = list(InvalidationEvent.objects.filter(model='genre.genre').values_list('object_pk', flat=True))
+        self.assertEqual(sorted(events), sorted([str(self.genre.pk), str(self.subgenre.pk)]))
+        self.assertEqual(received, [{str(self.genre.pk), str(self.subgenre.pk)}])
+
+        # Otro proceso los lee en su siguiente poll, agrupados en una llamada
+        received.clear()
+        invalidation._state.last_id = InvalidationEvent.objects.order_by('id').first().id - 1
+        self.assertEqual(invalidation.poll(force=True), InvalidationEvent.objects.count())
+        self.assertEqual(received, [{str(self.genre.pk), str(self.subgenre.pk)}])
+        status = APIClient().get(BASE + 'invalidation/status').json()
+        self.assertEqual(status['pending_events'], 0)
+        self.assertIsNotNone(status['last_lag_seconds'])
+
+
+class SingleFlightTests(SimpleTestCase):
+
+    def test_concurrent_reads_share_one_computation(self):
+        # Peticiones iguales durante un cálculo esperan y comparten su resultado
+        flight = coalescing.SingleFlight()
+        calls = []
+
+        def slow():
+            calls.append(1)
+            time.sleep(0.2)
+            return len(calls)
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(flight.run('k', slow, 5))) for _ in range(5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(sorted(shared for _, shared in results), [False, True, True, True, True])
+        self.assertEqual({result for result, _ in results}, {1})
+
+
+class ResponseCacheTests(CatalogTestCase):
+    def test_cached_responses_are_cleared_by_writes(self):
+        # Dentro del TTL no hay consultas; una escritura vacía la caché
+        coalescing.cache.clear()
+        self.addCleanup(coalescing.cache.clear)
+        client = APIClient()
+        url = BASE + f'artists/{self.artist.pk}/'
+        with self.settings(RESPONSE_CACHE={'ENABLED': True, 'TTL': 60}):
+            client.get(url)
+            with CaptureQueriesContext(connection) as ctx:
+                response = client.get(url)
+            self.assertFalse(ctx.captured_queries)
+            self.assertEqual(response[coalescing.CACHE_HEADER], 'hit')
+            with self.captureOnCommitCallbacks(execute=True):
+                self.artist.name = 'Otro nombre'
+                self.artist.save()
+            self.assertEqual(client.get(url).json()['name'], 'Otro nombre')
+
+
+class WarmUpTests(CatalogTestCase):
+    def test_warm_up_prepares_snapshots_and_hot_responses(self):
+        dictionaries.invalidate()
+        coalescing.cache.clear()
+        self.addCleanup(coalescing.cache.clear)
+        path = BASE + f'artists/{self.artist.pk}/'
+        with self.settings(RESPONSE_CACHE={'ENABLED': True, 'TTL': 60}):
+            report = warmup.warm_up([path], fork=False)
+            self.assertEqual(report['responses'], {path: 200})
+            self.assertEqual(report['genres'], 2)
+            self.assertGreater(report['modules'], 0)
+            self.assertEqual(set(report['seconds']), {'imports', 'dictionaries', 'responses', 'total'})
+            # La página ya está en la caché y la copia de diccionarios construida
+            with CaptureQueriesContext(connection) as ctx:
+                response = APIClient().get(path)
+            self.assertEqual(response[coalescing.CACHE_HEADER], 'hit')
+            self.assertFalse(ctx.captured_queries)
+
+
+class BinaryKeyStorageTests(CatalogTestCase):
+    """Claves en BLOB de 16 bytes (``PRIMARY_KEY_STORAGE = 'binary'``)"""
+
+    def setUp(self):
+        # Los datos se crearon como texto: se convierten dentro de la transacción del test
+        call_command('convert_primary_keys', '--to', 'binary', '--database', 'default', stdout=StringIO())
+        override = self.settings(PRIMARY_KEY_STORAGE='binary')
+        override.enable()
+        self.addCleanup(override.disable)
+
+    def test_lookups_accept_every_key_representation(self):
+        pk = self.genre.pk
+        for value in (pk, str(pk), pk.hex, pk.bytes, memoryview(pk.bytes)):
+            with self.subTest(value=value):
+                self.assertEqual(Genre.objects.get(pk=value), self.genre)
+                self.assertEqual(list(Genre.objects.filter(pk__in=[value])), [self.genre])
+        self.assertEqual(list(Track.objects.filter(artist_id=self.artist.pk.bytes)), [self.track])
+        self.assertEqual(list(Track.objects.filter(artist_id__name='Artista')), [self.track])
+
+    def test_detail_fk_and_prefetch_reads(self):
+        client = APIClient()
+        self.assertEqual(client.get(BASE + f'genres/{self.genre.pk}/').status_code, 200)
+        self.assertEqual(client.get(BASE + f'artists/{self.artist.pk}/').json()['name'], 'Artista')
+        # Prefetch de géneros y álbumes a través de columnas BLOB
+        track = client.get(BASE + f'tracks/{self.track.pk}/').json()
+        self.assertEqual(track['genres'], [str(self.subgenre.pk)])
+        self.assertEqual(track['album']['title'], 'Álbum')
+        albums = client.get(BASE + f'artists/{self.artist.pk}/albums/').json()['items']
+        self.assertEqual([album['id'] for album in albums], [str(self.album.pk)])
+        songs = client.get(BASE + f'albums/{self.album.pk}/album_songs/').json()['songs']
+        self.assertEqual([song['title'] for song in songs], ['Pista'])
+
+
+class CatalogImportTests(CatalogTestCase):
+    """``manage.py import_catalog`` sobre ficheros JSONL temporales"""
+
+    def write_records(self, records):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'catalogo.jsonl')
+        with open(path, 'w', encoding='utf-8') as handle:
+            for record in records:
+                handle.write(json.dumps(record) + '\n')
+        return path
+
+    def import_catalog(self, path, *args):
+        stdout, stderr = StringIO(), StringIO()
+        call_command('import_catalog', path, *args, stdout=stdout, stderr=stderr)
+        return stdout.getvalue(), stderr.getvalue()
+
+    def test_batch_with_every_track_rejected(self):
+        path = self.write_records([
+            {'model': 'artist', 'name': 'Nuevo', 'label': 'Sello', 'country': 'ES'},
+            {'model': 'track', 'title': 'Sin audio', 'artist': 'Nuevo'},
+        ])
+        stdout, stderr = self.import_catalog(path)
+        self.assertIn('1 creados (artist=1)', stdout)
+        self.assertIn('Se requieren title y audio_master_url', stderr)
+        self.assertTrue(Artist.objects.filter(name='Nuevo').exists())
+        self.assertFalse(Track.objects.filter(title='Sin audio').exists())
+
+    def test_related_records_are_resolved_by_name(self):
+        path = self.write_records([
+            {'model': 'genre', 'name': 'Shoegaze', 'parent': 'Rock'},
+            {'model': 'artist', 'name': 'Nuevo', 'label': 'Sello', 'country': 'ES'},
+            {'model': 'album', 'title': 'Debut', 'artist': ' nuevo ', 'release_date': '2021-05-01',
+             'genres': 'Shoegaze'},
+            {'model': 'track', 'title': 'Una', 'artist': 'Nuevo', 'album': 'Debut',
+             'audio_master_url': 'https://example.com/1.mp3', 'genres': 'Shoegaze|Indie'},
+            {'model': 'track', 'title': 'Dos', 'artist': 'Nuevo', 'album': 'Debut',
+             'audio_master_url': 'https://example.com/2.mp3', 'genres': 'Jazz'},
+            {'model': 'artist', 'name': 'ARTISTA'},
+        ])
+        stdout, stderr = self.import_catalog(path, '--batch-size', '2')
+        self.assertIn('4 creados (genre=1, artist=1, album=1, track=1), 1 ya existentes, 1 descartados', stdout)
+        self.assertIn('registro 5: Género no encontrado: Jazz', stderr)
+        track = Track.objects.get(title='Una')
+        self.assertEqual((track.artist_id.name, track.album_id.title, track.track_number), ('Nuevo', 'Debut', 1))
+        self.assertEqual(sorted(track.genres.values_list('name', flat=True)), ['Indie', 'Shoegaze'])
+        self.assertEqual(Genre.objects.get(name='Shoegaze').parent_genre, self.genre)
+        self.assertFalse(os.path.exists(path + '.checkpoint'))
+
+    def test_import_resumes_after_the_checkpoint(self):
+        path = self.write_records([
+            {'model': 'genre', 'name': f'Género {number}'} for number in range(1, 6)
+        ])
+        # Un import anterior confirmó los dos primeros registros y se interrumpió
+        Genre.objects.bulk_create([Genre(name='Género 1'), Genre(name='Género 2')])
+        Checkpoint(path + '.checkpoint', path).save(2, {'genre': 2})
+        stdout, _ = self.import_catalog(path)
+        self.assertIn('Reanudando desde el registro 2', stdout)
+        self.assertIn('3 creados (genre=3), 0 ya existentes', stdout)
+        self.assertEqual(Genre.objects.filter(name__startswith='Género').count(), 5)
+        self.assertFalse(os.path.exists(path + '.checkpoint'))
+
+        # Un checkpoint de otro fichero no se aplica
+        Checkpoint(path + '.checkpoint', path + '.otro').save(3, {})
+        with self.assertRaisesMessage(CommandError, 'corresponde a otro fichero'):
+            self.import_catalog(path)
+        stdout, _ = self.import_catalog(path, '--restart')
+        self.assertIn('0 creados (ninguno), 5 ya existentes', stdout)
+
+    def test_rows_naming_the_artist_by_id_reuse_existing_albums(self):
+        path = self.write_records([
+            {'model': 'album', 'title': 'Álbum', 'artist_id': str(self.artist.pk), 'release_date': '2020-01-01'},
+            {'model': 'track', 'title': 'Nueva', 'artist_id': str(self.artist.pk), 'album': 'Álbum',
+             'audio_master_url': 'https://example.com/n.mp3'},
+        ])
+        stdout, stderr = self.import_catalog(path)
+        self.assertIn('1 creados (track=1), 1 ya existentes', stdout)
+        self.assertEqual(stderr, '')
+        self.assertEqual(Album.objects.filter(title='Álbum').count(), 1)
+        self.assertEqual(Track.objects.get(title='Nueva').album_id_id, self.album.pk)
+
+    def test_reimporting_does_not_duplicate_tracks(self):
+        path = self.write_records([
+            {'model': 'album', 'title': 'Debut', 'artist': 'Artista', 'release_date': '2021-05-01'},
+            {'model': 'track', 'title': 'Una', 'artist': 'Artista', 'album': 'Debut',
+             'audio_master_url': 'https://example.com/1.mp3'},
+            {'model': 'track', 'title': 'Una', 'artist': 'Artista', 'album': 'Debut', 'disc_number': 2,
+             'audio_master_url': 'https://example.com/2.mp3'},
+            {'model': 'track', 'title': 'Pista', 'artist_id': str(self.artist.pk), 'album': 'Álbum',
+             'audio_master_url': 'https://example.com/3.mp3'},
+            # Repetida dentro del mismo fichero
+            {'model': 'track', 'title': 'Una', 'artist': 'Artista', 'album': 'Debut',
+             'audio_master_url': 'https://example.com/1.mp3'},
+        ])
+        stdout, _ = self.import_catalog(path)
+        self.assertIn('3 creados (album=1, track=2), 2 ya existentes', stdout)
+        stdout, _ = self.import_catalog(path, '--restart')
+        self.assertIn('0 creados (ninguno), 5 ya existentes', stdout)
+        self.assertEqual(Track.objects.filter(title='Una').count(), 2)
+        self.assertEqual(Track.objects.filter(title='Pista').count(), 1)
+
+    def test_report_every_must_be_positive(self):
+        path = self.write_records([{'model': 'genre', 'name': 'Jazz'}])
+        with self.assertRaisesMessage(CommandError, '--report-every'):
+            self.import_catalog(path, '--report-every', '0')
+        self.assertFalse(Genre.objects.filter(name='Jazz').exists())
+
+    def test_lookup_cache_evicts_least_recently_used_keys(self):
+        cache = LookupCache(Genre, 'name', max_size=2)
+        cache.prefetch(['Rock', 'Indie'])
+        self.assertEqual(cache.get('Rock'), self.genre.pk)
+        cache.add('Jazz', 'pk-jazz')
+        # Se descarta la clave usada hace más tiempo, no toda la caché
+        self.assertIn('Rock', cache)
+        self.assertIn('Jazz', cache)
+        self.assertNotIn('Indie', cache)
+        with CaptureQueriesContext(connection) as queries:
+            cache.prefetch(['Rock', 'Indie'])
+        self.assertEqual(len(queries), 1)
+        self.assertEqual(cache.get('Indie'), self.subgenre.pk)
+
+
+class CatalogExportTests(CatalogTestCase):
+    """``GET /export/{entity}`` y ``manage.py export_catalog``"""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        for number in range(2, 6):
+            track = Track.objects.create(
+                artist_id=cls.artist, album_id=cls.album, title=f'Pista {number}', status='published',
+                audio_master_url=f'https://example.com/{number}.mp3'
+            )
+            track.genres.add(cls.genre, cls.subgenre)
+
+    def export(self, query):
+        response = APIClient().get(BASE + 'export/tracks?' + query)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response
+
+    def test_ndjson_is_streamed_in_chunks(self):
+        response = self.export('chunk_size=2')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="tracks.ndjson"')
+        with CaptureQueriesContext(connection) as queries:
+            lines = [line.decode() for line in response.streaming_content]
+        # Una línea por pista, y una consulta de géneros por bloque de 2 pistas
+        rows = [json.loads(line) for line in lines]
+        self.assertEqual([row['id'] for row in rows], sorted(Track.objects.values_list('pk', flat=True)))
+        self.assertEqual(rows[0]['artist'], 'Artista')
+        self.assertEqual(rows[0]['genres'], ['Indie'])
+        self.assertEqual(rows[1]['genres'], ['Indie', 'Rock'])
+        genre_queries = [query for query in queries if '"tracks_genres"' in query['sql']]
+        self.assertEqual(len(genre_queries), 3)
+
+    def test_csv_can_be_gzipped(self):
+        response = self.export('format=csv&gzip=true')
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="tracks.csv.gz"')
+        text = gzip.decompress(b''.join(response.streaming_content)).decode()
+        rows = list(csv.DictReader(text.splitlines()))
+        self.assertEqual(len(rows), 5)
+        self.assertEqual((rows[0]['title'], rows[0]['album'], rows[0]['genres']), ('Pista', 'Álbum', 'Indie'))
+        self.assertEqual(rows[1]['genres'], 'Indie|Rock')
+
+    def test_invalid_parameters(self):
+        client = APIClient()
+        self.assertEqual(client.get(BASE + 'export/users').status_code, 404)
+        self.assertEqual(client.get(BASE + 'export/tracks?format=xml').status_code, 400)
+        self.assertEqual(client.get(BASE + 'export/tracks?chunk_size=0').status_code, 400)
+
+    def test_command_writes_gzip_file(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'albums.ndjson.gz')
+        call_command('export_catalog', 'albums', '--gzip', '--chunk-size', '1', '--output', path)
+        with gzip.open(path, 'rt', encoding='utf-8') as handle:
+            rows = [json.loads(line) for line in handle]
+        self.assertEqual(
+            [(row['title'], row['artist'], row['genres']) for row in rows], [('Álbum', 'Artista', ['Rock'])]
+        )
+        with self.assertRaisesMessage(CommandError, '--chunk-size'):
+            call_command('export_catalog', 'albums', '--chunk-size', '0', '--output', path)
+
+
+class WriteQueueTests(TransactionTestCase):
+    """El hilo escritor confirma en su propia conexión: sin la transacción de TestCase"""
+
+    def test_units_are_grouped_and_fail_alone(self):
+        write_queue = WriteQueue(max_batch=10, max_delay_ms=200)
+        self.addCleanup(write_queue.stop)
+
+        def failing():
+            Genre.objects.create(name='Deshecho')
+            raise ValueError('unidad inválida')
+
+        futures = [write_queue.submit(lambda number=number: Genre.objects.create(name=f'Cola {number}'))
+                   for number in range(3)]
+        futures.insert(1, write_queue.submit(failing))
+        self.assertEqual([future.result().name for future in futures if future is not futures[1]],
+                         ['Cola 0', 'Cola 1', 'Cola 2'])
+        with self.assertRaisesMessage(ValueError, 'unidad inválida'):
+            futures[1].result()
+        # Un solo lote; el error solo deshizo su savepoint
+        self.assertEqual((write_queue.batches, write_queue.units), (1, 4))
+        self.assertEqual(sorted(Genre.objects.values_list('name', flat=True)), ['Cola 0', 'Cola 1', 'Cola 2'])
+
+    def test_run_write_uses_the_queue_outside_transactions(self):
+        self.addCleanup(get_write_queue().stop)
+        with self.settings(WRITE_QUEUE={'ENABLED': True}):
+            genre = run_write(lambda: Genre.objects.create(name='Encolado'))
+            self.assertEqual(genre.name, 'Encolado')
+            self.assertEqual(get_write_queue().units, 1)
+            # Dentro de una transacción se escribe en ella, sin pasar por la cola
+            with transaction.atomic():
+                run_write(lambda: Genre.objects.create(name='Directo'))
+            self.assertEqual(get_write_queue().units, 1)
+        self.assertEqual(Genre.objects.filter(name__in=['Encolado', 'Directo']).count(), 2)
+
+    def test_benchmark_writes_reports_both_modes(self):
+        stdout = StringIO()
+        call_command('benchmark_writes', '--writers', '1', '--ops', '5', stdout=stdout, stderr=StringIO())
+        lines = stdout.getvalue().splitlines()
+        self.assertEqual([line.split()[:3] for line in lines[2:]], [['direct', '1', '5'], ['queue', '1', '5']])
+        # Las filas de la prueba se borran al terminar
+        self.assertFalse(Genre.objects.exists())
+        with self.assertRaisesMessage(CommandError, '--ops'):
+            call_command('benchmark_writes', '--ops', '0')
+
+
+class BatchedRelationTests(CatalogTestCase):
+    """Serializers de escritura: un pk__in por modelo, con las instancias reutilizadas"""
+
+    def payload(self, title='Nueva', genres=None):
+        return {
+            'artist_id': str(self.artist.pk), 'album_id': str(self.album.pk), 'title': title,
+            'duration_sec': 100, 'audio_master_url': 'https://example.com/n.mp3',
+            'genres': [str(self.genre.pk), str(self.subgenre.pk)] if genres is None else genres,
+        }
+
+    def test_one_query_per_related_model(self):
+        # Géneros repetidos y en otra representación (hex sin guiones) se resuelven una vez
+        serializer = TrackCreateSerializer(data=self.payload(genres=[
+            str(self.genre.pk), self.genre.pk.hex, str(self.subgenre.pk),
+        ]))
+        with self.assertNumQueries(3):
+            self.assertTrue(serializer.is_valid(), serializer.errors)
+        data = serializer.validated_data
+        self.assertEqual((data['artist_id'], data['album_id']), (self.artist, self.album))
+        self.assertEqual(data['genres'], [self.genre, self.subgenre])
+
+    def test_bulk_payloads_share_the_lookups(self):
+        serializer = TrackCreateSerializer(many=True, data=[
+            self.payload('Una', [str(self.genre.pk)]),
+            self.payload('Dos', [str(self.subgenre.pk)]),
+            self.payload('Tres'),
+        ])
+        with self.assertNumQueries(3):
+            self.assertTrue(serializer.is_valid(), serializer.errors)
+        self.assertIs(serializer.validated_data[0]['artist_id'], serializer.validated_data[2]['artist_id'])
+
+    def test_invalid_ids_are_reported_per_field(self):
+        missing = '00000000-0000-0000-0000-000000000000'
+        serializer = TrackCreateSerializer(data={
+            **self.payload(genres=[str(self.genre.pk), missing]), 'artist_id': missing, 'album_id': 'abc',
+        })
+        self.assertFalse(serializer.is_valid())
+        self.assertEqual(serializer.errors['artist_id'], ['Artista no encontrado'])
+        self.assertEqual(serializer.errors['album_id'][0].code, 'incorrect_type')
+        self.assertEqual(serializer.errors['genres'][0].code, 'does_not_exist')
+
+        serializer = TrackCreateSerializer(data=self.payload(genres=str(self.genre.pk)))
+        self.assertFalse(serializer.is_valid())
+        self.assertEqual(serializer.errors['genres'][0].code, 'not_a_list')
+
+    def test_set_prefetched_serves_the_relation_from_memory(self):
+        track = Track.objects.get(pk=self.track.pk)
+        set_prefetched(track, 'genres', [self.genre])
+        with self.assertNumQueries(0):
+            self.assertEqual(list(track.genres.all()), [self.genre])
+
+
+class SqliteProfileTests(SimpleTestCase):
+    """PRAGMA de ``DATABASES[...]['PRAGMAS']`` sobre bases SQLite temporales"""
+
+    def open_database(self, alias='perfil', **options):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        settings_dict = {
+            **connections['default'].settings_dict, 'NAME': os.path.join(directory.name, f'{alias}.sqlite3'),
+            'PRAGMAS': 'production', **options,
+        }
+        database = connections['default'].__class__(settings_dict, alias=alias)
+        self.addCleanup(database.close)
+        return database
+
+    def pragma(self, database, name):
+        with database.cursor() as cursor:
+            cursor.execute(f'PRAGMA {name}')
+            return cursor.fetchone()[0]
+
+    def test_production_profile_is_applied_on_connect(self):
+        database = self.open_database()
+        self.assertEqual(self.pragma(database, 'journal_mode'), 'wal')
+        self.assertEqual(self.pragma(database, 'synchronous'), 1)  # NORMAL
+        self.assertEqual(self.pragma(database, 'busy_timeout'), 5000)
+        self.assertEqual(self.pragma(database, 'cache_size'), -64 * 1024)
+        self.assertEqual(self.pragma(database, 'temp_store'), 2)  # MEMORY
+        self.assertEqual(self.pragma(database, 'foreign_keys'), 1)
+
+    def test_replica_and_shard_flags(self):
+        replica = self.open_database('replica', READ_ONLY=True)
+        with self.assertRaises(OperationalError), replica.cursor() as cursor:
+            cursor.execute('CREATE TABLE prueba (id INTEGER)')
+        shard = self.open_database('shard', SHARD=True)
+        self.assertEqual(self.pragma(shard, 'foreign_keys'), 0)
+
+    def test_profiles_are_validated(self):
+        self.assertEqual(sqlite.pragma_statements({'busy_timeout': 100}), ['PRAGMA busy_timeout = 100'])
+        for pragmas in ('rapido', {'writable_schema': 'ON'}, {'journal_mode': 'WAL; DROP TABLE artists'}):
+            with self.subTest(pragmas=pragmas), self.assertRaises(ValueError):
+                sqlite.pragma_statements(pragmas)
+
+    def test_db_maintenance_on_a_wal_database(self):
+        database = self.open_database('mantenimiento')
+        connections['mantenimiento'] = database
+        self.addCleanup(connections.__delitem__, 'mantenimiento')
+        stdout = StringIO()
+        call_command(
+            'db_maintenance', '--database', 'mantenimiento', '--enable-incremental-vacuum', stdout=stdout
+        )
+        output = stdout.getvalue()
+        for step in ('ANALYZE completado', 'auto_vacuum=INCREMENTAL activado', 'Checkpoint WAL (TRUNCATE)'):
+            self.assertIn(step, output)
+        self.assertEqual(self.pragma(database, 'auto_vacuum'), 2)
+
+
+@override_settings(DATABASE_REPLICAS=['replica_a', 'replica_b'], REPLICA_PIN_SECONDS=5)
+class ReplicaRoutingTests(SimpleTestCase):
+    """Reparto de lecturas, 'read your writes' y retraso de las réplicas"""
+
+    def handle(self, request, status=200):
+        """Pasa la petición por el middleware; devuelve (respuesta, base de las lecturas)"""
+        seen = []
+
+        def view(request):
+            seen.append(replicas.ReplicaRouter().db_for_read(Artist))
+            return HttpResponse(status=status)
+
+        response = contextvars.Context().run(replicas.ReplicaRoutingMiddleware(view), request)
+        return response, seen[0]
+
+    def test_router_pins_the_primary_after_a_write(self):
+        def route():
+            router = replicas.ReplicaRouter()
+            before = {router.db_for_read(Artist) for _ in range(20)}
+            self.assertEqual(router.db_for_write(Artist), 'default')
+            return before, router.db_for_read(Artist)
+
+        # Contexto vacío: sin el pin que otra escritura haya dejado en este hilo
+        before, after = contextvars.Context().run(route)
+        self.assertEqual(before, {'replica_a', 'replica_b'})
+        self.assertEqual(after, 'default')
+        self.assertFalse(replicas.ReplicaRouter().allow_migrate('replica_a', 'artist', 'artist'))
+
+    def test_middleware_reads_your_writes(self):
+        factory = RequestFactory()
+        response, used = self.handle(factory.get('/'))
+        self.assertNotEqual(used, 'default')
+        self.assertNotIn(replicas.PIN_COOKIE, response.cookies)
+
+        response, used = self.handle(factory.post('/'))
+        self.assertEqual(used, 'default')
+        until = float(response[replicas.PIN_HEADER])
+        self.assertAlmostEqual(until, time.time() + 5, delta=1)
+        self.assertEqual(response.cookies[replicas.PIN_COOKIE].value, response[replicas.PIN_HEADER])
+
+        # Mientras dura el pin (cookie o cabecera) se lee del primario
+        request = factory.get('/')
+        request.COOKIES[replicas.PIN_COOKIE] = str(until)
+        self.assertEqual(self.handle(request)[1], 'default')
+        request = factory.get('/', headers={replicas.PIN_HEADER: str(until)})
+        self.assertEqual(self.handle(request)[1], 'default')
+        request = factory.get('/', headers={replicas.PIN_HEADER: str(time.time() - 1)})
+        self.assertNotEqual(self.handle(request)[1], 'default')
+
+        # Una escritura rechazada no fija el primario
+        response, _ = self.handle(factory.post('/'), status=400)
+        self.assertNotIn(replicas.PIN_HEADER, response)
+
+    def test_sync_copies_the_primary_and_reports_lag(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        primary_path = os.path.join(directory.name, 'primario.sqlite3')
+        with closing(sqlite3.connect(primary_path)) as primary:
+            primary.execute('CREATE TABLE catalogo (nombre TEXT)')
+            primary.execute("INSERT INTO catalogo VALUES ('Artista')")
+            primary.commit()
+        replica = connections['default'].__class__({
+            **connections['default'].settings_dict,
+            'NAME': os.path.join(directory.name, 'replica.sqlite3'), 'READ_ONLY': True,
+        }, alias='replica_a')
+        self.addCleanup(replica.close)
+        connections['replica_a'] = replica
+        self.addCleanup(connections.__delitem__, 'replica_a')
+
+        self.assertIsNone(replicas.replica_lag('replica_a'))
+        with mock.patch.dict(connections['default'].settings_dict, NAME=primary_path):
+            stdout = StringIO()
+            call_command('sync_replicas', 'replica_a', stdout=stdout)
+        self.assertIn('replica_a: sincronizada', stdout.getvalue())
+        with replica.cursor() as cursor:
+            cursor.execute('SELECT nombre FROM catalogo')
+            self.assertEqual(cursor.fetchall(), [('Artista',)])
+        self.assertLess(replicas.replica_lag('replica_a'), 5)
+        with self.assertRaisesMessage(CommandError, 'replica_c'):
+            call_command('sync_replicas', 'replica_c')
+
+
+class UniqueConstraintTests(CatalogTestCase):
+    def test_only_unique_violations_are_duplicates(self):
+        for create in (lambda: Genre.objects.create(name='Rock'), lambda: RecordLabel.objects.create(name='Sello')):
+            with self.assertRaises(IntegrityError) as raised, transaction.atomic():
+                create()
+            self.assertTrue(is_unique_violation(raised.exception))
+        with self.assertRaises(IntegrityError) as raised, transaction.atomic():
+            Genre.objects.create(name=None)
+        self.assertFalse(is_unique_violation(raised.exception))
+
+    def test_label_duplicates_are_conflicts(self):
+        response = APIClient().post(
+            BASE + 'labels/', {'name': 'Sello', 'country_id': str(self.country.pk)}, format='json'
+        )
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(RecordLabel.objects.count(), 1)
+
+
+class SyncIndexesTests(TransactionTestCase):
+    """``sync_indexes`` crea en una base existente los UNIQUE que faltan"""
+
+    def constraint_names(self):
+        with connection.cursor() as cursor:
+            return set(connection.introspection.get_constraints(cursor, Artist._meta.db_table))
+
+    def test_missing_unique_constraints_are_created(self):
+        Artist.objects.create(name='Artista')
+        with connection.cursor() as cursor:
+            cursor.execute('DROP INDEX artists_name_normalized_uniq')
+        duplicate = Artist.objects.create(name=' artista')
+
+        # Con duplicados no se puede crear: se informa y el resto sigue
+        stdout, stderr = StringIO(), StringIO()
+        call_command('sync_indexes', '--database', 'default', stdout=stdout, stderr=stderr)
+        self.assertIn('artists.artists_name_normalized_uniq: hay filas duplicadas', stderr.getvalue())
+        self.assertNotIn('artists_name_normalized_uniq', self.constraint_names())
+
+        duplicate.delete()
+        call_command('sync_indexes', '--database', 'default', stdout=stdout, stderr=StringIO())
+        self.assertIn('artists_name_normalized_uniq', self.constraint_names())
+        with self.assertRaises(IntegrityError):
+            Artist.objects.create(name='ARTISTA')
+
+
+@skipUnless(settings.TRACK_SHARDS, "Requiere DB_TRACK_SHARDS")
+class ShardedTrackReadTests(CatalogTestCase):
+    """Lecturas de pistas con sharding: ninguna se queda solo en default"""
+    databases = {'default', *settings.TRACK_SHARDS}
+
+    @classmethod
+    def setUpClass(cls):
+        # Al crear las tablas de test el editor de esquema reactivó las claves
+        # foráneas (y una base en memoria no se puede reabrir): PRAGMA del shard
+        for alias in settings.TRACK_SHARDS:
+            sqlite.apply_pragmas(sender=None, connection=connections[alias])
+        super().setUpClass()
+
+    def _should_check_constraints(self, connection):
+        # Las tablas que referencian las pistas de un shard están en default
+        return connection.alias not in settings.TRACK_SHARDS and super()._should_check_constraints(connection)
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        # La pista creada con el ORM queda en default: se mueve como haría reshard_tracks
+        relocate_track(cls.track)
+
+    def test_track_readers_query_the_shards(self):
+        self.assertNotEqual(self.track._state.db, 'default')
+        client = APIClient()
+        songs = client.get(BASE + f'albums/{self.album.pk}/album_songs/').json()['songs']
+        self.assertEqual([(song['title'], song['genres']) for song in songs], [('Pista', [str(self.subgenre.pk)])])
+        tracks = client.get(BASE + f'genres/{self.genre.pk}/tracks/?include_subgenres=true').json()['items']
+        self.assertEqual([track['title'] for track in tracks], ['Pista'])
+
+        rows = [json.loads(line) for line in b''.join(client.get(BASE + 'export/tracks').streaming_content).splitlines()]
+        self.assertEqual(
+            [(row['title'], row['artist'], row['album'], row['genres']) for row in rows],
+            [('Pista', 'Artista', 'Álbum', ['Indie'])]
+        )
+
+    def test_shard_write_units_roll_back_in_every_database(self):
+        album_track_count = self.album.track_count
+
+        def unit():
+            create_track(Track(
+                artist_id=self.artist, album_id=self.album, title='Fallida', status='published',
+                audio_master_url='https://example.com/f.mp3'
+            ), [self.genre.pk])
+            raise RuntimeError('falla después de escribir')
+
+        # Con la cola activada la unidad tampoco pasa por el escritor de default
+        with self.settings(WRITE_QUEUE={'ENABLED': True}):
+            with self.assertRaises(RuntimeError):
+                run_write(unit, using=shard_for_artist(self.artist.pk))
+        shard = shard_for_artist(self.artist.pk)
+        self.assertFalse(Track.objects.using(shard).filter(title='Fallida').exists())
+        self.album.refresh_from_db()
+        self.assertEqual(self.album.track_count, album_track_count)
+
+    def test_deleting_an_album_detaches_its_tracks_in_every_shard(self):
+        shard = self.track._state.db
+        with self.captureOnCommitCallbacks(execute=True):
+            response = APIClient().delete(BASE + f'albums/{self.album.pk}/')
+        self.assertEqual(response.status_code, 204)
+        track = Track.objects.using(shard).get(pk=self.track.pk)
+        self.assertIsNone(track.album_id_id)
+        row = TrackReadModel.objects.using(shard).get(pk=self.track.pk)
+        self.assertEqual((row.album_id, row.album_title), (None, None))
+
+    async def test_async_artist_tracks_query_the_artist_shard(self):
+        response = await AsyncClient().get(BASE + f'async/artists/{self.artist.pk}/tracks/')
+        self.assertEqual(response.json()['total'], 1)
+        self.assertEqual([track['title'] for track in response.json()['items']], ['Pista'])
+
+
+class AsyncReadViewTests(CatalogTestCase):
+    """Vistas /async/...: mismos datos que la acción síncrona y sin consultas por fila"""
+
+    def endpoints(self):
+        artist, country = self.artist.pk, self.country.pk
+        return [
+            f'artists/{artist}/albums/', f'artists/{artist}/tracks/',
+            f'countries/{country}/artists/', f'countries/{country}/record_labels/',
+        ]
+
+    def get_async(self, path):
+        with CaptureQueriesContext(connection) as queries:
+            response = async_to_sync(AsyncClient().get)(BASE + 'async/' + path)
+        self.assertEqual(response.status_code, 200)
+        return response.json(), len(queries)
+
+    def test_async_lists_match_sync_actions(self):
+        client = APIClient()
+        for path in self.endpoints():
+            with self.subTest(path=path):
+                data, _ = self.get_async(path)
+                expected = client.get(BASE + path).json()['items']
+                self.assertEqual(data['items'], expected)
+                self.assertEqual(data['total'], len(expected))
+
+    def test_async_lists_do_not_query_more_than_sync_actions(self):
+        for index in range(3):
+            label = RecordLabel.objects.create(name=f'Sello {index}', country=self.country)
+            artist = Artist.objects.create(name=f'Artista {index}', label_id=label, country=self.country)
+            album = Album.objects.create(
+                artist_id=self.artist, title=f'Álbum {index}', release_date=date(2020, 1, 1), status='published'
+            )
+            album.genres.add(self.genre)
+            track = Track.objects.create(
+                artist_id=self.artist, album_id=album, title=f'Pista {index}', status='published',
+                audio_master_url='https://example.com/a.mp3'
+            )
+            track.genres.add(self.subgenre)
+            Track.objects.create(artist_id=artist, title=f'Otra {index}', audio_master_url='https://example.com/a.mp3')
+
+        client = APIClient()
+        # Los INSERT cambiaron los diccionarios: la primera lectura reconstruye la copia
+        self.get_async(self.endpoints()[0])
+        for path in self.endpoints():
+            with self.subTest(path=path):
+                data, queries = self.get_async(path)
+                self.assertGreater(data['total'], 1)
+                with CaptureQueriesContext(connection) as sync_queries:
+                    client.get(BASE + path)
+                self.assertLessEqual(queries, len(sync_queries))
+
+    def test_missing_parent_is_not_found(self):
+        response = async_to_sync(AsyncClient().get)(BASE + f'async/artists/{self.genre.pk}/tracks/')
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(response.json(), {'error': 'Artista no encontrado'})
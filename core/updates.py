@@ -0,0 +1,49 @@
+"""
+Escrituras parciales: solo se guardan las columnas que realmente cambian.
+También distingue los errores de integridad por restricciones UNIQUE.
+"""
+# Códigos extendidos de SQLite para una clave duplicada
+UNIQUE_ERROR_NAMES = {'SQLITE_CONSTRAINT_UNIQUE', 'SQLITE_CONSTRAINT_PRIMARYKEY'}
+
+
+def save_changed_fields(instance, validated_data):
+    """
+    Asigna los valores validados y guarda con ``update_fields`` únicamente las
+    columnas modificadas (más los campos ``auto_now``). Si no cambia nada no
+    se escribe en la base de datos. Devuelve la lista de campos guardados.
+    """
+    opts = instance._meta
+    changed = []
+
+    for attr, value in validated_data.items():
+        field = opts.get_field(attr)
+        if field.is_relation:
+            # Comparar por clave para no cargar el objeto relacionado
+            current = getattr(instance, field.attname)
+            new = value.pk if value is not None else None
+        else:
+            current = getattr(instance, attr)
+            new = value
+        if current != new:
+            changed.append(field.name)
+        setattr(instance, attr, value)
+
+    if changed:
+        changed += [
+            field.name for field in opts.concrete_fields
+            if getattr(field, 'auto_now', False) and field.name not in changed
+        ]
+        instance.save(update_fields=changed)
+    return changed
+
+
+def is_unique_violation(exc):
+    """
+    True si el ``IntegrityError`` se debe a una restricción UNIQUE (un
+    duplicado) y no a una clave foránea, un NOT NULL o un CHECK.
+    """
+    cause = exc.__cause__ or exc
+    error_name = getattr(cause, 'sqlite_errorname', None)
+    if error_name is not None:
+        return error_name in UNIQUE_ERROR_NAMES
+    return 'UNIQUE constraint failed' in str(exc)
@@ -0,0 +1,9 @@
+from django.urls import path
+from .views import CatalogExportView, InvalidationStatusView, ReplicaStatusView, ResponseCacheStatusView
+
+urlpatterns = [
+    path('export/<str:entity>', CatalogExportView.as_view(), name='catalog-export'),
+    path('replicas/status', ReplicaStatusView.as_view(), name='replica-status'),
+    path('invalidation/status', InvalidationStatusView.as_view(), name='invalidation-status'),
+    path('response-cache/status', ResponseCacheStatusView.as_view(), name='response-cache-status'),
+]
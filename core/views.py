@@ -1,3 +1,82 @@
-from django.shortcuts import render
+from django.http import JsonResponse, StreamingHttpResponse
+from django.views import View
 
-# Create your views here.
+from .catalog_export import DEFAULT_CHUNK_SIZE, ENTITIES, FORMATS, export_stream, iter_gzip
+from .coalescing import status as response_cache_status
+from .invalidation import status as invalidation_status
+from .replicas import replica_status
+
+
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+}
+
+
+class CatalogExportView(View):
+    """
+    GET /export/{entity}?format=ndjson|csv&gzip=true - Exportar el catálogo en streaming
+    """
+
+    def get(self, request, entity):
+        if entity not in ENTITIES:
+            return JsonResponse(
+                {'error': f"Entidad no válida. Opciones: {', '.join(ENTITIES)}"},
+                status=404
+            )
+
+        output_format = request.GET.get('format', 'ndjson').lower()
+        if output_format not in FORMATS:
+            return JsonResponse(
+                {'error': f"Formato no válido. Opciones: {', '.join(FORMATS)}"},
+                status=400
+            )
+
+        try:
+            chunk_size = int(request.GET.get('chunk_size', DEFAULT_CHUNK_SIZE))
+        except ValueError:
+            chunk_size = 0
+        if not 0 < chunk_size <= 50000:
+            return JsonResponse(
+                {'error': 'chunk_size debe estar entre 1 y 50000'},
+                status=400
+            )
+
+        stream = export_stream(entity, output_format, chunk_size=chunk_size)
+        filename = f'{entity}.{output_format}'
+
+        if request.GET.get('gzip', '').lower() == 'true':
+            response = StreamingHttpResponse(iter_gzip(stream), content_type='application/gzip')
+            filename += '.gz'
+        else:
+            response = StreamingHttpResponse(stream, content_type=CONTENT_TYPES[output_format])
+
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+
+class ReplicaStatusView(View):
+    """
+    GET /replicas/status - Retraso de cada réplica de solo lectura
+    """
+
+    def get(self, request):
+        return JsonResponse({'replicas': replica_status()})
+
+
+class InvalidationStatusView(View):
+    """
+    GET /invalidation/status - Posición y retraso de este proceso en el bus de invalidación
+    """
+
+    def get(self, request):
+        return JsonResponse(invalidation_status())
+
+
+class ResponseCacheStatusView(View):
+    """
+    GET /response-cache/status - Lecturas coalescidas y aciertos de la caché de respuestas de este proceso
+    """
+
+    def get(self, request):
+        return JsonResponse(response_cache_status())
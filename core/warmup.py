@@ -0,0 +1,126 @@
+"""
+Calentamiento al arrancar, pensado para ejecutarse antes de crear los workers.
+
+Tras cada despliegue las primeras peticiones pagaban la importación diferida
+de vistas y serializers, la construcción de la copia de países y géneros y
+las páginas más pedidas sin caché. ``warm_up()`` lo hace una vez:
+
+1. ``imports``: importa los módulos ``serializers``, ``views`` y ``urls`` de
+   las apps del proyecto y resuelve el URLconf completo, de modo que las
+   importaciones dentro de métodos ya encuentran el módulo cargado.
+2. ``dictionaries``: construye la copia de países y géneros
+   (``core.dictionaries``), que incluye la jerarquía de géneros.
+3. ``responses``: pide cada ruta de ``WARMUP['PATHS']``; con la caché de
+   respuestas activada (``core.coalescing``) quedan guardadas.
+4. ``fork``: fija la posición en el bus de invalidación (los workers aplican
+   lo que llegue después), cierra las conexiones a la base de datos, que no
+   deben heredarse, y congela los objetos creados con ``gc.freeze()`` para
+   que el recolector no los toque y sus páginas se compartan entre workers
+   (*copy-on-write*).
+
+Con ``WARMUP['ON_START']`` se ejecuta al cargar ``wsgi.py``/``asgi.py``;
+con ``gunicorn --preload`` eso ocurre en el proceso maestro, antes del fork.
+Los tiempos de cada fase se registran en el logger ``core.warmup``;
+``manage.py warm_up`` lo ejecuta a mano y los muestra.
+
+Configuración (``settings.WARMUP``)::
+
+    WARMUP = {'ON_START': False, 'PATHS': ['/api/v1/artists/', ...]}
+"""
+import gc
+import logging
+import time
+from importlib import import_module
+
+from django.apps import apps
+from django.conf import settings
+from django.db import connections
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import get_resolver
+from django.utils.module_loading import module_has_submodule
+
+from . import dictionaries, invalidation
+
+DEFAULTS = {
+    'ON_START': False,
+    'PATHS': [],
+}
+
+WARM_MODULES = ('serializers', 'views', 'urls')
+
+logger = logging.getLogger(__name__)
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'WARMUP', {})}
+
+
+def _project_apps():
+    # Las apps del proyecto viven junto a manage.py; las de Django y DRF, en site-packages
+    base = str(settings.BASE_DIR)
+    return [config for config in apps.get_app_configs() if config.path.startswith(base)]
+
+
+def import_modules():
+    """Importa los módulos de lectura de las apps del proyecto; devuelve cuántos"""
+    count = 0
+    for config in _project_apps():
+        for name in WARM_MODULES:
+            if module_has_submodule(config.module, name):
+                import_module(f'{config.name}.{name}')
+                count += 1
+    # Recorre todos los include() del URLconf
+    get_resolver().reverse_dict
+    return count
+
+
+def warm_responses(paths):
+    """Pide cada ruta; devuelve {ruta: código de estado}"""
+    client = Client()
+    statuses = {}
+    with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+        for path in paths:
+            statuses[path] = client.get(path).status_code
+    return statuses
+
+
+def prepare_fork():
+    """Deja el proceso listo para hacer fork"""
+    invalidation.poll(force=True)
+    connections.close_all()
+    gc.collect()
+    gc.freeze()
+
+
+def warm_up(paths=None, fork=True):
+    """Ejecuta las fases y devuelve sus tiempos en segundos y lo que hizo cada una"""
+    config = get_config()
+    paths = config['PATHS'] if paths is None else paths
+    report = {'seconds': {}}
+    started = time.perf_counter()
+
+    def phase(name, func, *args):
+        phase_started = time.perf_counter()
+        result = func(*args)
+        report['seconds'][name] = round(time.perf_counter() - phase_started, 4)
+        return result
+
+    report['modules'] = phase('imports', import_modules)
+    snapshot = phase('dictionaries', dictionaries.snapshot)
+    report['countries'] = len(snapshot.countries)
+    report['genres'] = len(snapshot.genres)
+    report['responses'] = phase('responses', warm_responses, paths)
+    if fork:
+        phase('fork', prepare_fork)
+    report['seconds']['total'] = round(time.perf_counter() - started, 4)
+    return report
+
+
+def warm_up_on_start():
+    """Llamada desde wsgi.py/asgi.py: calienta si ``WARMUP['ON_START']``"""
+    if not get_config()['ON_START']:
+        return None
+    report = warm_up()
+    logger.info("Calentamiento completado en %.3f s: %s", report['seconds']['total'], report['seconds'])
+    return report
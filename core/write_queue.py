@@ -0,0 +1,180 @@
+"""
+Cola de escritura con un único escritor para SQLite.
+
+SQLite solo admite un escritor a la vez: con varios hilos escribiendo, cada
+petición compite por el bloqueo (``database is locked``) y paga un fsync por
+transacción. Con la cola activada, las peticiones entregan sus unidades de
+escritura (un callable sin argumentos que usa el ORM) a un hilo escritor que
+las agrupa en una sola transacción (*group commit*):
+
+- cada unidad se ejecuta dentro de su propio savepoint, de modo que un error
+  solo deshace esa unidad y se devuelve a la petición que la envió;
+- un lote se cierra al llegar a ``MAX_BATCH`` unidades o cuando han pasado
+  ``MAX_DELAY_MS`` desde la primera, lo que acota la latencia añadida. Con
+  0 (por defecto) no se espera: se agrupa lo que se acumuló en la cola
+  mientras se confirmaba el lote anterior;
+- los resultados se entregan solo después del COMMIT;
+- las unidades que escriben en un shard de pistas (``run_write(...,
+  using=alias)``) no pasan por la cola: su transacción es la del shard.
+
+Configuración (``settings.WRITE_QUEUE``)::
+
+    WRITE_QUEUE = {'ENABLED': False, 'MAX_BATCH': 64, 'MAX_DELAY_MS': 0}
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, close_old_connections, connections, transaction
+
+DEFAULTS = {
+    'ENABLED': False,
+    'MAX_BATCH': 64,
+    'MAX_DELAY_MS': 0,
+}
+
+_STOP = object()
+
+
+def get_config():
+    return {**DEFAULTS, **getattr(settings, 'WRITE_QUEUE', {})}
+
+
+class WriteQueue:
+    """Hilo escritor que ejecuta las unidades recibidas en transacciones agrupadas"""
+
+    def __init__(self, max_batch=DEFAULTS['MAX_BATCH'], max_delay_ms=DEFAULTS['MAX_DELAY_MS'],
+                 using=DEFAULT_DB_ALIAS):
+        if max_batch < 1:
+            raise ValueError("MAX_BATCH debe ser mayor que 0")
+        self.max_batch = max_batch
+        self.max_delay = max_delay_ms / 1000
+        self.using = using
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread = None
+        # Estadísticas: lotes confirmados y unidades ejecutadas
+        self.batches = 0
+        self.units = 0
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(
+                    target=self._run, name='sqlite-writer', daemon=True
+                )
+                self._thread.start()
+
+    def stop(self, timeout=None):
+        """Procesa lo pendiente y detiene el hilo escritor"""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is not None and thread.is_alive():
+            self._queue.put(_STOP)
+            thread.join(timeout)
+
+    def submit(self, unit):
+        """Encola una unidad de escritura y devuelve un Future con su resultado"""
+        future = Future()
+        self.start()
+        self._queue.put((unit, future))
+        return future
+
+    def run(self, unit):
+        """Ejecuta una unidad a través de la cola y espera su resultado (o error)"""
+        return self.submit(unit).result()
+
+    def _collect(self, first):
+        """Agrupa unidades hasta MAX_BATCH o hasta agotar MAX_DELAY_MS"""
+        batch = [first]
+        deadline = time.monotonic() + self.max_delay
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                # Volver a encolar la parada para salir tras este lote
+                self._queue.put(_STOP)
+                break
+            batch.append(item)
+        return batch
+
+    def _execute(self, batch):
+        outcomes = []
+        try:
+            with transaction.atomic(using=self.using):
+                for unit, future in batch:
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    try:
+                        with transaction.atomic(using=self.using):
+                            outcomes.append((future, unit(), None))
+                    except Exception as exc:
+                        outcomes.append((future, None, exc))
+        except Exception as exc:
+            # Falló el COMMIT: ninguna unidad del lote quedó escrita
+            for _, future in batch:
+                if future.running():
+                    future.set_exception(exc)
+            return
+
+        self.batches += 1
+        self.units += len(outcomes)
+        for future, result, error in outcomes:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def _run(self):
+        try:
+            while True:
+                item = self._queue.get()
+                if item is _STOP:
+                    return
+                close_old_connections()
+                self._execute(self._collect(item))
+        finally:
+            connections[self.using].close()
+
+
+_write_queue = None
+_write_queue_lock = threading.Lock()
+
+
+def get_write_queue():
+    """Cola compartida por el proceso, creada con la configuración de settings"""
+    global _write_queue
+    with _write_queue_lock:
+        if _write_queue is None:
+            config = get_config()
+            _write_queue = WriteQueue(config['MAX_BATCH'], config['MAX_DELAY_MS'])
+        return _write_queue
+
+
+def run_write(unit, using=DEFAULT_DB_ALIAS):
+    """
+    Ejecuta una unidad de escritura de forma atómica.
+
+    Si la cola está activada se envía al hilo escritor; si no (o si ya estamos
+    dentro de una transacción, cuyos datos el escritor no vería) se ejecuta
+    directamente dentro de ``transaction.atomic()``.
+
+    ``using`` es la base principal de la unidad. El escritor solo agrupa
+    transacciones de ``default``: una unidad que escribe en un shard de
+    pistas no pasa por la cola y se ejecuta con una transacción en el shard
+    y otra en ``default`` (totales, bus de invalidación), de modo que un
+    error la deshace en las dos.
+    """
+    if using != DEFAULT_DB_ALIAS:
+        with transaction.atomic(using=DEFAULT_DB_ALIAS), transaction.atomic(using=using):
+            return unit()
+    if get_config()['ENABLED'] and not connections[using].in_atomic_block:
+        return get_write_queue().run(unit)
+    with transaction.atomic(using=using):
+        return unit()
@@ -1,10 +1,10 @@
 from django.db import models
-import uuid
+from core.ids import CompactUUIDField, new_uuid
 
 
 class Country(models.Model):
     # ID único
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    id = CompactUUIDField(primary_key=True, default=new_uuid, editable=False)
 
     # Campos básicos para tabla diccionario
     name = models.CharField(
@@ -95,11 +95,10 @@ class Country(models.Model):
         ordering = ['name']
         verbose_name = 'País'
         verbose_name_plural = 'Países'
+        # name e iso_code ya tienen el índice de su restricción UNIQUE
         indexes = [
-            models.Index(fields=['name']),
-            models.Index(fields=['iso_code']),
-            models.Index(fields=['continent']),
-            models.Index(fields=['is_active']),
+            models.Index(fields=['continent', 'name']),
+            models.Index(fields=['is_active', 'name']),
         ]
 
     def __str__(self):
@@ -1,4 +1,5 @@
 from rest_framework import serializers
+from core.updates import save_changed_fields
 from .models import Country
 
 
@@ -19,6 +20,22 @@ class CountrySerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
+class CountryNestedSerializer(CountrySerializer):
+    """
+    CountrySerializer sin los contadores, que cuestan una consulta cada uno:
+    es lo que guarda ``core.dictionaries`` (los contadores los añade con una
+    consulta agrupada para todos los países)
+    """
+    artists_count = None
+    record_labels_count = None
+
+    class Meta(CountrySerializer.Meta):
+        fields = [
+            field for field in CountrySerializer.Meta.fields
+            if field not in ('artists_count', 'record_labels_count')
+        ]
+
+
 class CountryCreateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Country
@@ -27,6 +44,12 @@ class CountryCreateSerializer(serializers.ModelSerializer):
             'phone_code', 'currency_code', 'currency_name', 'flag_url',
             'is_active'
         ]
+        # La unicidad la garantizan las restricciones UNIQUE (409 en la vista)
+        extra_kwargs = {
+            'name': {'validators': []},
+            'iso_code': {'validators': []},
+            'iso_code_3': {'validators': []},
+        }
 
     def validate_name(self, value):
         """Validar que el nombre no esté vacío"""
@@ -53,21 +76,7 @@ class CountryCreateSerializer(serializers.ModelSerializer):
         return value.upper() if value else value
 
     def create(self, validated_data):
-        # Verificar duplicados
-        iso_code = validated_data.get('iso_code')
-        name = validated_data.get('name')
-
-        if Country.objects.filter(iso_code=iso_code).exists():
-            raise serializers.ValidationError(
-                {"iso_code": "Ya existe un país con este código ISO"}
-            )
-
-        if Country.objects.filter(name=name).exists():
-            raise serializers.ValidationError(
-                {"name": "Ya existe un país con este nombre"}
-            )
-
-        # Crear el país
+        # Crear el país (un único INSERT; los duplicados los rechaza la base de datos)
         country = Country.objects.create(**validated_data)
         return country
 
@@ -80,6 +89,11 @@ class CountryUpdateSerializer(serializers.ModelSerializer):
             'phone_code', 'currency_code', 'currency_name', 'flag_url',
             'is_active'
         ]
+        extra_kwargs = {
+            'name': {'validators': []},
+            'iso_code': {'validators': []},
+            'iso_code_3': {'validators': []},
+        }
 
     def validate_name(self, value):
         if value and not value.strip():
@@ -102,25 +116,6 @@ class CountryUpdateSerializer(serializers.ModelSerializer):
         return value.upper() if value else value
 
     def update(self, instance, validated_data):
-        # Verificar duplicados (excluyendo el actual)
-        iso_code = validated_data.get('iso_code')
-        name = validated_data.get('name')
-
-        if iso_code and iso_code != instance.iso_code:
-            if Country.objects.filter(iso_code=iso_code).exclude(id=instance.id).exists():
-                raise serializers.ValidationError(
-                    {"iso_code": "Ya existe un país con este código ISO"}
-                )
-
-        if name and name != instance.name:
-            if Country.objects.filter(name=name).exclude(id=instance.id).exists():
-                raise serializers.ValidationError(
-                    {"name": "Ya existe un país con este nombre"}
-                )
-
-        # Actualizar los campos
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
-
-        instance.save()
+        # Actualizar los campos (los duplicados los rechaza la base de datos)
+        save_changed_fields(instance, validated_data)
         return instance
\ No newline at end of file
@@ -1,10 +1,22 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import CountryViewSet
+from .views import (
+    CountryArtistsAsyncView,
+    CountryAsyncDetailView,
+    CountryRecordLabelsAsyncView,
+    CountryViewSet,
+)
 
 router = DefaultRouter()
 router.register(r'countries', CountryViewSet, basename='country')
 
 urlpatterns = [
     path('', include(router.urls)),
+    # Lecturas asíncronas (ASGI)
+    path('async/countries/<uuid:pk>/', CountryAsyncDetailView.as_view(), name='country-async-detail'),
+    path('async/countries/<uuid:pk>/artists/', CountryArtistsAsyncView.as_view(), name='country-async-artists'),
+    path(
+        'async/countries/<uuid:pk>/record_labels/', CountryRecordLabelsAsyncView.as_view(),
+        name='country-async-record-labels'
+    ),
 ]
\ No newline at end of file
@@ -1,7 +1,16 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from django.db import IntegrityError
 from django.db.models import Q
+from artist.serializers import ArtistSerializer
+from core.async_views import AsyncDetailView, AsyncRelatedListView
+from core.coalescing import CoalescedReadMixin
+from core.dictionaries import snapshot
+from core.filters import AllowlistedOrderingFilter
+from core.updates import is_unique_violation
+from core.write_queue import run_write
+from record_label.serializers import RecordLabelSerializer
 from .models import Country
 from .serializers import (
     CountrySerializer,
@@ -10,9 +19,14 @@ from .serializers import (
 )
 
 
-class CountryViewSet(viewsets.ModelViewSet):
+class CountryViewSet(CoalescedReadMixin, viewsets.ModelViewSet):
     queryset = Country.objects.prefetch_related('artists', 'record_labels')
     serializer_class = CountrySerializer
+    filter_backends = [AllowlistedOrderingFilter]
+    ordering_allowlist = {
+        'name': ('name',),
+        '-name': ('-name',),
+    }
 
     def get_serializer_class(self):
         if self.action == 'create':
@@ -21,6 +35,15 @@ class CountryViewSet(viewsets.ModelViewSet):
             return CountryUpdateSerializer
         return CountrySerializer
 
+    def get_object(self):
+        # /countries/ES o /countries/ESP: el código ISO se resuelve en memoria
+        lookup = self.kwargs.get(self.lookup_field, '')
+        if len(lookup) in (2, 3):
+            country = snapshot().country_by_code(lookup)
+            if country is not None:
+                self.kwargs[self.lookup_field] = str(country.pk)
+        return super().get_object()
+
     def get_queryset(self):
         queryset = super().get_queryset()
 
@@ -71,15 +94,18 @@ class CountryViewSet(viewsets.ModelViewSet):
         serializer.is_valid(raise_exception=True)
 
         try:
-            country = serializer.save()
-        except serializer.ValidationError as e:
-            # Manejar error de duplicado como 409 Conflict
-            if 'iso_code' in e.detail or 'name' in e.detail:
+            country = run_write(serializer.save)
+        except IntegrityError as e:
+            if not is_unique_violation(e):
                 return Response(
-                    {'error': 'Ya existe un país con este código ISO o nombre'},
-                    status=status.HTTP_409_CONFLICT
+                    {'error': str(e)},
+                    status=status.HTTP_400_BAD_REQUEST
                 )
-            raise e
+            # La restricción UNIQUE de la base de datos detecta el duplicado
+            return Response(
+                {'error': 'Ya existe un país con este código ISO o nombre'},
+                status=status.HTTP_409_CONFLICT
+            )
         except Exception as e:
             return Response(
                 {'error': str(e)},
@@ -106,15 +132,18 @@ class CountryViewSet(viewsets.ModelViewSet):
         serializer.is_valid(raise_exception=True)
 
         try:
-            country = serializer.save()
-        except serializer.ValidationError as e:
-            # Manejar error de duplicado como 409 Conflict
-            if 'iso_code' in e.detail or 'name' in e.detail:
+            country = run_write(serializer.save)
+        except IntegrityError as e:
+            if not is_unique_violation(e):
                 return Response(
-                    {'error': 'Ya existe un país con este código ISO o nombre'},
-                    status=status.HTTP_409_CONFLICT
+                    {'error': str(e)},
+                    status=status.HTTP_400_BAD_REQUEST
                 )
-            raise e
+            # La restricción UNIQUE de la base de datos detecta el duplicado
+            return Response(
+                {'error': 'Ya existe un país con este código ISO o nombre'},
+                status=status.HTTP_409_CONFLICT
+            )
         except Exception as e:
             return Response(
                 {'error': str(e)},
@@ -147,9 +176,6 @@ class CountryViewSet(viewsets.ModelViewSet):
         """
         country = self.get_object()
 
-        # Importación diferida
-        from artist.serializers import ArtistSerializer
-
         artists = country.artists.all()
 
         page = self.paginate_queryset(artists)
@@ -170,9 +196,6 @@ class CountryViewSet(viewsets.ModelViewSet):
         """
         country = self.get_object()
 
-        # Importación diferida
-        from record_label.serializers import RecordLabelSerializer
-
         record_labels = country.record_labels.all()
 
         page = self.paginate_queryset(record_labels)
@@ -191,20 +214,42 @@ class CountryViewSet(viewsets.ModelViewSet):
         """
         Listar continentes disponibles
         """
-        continents = Country.objects.filter(
-            continent__isnull=False
-        ).values_list(
-            'continent', flat=True
-        ).distinct()
+        # Calculados al construir la copia en memoria de los diccionarios
+        return Response(snapshot().continents)
 
-        continent_choices = dict(Country._meta.get_field('continent').choices)
 
-        continent_list = []
-        for continent_code in continents:
-            continent_list.append({
-                'code': continent_code,
-                'name': continent_choices.get(continent_code, continent_code),
-                'countries_count': Country.objects.filter(continent=continent_code).count()
-            })
+class CountryAsyncDetailView(AsyncDetailView):
+    """
+    GET /async/countries/{id} - Detalle de un país (ASGI)
+    """
+    model = Country
+    serializer_class = CountrySerializer
+    not_found_message = 'País no encontrado'
 
-        return Response(continent_list)
\ No newline at end of file
+    def get_queryset(self):
+        return CountryViewSet.queryset.all()
+
+
+class CountryArtistsAsyncView(AsyncRelatedListView):
+    """
+    GET /async/countries/{id}/artists - Artistas del país (ASGI)
+    """
+    model = Country
+    related_name = 'artists'
+    # Las de ArtistViewSet.queryset: sello y contadores sin consultas por artista
+    select_related = ('label_id',)
+    prefetch_related = ('albums', 'tracks')
+    serializer_class = 'artist.serializers.ArtistSerializer'
+    not_found_message = 'País no encontrado'
+
+
+class CountryRecordLabelsAsyncView(AsyncRelatedListView):
+    """
+    GET /async/countries/{id}/record_labels - Sellos discográficos del país (ASGI)
+    """
+    model = Country
+    related_name = 'record_labels'
+    # La de RecordLabelViewSet.queryset
+    prefetch_related = ('artists',)
+    serializer_class = 'record_label.serializers.RecordLabelSerializer'
+    not_found_message = 'País no encontrado'
@@ -1,11 +1,11 @@
 from django.utils import timezone
 from django.db import models
-import uuid
+from core.ids import CompactUUIDField, new_uuid
 
 
 class Genre(models.Model):
     # ID único
-    genre_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    genre_id = CompactUUIDField(primary_key=True, default=new_uuid, editable=False)
 
     # Campos básicos
     name = models.CharField(
@@ -29,7 +29,8 @@ class Genre(models.Model):
         null=True,
         blank=True,
         related_name='subgenres',
-        verbose_name='Género padre'
+        verbose_name='Género padre',
+        db_index=False
     )
 
     # Campos de auditoría
@@ -41,9 +42,9 @@ class Genre(models.Model):
         ordering = ['name']
         verbose_name = 'Género Musical'
         verbose_name_plural = 'Géneros Musicales'
+        # name ya tiene el índice de su restricción UNIQUE
         indexes = [
-            models.Index(fields=['name']),
-            models.Index(fields=['parent_genre']),
+            models.Index(fields=['parent_genre', 'name']),
         ]
 
     def __str__(self):
@@ -83,6 +84,10 @@ class Genre(models.Model):
 
     def get_all_tracks(self):
         """Obtiene todas las pistas de este género y sus subgéneros"""
-        from track.models import Track
-        genre_ids = [self.genre_id] + [sg.genre_id for sg in self.get_all_subgenres()]
-        return Track.objects.filter(genres__genre_id__in=genre_ids).distinct()
\ No newline at end of file
+        from django.db.models import Exists, OuterRef
+        from core.genre_tree import expand
+        from track.models import Track, TrackGenre
+        genre_ids = expand([self.genre_id], include_subgenres=True)
+        return Track.objects.filter(
+            Exists(TrackGenre.objects.filter(track=OuterRef('pk'), genre__in=genre_ids))
+        )
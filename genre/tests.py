@@ -1,3 +1,32 @@
-from django.test import TestCase
+from datetime import date
 
-# Create your tests here.
+from rest_framework.test import APIClient
+
+from album.models import Album
+from core.testing import BASE, CatalogTestCase
+from genre.models import Genre
+
+
+class SubgenreListTests(CatalogTestCase):
+    def test_genre_lists_include_subgenres_on_request(self):
+        client = APIClient()
+        deep = Genre.objects.create(name='Shoegaze', parent_genre=self.subgenre)
+        album = Album.objects.create(
+            artist_id=self.artist, title='Ruido', release_date=date(2021, 1, 1), status='published'
+        )
+        album.genres.add(deep)
+
+        def titles(path):
+            return [item['title'] for item in client.get(BASE + path).json()['items']]
+
+        genre = self.genre.pk
+        self.assertEqual(titles(f'genres/{genre}/tracks/'), [])
+        self.assertEqual(titles(f'genres/{genre}/tracks/?include_subgenres=true'), ['Pista'])
+        self.assertEqual(titles(f'genres/{genre}/albums/'), ['Álbum'])
+        self.assertEqual(titles(f'genres/{genre}/albums/?include_subgenres=true'), ['Ruido', 'Álbum'])
+        self.assertEqual(titles('tracks/?genre=rock&include_subgenres=true'), ['Pista'])
+
+        # Un cambio de jerarquía en este proceso se ve sin esperar a que caduque
+        deep.parent_genre = None
+        deep.save()
+        self.assertEqual(titles(f'genres/{genre}/albums/?include_subgenres=true'), ['Álbum'])
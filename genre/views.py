@@ -1,7 +1,18 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from django.db.models import Q
+from django.db import IntegrityError
+from django.db.models import Exists, OuterRef, Q
+from album.models import Album, AlbumGenre
+from album.serializers import AlbumSerializer
+from core.coalescing import CoalescedReadMixin
+from core.filters import AllowlistedOrderingFilter
+from core.genre_tree import expand, wants_subgenres
+from core.sharding import sharded_tracks, sharding_enabled
+from core.updates import is_unique_violation
+from core.write_queue import run_write
+from track.models import Track, TrackGenre
+from track.serializers import TrackSerializer
 from .models import Genre
 from .serializers import (
     GenreSerializer,
@@ -10,9 +21,14 @@ from .serializers import (
 )
 
 
-class GenreViewSet(viewsets.ModelViewSet):
+class GenreViewSet(CoalescedReadMixin, viewsets.ModelViewSet):
     queryset = Genre.objects.select_related('parent_genre').prefetch_related('tracks', 'albums')
     serializer_class = GenreSerializer
+    filter_backends = [AllowlistedOrderingFilter]
+    ordering_allowlist = {
+        'name': ('name',),
+        '-name': ('-name',),
+    }
 
     def get_serializer_class(self):
         if self.action == 'create':
@@ -57,15 +73,18 @@ class GenreViewSet(viewsets.ModelViewSet):
         serializer.is_valid(raise_exception=True)
 
         try:
-            genre = serializer.save()
-        except serializer.ValidationError as e:
-            # Manejar error de duplicado como 409 Conflict
-            if 'name' in e.detail and 'Ya existe' in str(e.detail['name']):
+            genre = run_write(serializer.save)
+        except IntegrityError as e:
+            if not is_unique_violation(e):
                 return Response(
-                    {'error': 'Ya existe un género con este nombre'},
-                    status=status.HTTP_409_CONFLICT
+                    {'error': str(e)},
+                    status=status.HTTP_400_BAD_REQUEST
                 )
-            raise e
+            # La restricción UNIQUE de la base de datos detecta el duplicado
+            return Response(
+                {'error': 'Ya existe un género con este nombre'},
+                status=status.HTTP_409_CONFLICT
+            )
         except Exception as e:
             return Response(
                 {'error': str(e)},
@@ -92,15 +111,18 @@ class GenreViewSet(viewsets.ModelViewSet):
         serializer.is_valid(raise_exception=True)
 
         try:
-            genre = serializer.save()
-        except serializer.ValidationError as e:
-            # Manejar error de duplicado como 409 Conflict
-            if 'name' in e.detail and 'Ya existe' in str(e.detail['name']):
+            genre = run_write(serializer.save)
+        except IntegrityError as e:
+            if not is_unique_violation(e):
                 return Response(
-                    {'error': 'Ya existe un género con este nombre'},
-                    status=status.HTTP_409_CONFLICT
+                    {'error': str(e)},
+                    status=status.HTTP_400_BAD_REQUEST
                 )
-            raise e
+            # La restricción UNIQUE de la base de datos detecta el duplicado
+            return Response(
+                {'error': 'Ya existe un género con este nombre'},
+                status=status.HTTP_409_CONFLICT
+            )
         except Exception as e:
             return Response(
                 {'error': str(e)},
@@ -148,13 +170,18 @@ class GenreViewSet(viewsets.ModelViewSet):
     def tracks(self, request, pk=None):
         """
         GET /genres/{genre_id}/tracks - Obtener pistas del género
+        (con ?include_subgenres=true también las de sus subgéneros)
         """
         genre = self.get_object()
+        genre_ids = expand([genre.pk], wants_subgenres(request))
 
-        # Importación diferida para evitar circularidad
-        from track.serializers import TrackSerializer
-
-        tracks = genre.tracks.all()
+        # EXISTS sobre el orden por título en lugar de JOIN + DISTINCT + ordenación en memoria
+        tracks = Track.published.filter(
+            Exists(TrackGenre.objects.filter(track=OuterRef('pk'), genre__in=genre_ids))
+        ).select_related('artist_id', 'album_id').prefetch_related('genres', 'album_id__genres')
+        if sharding_enabled():
+            # EXISTS dentro de cada shard; artista, álbum y géneros sin JOIN con default
+            tracks = sharded_tracks(tracks)
 
         page = self.paginate_queryset(tracks)
         if page is not None:
@@ -171,13 +198,14 @@ class GenreViewSet(viewsets.ModelViewSet):
     def albums(self, request, pk=None):
         """
         GET /genres/{genre_id}/albums - Obtener álbumes del género
+        (con ?include_subgenres=true también los de sus subgéneros)
         """
         genre = self.get_object()
+        genre_ids = expand([genre.pk], wants_subgenres(request))
 
-        # Importación diferida para evitar circularidad
-        from album.serializers import AlbumSerializer
-
-        albums = genre.albums.all()
+        albums = Album.published.filter(
+            Exists(AlbumGenre.objects.filter(album=OuterRef('pk'), genre__in=genre_ids))
+        ).prefetch_related('genres')
 
         page = self.paginate_queryset(albums)
         if page is not None:
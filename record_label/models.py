@@ -1,13 +1,13 @@
 from django.db import models
-import uuid
+from core.ids import CompactUUIDField, new_uuid
 
 
 class RecordLabel(models.Model):
     # ID único
-    label_id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    label_id = CompactUUIDField(primary_key=True, default=new_uuid, editable=False)
 
     # Campos básicos
-    name = models.CharField(max_length=200, blank=False, null=False)
+    name = models.CharField(max_length=200, blank=False, null=False, unique=True)
     contact = models.EmailField(max_length=200, blank=True, null=False)
     web = models.URLField(max_length=200, blank=True, null=False)
 
@@ -17,7 +17,8 @@ class RecordLabel(models.Model):
         on_delete=models.SET_NULL,
         null=True,
         blank=False,
-        related_name='record_labels'
+        related_name='record_labels',
+        db_index=False
     )
 
     # Campos de auditoría
@@ -29,9 +30,9 @@ class RecordLabel(models.Model):
         ordering = ['name']
         verbose_name = 'Sello Discográfico'
         verbose_name_plural = 'Sellos Discográficos'
+        # name ya tiene el índice de su restricción UNIQUE
         indexes = [
-            models.Index(fields=['name']),
-            models.Index(fields=['country']),
+            models.Index(fields=['country', 'name']),
             models.Index(fields=['created_at']),
         ]
 
@@ -47,7 +48,7 @@ class RecordLabel(models.Model):
     def albums_count(self):
         """Número total de álbumes publicados por el sello"""
         from album.models import Album
-        return Album.objects.filter(artist__label_id=self).count()
+        return Album.objects.filter(artist_id__label_id=self).count()
 
     @property
     def is_active(self):
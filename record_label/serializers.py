@@ -1,4 +1,8 @@
 from rest_framework import serializers
+from core.dictionaries import country_data
+from core.relations import BatchedPrimaryKeyRelatedField, BatchedRelationsMixin
+from core.updates import save_changed_fields
+from country.models import Country
 from .models import RecordLabel
 
 
@@ -24,19 +28,25 @@ class RecordLabelSerializer(serializers.ModelSerializer):
         read_only_fields = ['label_id', 'created_at', 'updated_at']
 
     def get_country(self, obj):
-        """Importación diferida para country"""
-        from country.serializers import CountrySerializer
-        return CountrySerializer(obj.country).data
+        """País desde la copia en memoria de las tablas diccionario (sin consultas)"""
+        if obj.country_id:
+            return country_data(obj.country_id)
+        return None
 
 
-class RecordLabelCreateSerializer(serializers.ModelSerializer):
-    country_id = serializers.UUIDField(required=True)
+class RecordLabelCreateSerializer(BatchedRelationsMixin, serializers.ModelSerializer):
+    country_id = BatchedPrimaryKeyRelatedField(
+        source='country', queryset=Country.objects.all(),
+        error_messages={'does_not_exist': 'País no encontrado'}
+    )
 
     class Meta:
         model = RecordLabel
         fields = [
             'label_id', 'name', 'country_id', 'contact', 'web'
         ]
+        # La unicidad del nombre la garantiza la restricción UNIQUE (409 en la vista)
+        extra_kwargs = {'name': {'validators': []}}
 
     def validate_name(self, value):
         """Validar que el nombre no esté vacío"""
@@ -57,37 +67,23 @@ class RecordLabelCreateSerializer(serializers.ModelSerializer):
         return value
 
     def create(self, validated_data):
-        # Extraer country_id
-        country_id = validated_data.pop('country_id')
-
-        # Obtener instancia del país
-        try:
-            from country.models import Country
-            country = Country.objects.get(id=country_id)
-            validated_data['country'] = country
-        except Country.DoesNotExist:
-            raise serializers.ValidationError({"country_id": "País no encontrado"})
-
-        # Verificar duplicados (mismo nombre)
-        name = validated_data.get('name')
-        if RecordLabel.objects.filter(name=name).exists():
-            raise serializers.ValidationError(
-                {"name": "Ya existe un sello discográfico con este nombre"}
-            )
-
-        # Crear el sello discográfico
+        # El país ya viene resuelto como instancia; los duplicados los rechaza la base de datos
         record_label = RecordLabel.objects.create(**validated_data)
         return record_label
 
 
-class RecordLabelUpdateSerializer(serializers.ModelSerializer):
-    country_id = serializers.UUIDField(required=False)
+class RecordLabelUpdateSerializer(BatchedRelationsMixin, serializers.ModelSerializer):
+    country_id = BatchedPrimaryKeyRelatedField(
+        source='country', queryset=Country.objects.all(), required=False,
+        error_messages={'does_not_exist': 'País no encontrado'}
+    )
 
     class Meta:
         model = RecordLabel
         fields = [
             'name', 'country_id', 'contact', 'web'
         ]
+        extra_kwargs = {'name': {'validators': []}}
 
     def validate_name(self, value):
         if value and not value.strip():
@@ -105,28 +101,6 @@ class RecordLabelUpdateSerializer(serializers.ModelSerializer):
         return value
 
     def update(self, instance, validated_data):
-        # Manejar actualización del país si se proporciona
-        country_id = validated_data.pop('country_id', None)
-
-        if country_id is not None:
-            try:
-                from country.models import Country
-                country = Country.objects.get(id=country_id)
-                instance.country = country
-            except Country.DoesNotExist:
-                raise serializers.ValidationError({"country_id": "País no encontrado"})
-
-        # Verificar duplicados de nombre (excluyendo el actual)
-        name = validated_data.get('name')
-        if name and name != instance.name:
-            if RecordLabel.objects.filter(name=name).exclude(label_id=instance.label_id).exists():
-                raise serializers.ValidationError(
-                    {"name": "Ya existe un sello discográfico con este nombre"}
-                )
-
-        # Actualizar los demás campos
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
-
-        instance.save()
+        # Actualizar los demás campos (los duplicados los rechaza la base de datos)
+        save_changed_fields(instance, validated_data)
         return instance
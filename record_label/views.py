@@ -1,7 +1,15 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from django.db import IntegrityError
 from django.db.models import Q
+from album.models import Album
+from album.serializers import AlbumSerializer
+from artist.serializers import ArtistSerializer
+from core.coalescing import CoalescedReadMixin
+from core.filters import AllowlistedOrderingFilter
+from core.updates import is_unique_violation
+from core.write_queue import run_write
 from .models import RecordLabel
 from .serializers import (
     RecordLabelSerializer,
@@ -10,9 +18,17 @@ from .serializers import (
 )
 
 
-class RecordLabelViewSet(viewsets.ModelViewSet):
-    queryset = RecordLabel.objects.select_related('country').prefetch_related('artists')
+class RecordLabelViewSet(CoalescedReadMixin, viewsets.ModelViewSet):
+    # El país anidado sale de la copia en memoria de los diccionarios: sin JOIN con countries
+    queryset = RecordLabel.objects.prefetch_related('artists')
     serializer_class = RecordLabelSerializer
+    filter_backends = [AllowlistedOrderingFilter]
+    ordering_allowlist = {
+        'name': ('name',),
+        '-name': ('-name',),
+        'created_at': ('created_at',),
+        '-created_at': ('-created_at',),
+    }
 
     def get_serializer_class(self):
         if self.action == 'create':
@@ -59,15 +75,18 @@ class RecordLabelViewSet(viewsets.ModelViewSet):
         serializer.is_valid(raise_exception=True)
 
         try:
-            record_label = serializer.save()
-        except serializer.ValidationError as e:
-            # Manejar error de duplicado como 409 Conflict
-            if 'name' in e.detail and 'Ya existe' in str(e.detail['name']):
+            record_label = run_write(serializer.save)
+        except IntegrityError as e:
+            if not is_unique_violation(e):
                 return Response(
-                    {'error': 'Ya existe un sello discográfico con este nombre'},
-                    status=status.HTTP_409_CONFLICT
+                    {'error': str(e)},
+                    status=status.HTTP_400_BAD_REQUEST
                 )
-            raise e
+            # La restricción UNIQUE de la base de datos detecta el duplicado
+            return Response(
+                {'error': 'Ya existe un sello discográfico con este nombre'},
+                status=status.HTTP_409_CONFLICT
+            )
         except Exception as e:
             return Response(
                 {'error': str(e)},
@@ -86,15 +105,18 @@ class RecordLabelViewSet(viewsets.ModelViewSet):
         serializer.is_valid(raise_exception=True)
 
         try:
-            record_label = serializer.save()
-        except serializer.ValidationError as e:
-            # Manejar error de duplicado como 409 Conflict
-            if 'name' in e.detail and 'Ya existe' in str(e.detail['name']):
+            record_label = run_write(serializer.save)
+        except IntegrityError as e:
+            if not is_unique_violation(e):
                 return Response(
-                    {'error': 'Ya existe un sello discográfico con este nombre'},
-                    status=status.HTTP_409_CONFLICT
+                    {'error': str(e)},
+                    status=status.HTTP_400_BAD_REQUEST
                 )
-            raise e
+            # La restricción UNIQUE de la base de datos detecta el duplicado
+            return Response(
+                {'error': 'Ya existe un sello discográfico con este nombre'},
+                status=status.HTTP_409_CONFLICT
+            )
         except Exception as e:
             return Response(
                 {'error': str(e)},
@@ -128,8 +150,6 @@ class RecordLabelViewSet(viewsets.ModelViewSet):
         record_label = self.get_object()
         artists = record_label.artists.all()
 
-        from artist.serializers import ArtistSerializer
-
         page = self.paginate_queryset(artists)
         if page is not None:
             serializer = ArtistSerializer(page, many=True)
@@ -147,10 +167,8 @@ class RecordLabelViewSet(viewsets.ModelViewSet):
         GET /labels/{label_id}/albums - Obtener álbumes del sello
         """
         record_label = self.get_object()
-        from album.models import Album
-        from album.serializers import AlbumSerializer
 
-        albums = Album.objects.filter(artist__label_id=record_label)
+        albums = Album.published.filter(artist_id__label_id=record_label).prefetch_related('genres')
 
         page = self.paginate_queryset(albums)
         if page is not None:
@@ -169,7 +187,7 @@ class RecordLabelViewSet(viewsets.ModelViewSet):
         Búsqueda de sellos discográficos por nombre
         """
         query = request.query_params.get('q', '')
-        queryset = self.get_queryset()
+        queryset = self.filter_queryset(self.get_queryset())
 
         if query:
             queryset = queryset.filter(
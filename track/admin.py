@@ -1,5 +1,15 @@
 from django.contrib import admin
-from .models import Track
+from core.aggregates import refresh_album_aggregates, refresh_artist_genres
+from core.sharding import assign_track_numbers
+from .models import Track, TrackGenre
+
+
+class TrackGenreInline(admin.TabularInline):
+    # Tabla intermedia explícita: el admin no admite filter_horizontal con ella
+    model = TrackGenre
+    extra = 1
+    verbose_name = 'Género'
+    verbose_name_plural = 'Géneros'
 
 
 @admin.register(Track)
@@ -10,21 +20,47 @@ class TrackAdmin(admin.ModelAdmin):
     ]
     list_filter = ['status', 'language', 'explicit']
     search_fields = ['title', 'artist_id__name', 'album_id__title']
-    filter_horizontal = ['genres']
+    inlines = [TrackGenreInline]
     readonly_fields = ['duration_formatted']
 
     fieldsets = (
         ('Información Básica', {
-            'fields': ('title', 'artist_id', 'album_id', 'duration_sec')
+            'fields': ('title', 'artist_id', 'album_id', 'disc_number', 'track_number', 'duration_sec')
         }),
         ('Contenido', {
-            'fields': ('preview_url', 'audio_master_url', 'genres')
+            'fields': ('preview_url', 'audio_master_url')
         }),
         ('Metadatos', {
             'fields': ('language', 'explicit', 'status')
         }),
     )
 
+    def save_model(self, request, obj, form, change):
+        # Álbum y artista anteriores: si la pista cambia de uno u otro también hay que recalcularlos
+        obj._previous_album_pk = form.initial.get('album_id') if change else None
+        obj._previous_artist_pk = form.initial.get('artist_id') if change else None
+        # Sin número: al final de su disco, como en la API
+        assign_track_numbers([obj])
+        super().save_model(request, obj, form, change)
+
+    def save_related(self, request, form, formsets, change):
+        # Después de los géneros en línea: los totales incluyen los géneros de la pista
+        super().save_related(request, form, formsets, change)
+        refresh_album_aggregates({form.instance._previous_album_pk, form.instance.album_id_id})
+        refresh_artist_genres({form.instance._previous_artist_pk, form.instance.artist_id_id})
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        refresh_album_aggregates([obj.album_id_id])
+        refresh_artist_genres([obj.artist_id_id])
+
+    def delete_queryset(self, request, queryset):
+        album_pks = set(queryset.values_list('album_id', flat=True))
+        artist_pks = set(queryset.values_list('artist_id', flat=True))
+        super().delete_queryset(request, queryset)
+        refresh_album_aggregates(album_pks)
+        refresh_artist_genres(artist_pks)
+
     def get_artist(self, obj):
         return obj.artist_id.name if obj.artist_id else "Sin artista"
 
@@ -1,9 +1,27 @@
 from django.db import models
+from django.db.models import Q
+from django.utils import timezone
 from core.choices import ReleaseStatus, Language
+from core.ids import CompactUUIDField
+from core.managers import PublishedManager, ReleaseQuerySet
+
+PUBLISHED = Q(status=ReleaseStatus.PUBLISHED)
+# Orden de la lista de pistas de un álbum (el título desempata)
+TRACKLIST_ORDER = ['disc_number', 'track_number', 'title']
 
 class Track(models.Model):
-    artist_id = models.ForeignKey('artist.Artist', on_delete=models.SET_NULL, null=True, blank=True, related_name='tracks')
-    album_id = models.ForeignKey('album.Album', on_delete=models.SET_NULL, null=True, blank=True, related_name='tracks')
+    # Sin índice propio: los compuestos (artist_id, title) y (album_id, disc_number, ...) lo cubren
+    artist_id = models.ForeignKey(
+        'artist.Artist', on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='tracks', db_index=False
+    )
+    album_id = models.ForeignKey(
+        'album.Album', on_delete=models.SET_NULL, null=True, blank=True,
+        related_name='tracks', db_index=False
+    )
+    # Posición en el álbum; al crear una pista sin número va al final de su disco
+    disc_number = models.PositiveSmallIntegerField(default=1)
+    track_number = models.PositiveSmallIntegerField(null=True, blank=True)
     title = models.CharField(max_length=200, blank=False, null=False)
     duration_sec = models.PositiveIntegerField(default=0)
     explicit = models.BooleanField(default=False)
@@ -21,25 +39,166 @@ class Track(models.Model):
     )
     genres = models.ManyToManyField(
         'genre.Genre',
+        through='TrackGenre',
         related_name='tracks',
         blank=True
     )
+    # Se rellena al retirar la pista; archive_tracks mueve las antiguas a tablas frías
+    retired_at = models.DateTimeField(null=True, blank=True, editable=False)
+
+    objects = ReleaseQuerySet.as_manager()
+    published = PublishedManager()
 
     class Meta:
         db_table = 'tracks'
         ordering = ['title']
+        # Los filtros de /tracks y de las subrutas ordenan por título; las pistas
+        # de un álbum, en el orden de su lista. Las publicadas de un artista o
+        # álbum salen de índices parciales (sin borradores ni retiradas); los
+        # completos sirven los filtros explícitos de estado y el mantenimiento.
+        # El listado general usa (status, title)
         indexes = [
-            models.Index(fields=['title']),
-            models.Index(fields=['status']),
-            models.Index(fields=['artist_id', 'album_id']),
+            models.Index(fields=['artist_id', 'title'], condition=PUBLISHED, name='tracks_pub_artist_title_idx'),
+            models.Index(
+                fields=['album_id', *TRACKLIST_ORDER], condition=PUBLISHED, name='tracks_pub_album_position_idx'
+            ),
+            models.Index(fields=['status', 'title']),
+            models.Index(fields=['artist_id', 'title']),
+            models.Index(fields=['album_id', *TRACKLIST_ORDER]),
         ]
 
     def __str__(self):
         return f"{self.title} - {self.artist_id.name}"
 
+    def save(self, *args, **kwargs):
+        # retired_at acompaña al estado, también en guardados con update_fields
+        retired = self.status == ReleaseStatus.RETIRED
+        if retired != (self.retired_at is not None):
+            self.retired_at = timezone.now() if retired else None
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'retired_at'}
+        super().save(*args, **kwargs)
+
     @property
     def duration_formatted(self):
         """Devuelve la duración en formato MM:SS"""
         minutes = self.duration_sec // 60
         seconds = self.duration_sec % 60
-        return f"{minutes:02d}:{seconds:02d}"
\ No newline at end of file
+        return f"{minutes:02d}:{seconds:02d}"
+
+
+class TrackGenre(models.Model):
+    """Tabla intermedia de ``Track.genres`` (misma tabla que la generada antes)"""
+    track = models.ForeignKey(Track, on_delete=models.CASCADE, db_index=False)
+    genre = models.ForeignKey('genre.Genre', on_delete=models.CASCADE, db_index=False)
+
+    class Meta:
+        db_table = 'tracks_genres'
+        constraints = [
+            # (track, genre) sirve los géneros de una pista; (genre, track) las pistas de un género
+            models.UniqueConstraint(fields=['track', 'genre'], name='tracks_genres_track_genre_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['genre', 'track']),
+        ]
+
+
+class ArchivedTrack(models.Model):
+    """
+    Pista retirada hace tiempo (tabla fría). Conserva el id y las columnas de
+    ``Track``; las claves foráneas no tienen restricción ni índice.
+    """
+    id = models.IntegerField(primary_key=True)
+    artist_id = models.ForeignKey(
+        'artist.Artist', on_delete=models.DO_NOTHING, null=True, blank=True,
+        related_name='+', db_constraint=False, db_index=False
+    )
+    album_id = models.ForeignKey(
+        'album.Album', on_delete=models.DO_NOTHING, null=True, blank=True,
+        related_name='+', db_constraint=False, db_index=False
+    )
+    disc_number = models.PositiveSmallIntegerField(default=1)
+    track_number = models.PositiveSmallIntegerField(null=True, blank=True)
+    title = models.CharField(max_length=200)
+    duration_sec = models.PositiveIntegerField(default=0)
+    explicit = models.BooleanField(default=False)
+    status = models.CharField(max_length=10, choices=ReleaseStatus.choices)
+    preview_url = models.URLField(max_length=1000, null=True, blank=True)
+    audio_master_url = models.URLField(max_length=1000)
+    language = models.CharField(max_length=2, choices=Language.choices)
+    retired_at = models.DateTimeField(null=True, blank=True)
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'tracks_archive'
+
+    def __str__(self):
+        return self.title
+
+
+class ArchivedTrackGenre(models.Model):
+    """Géneros de una pista archivada"""
+    track = models.ForeignKey(ArchivedTrack, on_delete=models.CASCADE, db_index=False)
+    genre = models.ForeignKey('genre.Genre', on_delete=models.DO_NOTHING, db_constraint=False, db_index=False)
+
+    class Meta:
+        db_table = 'tracks_genres_archive'
+        constraints = [
+            models.UniqueConstraint(fields=['track', 'genre'], name='tracks_genres_archive_uniq'),
+        ]
+
+
+class TrackReadModel(models.Model):
+    """
+    Fila aplanada de una pista para los listados (``?flat=true``): lleva los
+    nombres de artista, sello, país, álbum y géneros, así que se sirve sin
+    JOIN. La mantiene ``core.read_model``; ``rebuild_track_read_model`` la
+    reconstruye entera.
+    """
+    id = models.IntegerField(primary_key=True)
+    title = models.CharField(max_length=200)
+    status = models.CharField(max_length=10, choices=ReleaseStatus.choices)
+    disc_number = models.PositiveSmallIntegerField(default=1)
+    track_number = models.PositiveSmallIntegerField(null=True, blank=True)
+    duration_sec = models.PositiveIntegerField(default=0)
+    duration_formatted = models.CharField(max_length=8)
+    explicit = models.BooleanField(default=False)
+    language = models.CharField(max_length=2, choices=Language.choices)
+    preview_url = models.URLField(max_length=1000, null=True, blank=True)
+    audio_master_url = models.URLField(max_length=1000)
+
+    artist_id = CompactUUIDField(null=True, blank=True)
+    artist_name = models.CharField(max_length=200, null=True, blank=True)
+    label_id = CompactUUIDField(null=True, blank=True)
+    label_name = models.CharField(max_length=200, null=True, blank=True)
+    country_id = CompactUUIDField(null=True, blank=True)
+    country_iso = models.CharField(max_length=2, null=True, blank=True)
+    album_id = CompactUUIDField(null=True, blank=True)
+    album_title = models.CharField(max_length=255, null=True, blank=True)
+    cover_url = models.URLField(max_length=500, null=True, blank=True)
+    genre_ids = models.JSONField(default=list, blank=True)
+    genre_names = models.JSONField(default=list, blank=True)
+
+    refreshed_at = models.DateTimeField(auto_now=True)
+
+    objects = ReleaseQuerySet.as_manager()
+
+    class Meta:
+        db_table = 'track_read_model'
+        ordering = ['title']
+        # Los mismos accesos que los listados de pistas, más label_id y
+        # country_id para encontrar las filas al renombrar un sello o un país
+        indexes = [
+            models.Index(fields=['artist_id', 'title'], condition=PUBLISHED, name='trm_pub_artist_title_idx'),
+            models.Index(
+                fields=['album_id', *TRACKLIST_ORDER], condition=PUBLISHED, name='trm_pub_album_position_idx'
+            ),
+            models.Index(fields=['status', 'title']),
+            models.Index(fields=['artist_id', 'title']),
+            models.Index(fields=['album_id', *TRACKLIST_ORDER]),
+            models.Index(fields=['label_id']),
+            models.Index(fields=['country_id']),
+        ]
+
+    def __str__(self):
+        return self.title
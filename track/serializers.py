@@ -1,5 +1,14 @@
+from django.db import transaction
 from rest_framework import serializers
-from .models import Track
+from album.models import Album
+from album.read_serializers import AlbumSerializer
+from artist.models import Artist
+from artist.serializers import ArtistSerializer
+from core.relations import BatchedPrimaryKeyRelatedField, BatchedRelationsMixin, set_prefetched
+from core.aggregates import refresh_album_aggregates, refresh_artist_genres
+from core.sharding import assign_track_numbers, create_track, relocate_track, set_track_genres
+from core.updates import save_changed_fields
+from .models import Track, TrackReadModel
 
 
 class TrackSerializer(serializers.ModelSerializer):
@@ -12,35 +21,61 @@ class TrackSerializer(serializers.ModelSerializer):
     class Meta:
         model = Track
         fields = [
-            'id', 'artist', 'album', 'title', 'duration_sec', 'duration_formatted',
-            'explicit', 'status', 'preview_url', 'audio_master_url', 'language',
+            'id', 'artist', 'album', 'disc_number', 'track_number', 'title', 'duration_sec',
+            'duration_formatted', 'explicit', 'status', 'preview_url', 'audio_master_url', 'language',
             'genres', 'artist_id', 'album_id'
         ]
         read_only_fields = ['id']
 
     def get_artist(self, obj):
-        """Importación diferida para evitar importaciones circulares"""
-        from artist.serializers import ArtistSerializer
         if obj.artist_id:
-            return ArtistSerializer(obj.artist_id).data
+            return self._nested_data('artist', obj.artist_id, ArtistSerializer)
         return None
 
     def get_album(self, obj):
-        """Importación diferida para evitar importaciones circulares"""
-        from album.serializers import AlbumSerializer
         if obj.album_id:
-            return AlbumSerializer(obj.album_id).data
+            return self._nested_data('album', obj.album_id, AlbumSerializer)
         return None
 
+    def _nested_data(self, kind, instance, serializer_class):
+        """Serializa una relación, reutilizando el resultado si el contexto trae 'nested_cache'"""
+        cache = self.context.get('nested_cache')
+        if cache is None:
+            return serializer_class(instance).data
+        key = (kind, instance.pk)
+        if key not in cache:
+            cache[key] = serializer_class(instance).data
+        return cache[key]
 
-class TrackCreateSerializer(serializers.ModelSerializer):
-    artist_id = serializers.UUIDField(required=False, allow_null=True)
-    album_id = serializers.UUIDField(required=False, allow_null=True)
+
+class TrackReadModelSerializer(serializers.ModelSerializer):
+    """Representación plana de una pista (``?flat=true``), leída de track_read_model"""
+
+    class Meta:
+        model = TrackReadModel
+        fields = [
+            'id', 'title', 'status', 'disc_number', 'track_number', 'duration_sec',
+            'duration_formatted', 'explicit', 'language', 'preview_url', 'audio_master_url',
+            'artist_id', 'artist_name', 'label_name', 'country_iso',
+            'album_id', 'album_title', 'cover_url', 'genre_ids', 'genre_names'
+        ]
+        read_only_fields = fields
+
+
+class TrackCreateSerializer(BatchedRelationsMixin, serializers.ModelSerializer):
+    artist_id = BatchedPrimaryKeyRelatedField(
+        queryset=Artist.objects.all(), required=False, allow_null=True,
+        error_messages={'does_not_exist': 'Artista no encontrado'}
+    )
+    album_id = BatchedPrimaryKeyRelatedField(
+        queryset=Album.objects.all(), required=False, allow_null=True,
+        error_messages={'does_not_exist': 'Álbum no encontrado'}
+    )
 
     class Meta:
         model = Track
         fields = [
-            'artist_id', 'album_id', 'title', 'duration_sec', 'explicit',
+            'artist_id', 'album_id', 'disc_number', 'track_number', 'title', 'duration_sec', 'explicit',
             'status', 'preview_url', 'audio_master_url', 'language', 'genres'
         ]
 
@@ -57,50 +92,29 @@ class TrackCreateSerializer(serializers.ModelSerializer):
         return value
 
     def create(self, validated_data):
-        # Extraer IDs de relaciones
-        artist_id = validated_data.pop('artist_id', None)
-        album_id = validated_data.pop('album_id', None)
+        # Artista, álbum y géneros ya vienen resueltos como instancias
         genres = validated_data.pop('genres', [])
 
-        # Obtener instancias de artistas y álbumes
-        if artist_id:
-            try:
-                from artist.models import Artist
-                artist = Artist.objects.get(id=artist_id)
-                validated_data['artist_id'] = artist
-            except Artist.DoesNotExist:
-                raise serializers.ValidationError({"artist_id": "Artista no encontrado"})
-        else:
-            validated_data['artist_id'] = None
-
-        if album_id:
-            try:
-                from album.models import Album
-                album = Album.objects.get(id=album_id)
-                validated_data['album_id'] = album
-            except Album.DoesNotExist:
-                raise serializers.ValidationError({"album_id": "Álbum no encontrado"})
-        else:
-            validated_data['album_id'] = None
-
-        # Crear el track
-        track = Track.objects.create(**validated_data)
-
-        # Agregar géneros si se proporcionaron
-        if genres:
-            track.genres.set(genres)
-
+        # Crear el track (en su shard si hay sharding) y sus géneros con un único INSERT
+        track = create_track(Track(**validated_data), [genre.pk for genre in genres])
+        set_prefetched(track, 'genres', genres)
         return track
 
 
-class TrackUpdateSerializer(serializers.ModelSerializer):
-    artist_id = serializers.UUIDField(required=False, allow_null=True)
-    album_id = serializers.UUIDField(required=False, allow_null=True)
+class TrackUpdateSerializer(BatchedRelationsMixin, serializers.ModelSerializer):
+    artist_id = BatchedPrimaryKeyRelatedField(
+        queryset=Artist.objects.all(), required=False, allow_null=True,
+        error_messages={'does_not_exist': 'Artista no encontrado'}
+    )
+    album_id = BatchedPrimaryKeyRelatedField(
+        queryset=Album.objects.all(), required=False, allow_null=True,
+        error_messages={'does_not_exist': 'Álbum no encontrado'}
+    )
 
     class Meta:
         model = Track
         fields = [
-            'artist_id', 'album_id', 'title', 'duration_sec', 'explicit',
+            'artist_id', 'album_id', 'disc_number', 'track_number', 'title', 'duration_sec', 'explicit',
             'status', 'preview_url', 'audio_master_url', 'language', 'genres'
         ]
 
@@ -110,42 +124,29 @@ class TrackUpdateSerializer(serializers.ModelSerializer):
         return value
 
     def update(self, instance, validated_data):
-        # Manejar actualización de relaciones
-        artist_id = validated_data.pop('artist_id', None)
-        album_id = validated_data.pop('album_id', None)
+        # Las relaciones ya vienen resueltas como instancias (o None para quitarlas)
         genres = validated_data.pop('genres', None)
-
-        # Actualizar artista si se proporciona
-        if artist_id is not None:
-            if artist_id:
-                try:
-                    from artist.models import Artist
-                    artist = Artist.objects.get(id=artist_id)
-                    instance.artist_id = artist
-                except Artist.DoesNotExist:
-                    raise serializers.ValidationError({"artist_id": "Artista no encontrado"})
-            else:
-                instance.artist_id = None
-
-        # Actualizar álbum si se proporciona
-        if album_id is not None:
-            if album_id:
-                try:
-                    from album.models import Album
-                    album = Album.objects.get(id=album_id)
-                    instance.album_id = album
-                except Album.DoesNotExist:
-                    raise serializers.ValidationError({"album_id": "Álbum no encontrado"})
-            else:
-                instance.album_id = None
-
-        # Actualizar géneros si se proporcionan
-        if genres is not None:
-            instance.genres.set(genres)
-
-        # Actualizar los demás campos
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
-
-        instance.save()
-        return instance
\ No newline at end of file
+        old_album_pk, old_duration = instance.album_id_id, instance.duration_sec
+        old_artist_pk = instance.artist_id_id
+        album = validated_data.get('album_id', instance.album_id)
+        if getattr(album, 'pk', None) != old_album_pk and 'track_number' not in validated_data:
+            # Cambia de álbum sin número: pasa al final de su disco en el nuevo
+            moved = Track(album_id=album, disc_number=validated_data.get('disc_number', instance.disc_number))
+            assign_track_numbers([moved])
+            validated_data['track_number'] = moved.track_number
+
+        with transaction.atomic(using=instance._state.db):
+            # Actualizar géneros si se proporcionan
+            if genres is not None:
+                set_track_genres(instance, genres)
+
+            # Actualizar los demás campos y los totales de los álbumes y artistas afectados
+            save_changed_fields(instance, validated_data)
+            if (old_album_pk, old_duration) != (instance.album_id_id, instance.duration_sec):
+                refresh_album_aggregates({old_album_pk, instance.album_id_id})
+            if old_artist_pk != instance.artist_id_id:
+                refresh_artist_genres({old_artist_pk, instance.artist_id_id})
+
+        # Si cambia el artista puede cambiar de shard
+        relocate_track(instance)
+        return instance
@@ -0,0 +1,194 @@
+import subprocess
+import sys
+from io import StringIO
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import connection
+from django.test import SimpleTestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from album.serializers import AlbumSerializer
+from artist.models import ArtistGenre
+from core.aggregates import compute_artist_genres
+from core.invalidation import publish
+from core.sharding import ARCHIVE_EVENT
+from core.testing import BASE, CatalogTestCase
+from genre.models import Genre
+from track.models import ArchivedTrack, Track, TrackReadModel
+from track.serializers import TrackSerializer
+
+
+class PublicTrackListTests(CatalogTestCase):
+    def test_public_lists_hide_unpublished_content(self):
+        Track.objects.create(
+            artist_id=self.artist, album_id=self.album, title='Retirada', status='retired',
+            audio_master_url='https://example.com/b.mp3'
+        )
+        client = APIClient()
+        titles = [item['title'] for item in client.get(BASE + 'tracks/').json()['items']]
+        self.assertEqual(titles, ['Pista'])
+        titles = [item['title'] for item in client.get(BASE + 'tracks/?status=retired').json()['items']]
+        self.assertEqual(titles, ['Retirada'])
+
+
+class TrackReadModelTests(CatalogTestCase):
+    def test_flat_track_rows_follow_related_changes(self):
+        client = APIClient()
+
+        def flat_rows():
+            with CaptureQueriesContext(connection) as queries:
+                items = client.get(BASE + 'tracks/?flat=true').json()['items']
+            # Una sola tabla, sin JOIN ni consultas por fila
+            for query in queries:
+                self.assertIn('"track_read_model"', query['sql'])
+                self.assertNotIn('JOIN', query['sql'])
+            return [(item['artist_name'], item['label_name'], item['album_title'], item['genre_names']) for item in items]
+
+        self.assertEqual(flat_rows(), [('Artista', 'Sello', 'Álbum', ['Indie'])])
+        # Los cambios de artistas, sellos y géneros se aplican al confirmar la transacción
+        with self.captureOnCommitCallbacks(execute=True):
+            self.artist.name = 'Otro nombre'
+            self.artist.save()
+            self.label.name = 'Otro sello'
+            self.label.save()
+            self.subgenre.name = 'Shoegaze'
+            self.subgenre.save()
+        self.assertEqual(flat_rows(), [('Otro nombre', 'Otro sello', 'Álbum', ['Shoegaze'])])
+        self.track.genres.add(self.genre)
+        self.assertEqual(flat_rows(), [('Otro nombre', 'Otro sello', 'Álbum', ['Rock', 'Shoegaze'])])
+
+        client.delete(BASE + f'tracks/{self.track.pk}/')
+        self.assertEqual(flat_rows(), [])
+
+    def test_only_copied_fields_rebuild_rows(self):
+        client = APIClient()
+
+        def rebuilt_rows(write):
+            with CaptureQueriesContext(connection) as queries:
+                with self.captureOnCommitCallbacks(execute=True):
+                    write()
+            return sum(query['sql'].startswith('INSERT INTO "track_read_model"') for query in queries)
+
+        # Campos que la fila no copia, o un save() completo sin cambios: nada que rehacer
+        self.assertEqual(rebuilt_rows(lambda: client.patch(
+            BASE + f'artists/{self.artist.pk}/', {'bio': 'Otra biografía'}, format='json'
+        )), 0)
+        self.assertEqual(rebuilt_rows(self.genre.save), 0)
+        self.assertEqual(rebuilt_rows(self.country.save), 0)
+
+        def rename_twice():
+            self.album.title = 'Otro título'
+            self.album.save(update_fields=['title'])
+            self.album.cover_url = 'https://example.com/c.jpg'
+            self.album.save()
+
+        # Dos cambios del mismo álbum en la transacción: las filas se rehacen una vez
+        self.assertEqual(rebuilt_rows(rename_twice), 1)
+        row = TrackReadModel.objects.get(pk=self.track.pk)
+        self.assertEqual((row.album_title, row.cover_url), ('Otro título', 'https://example.com/c.jpg'))
+
+
+class TrackWriteTests(CatalogTestCase):
+    """Lo que cuesta escribir una pista en las tablas derivadas"""
+
+    def artist_genres(self):
+        return {
+            (link.genre_id, link.track_count, link.album_count)
+            for link in ArtistGenre.objects.filter(artist=self.artist)
+        }
+
+    def expected_artist_genres(self):
+        weights = compute_artist_genres([self.artist.pk])[self.artist.pk]
+        return {(genre_pk, tracks, albums) for genre_pk, (tracks, albums) in weights.items()}
+
+    def test_writes_touch_only_their_derived_rows(self):
+        call_command('rebuild_artist_genres', stdout=StringIO())
+        jazz = Genre.objects.create(name='Jazz')
+        client = APIClient()
+
+        def post(title, genres):
+            with CaptureQueriesContext(connection) as queries:
+                response = client.post(BASE + 'tracks/', {
+                    'artist_id': str(self.artist.pk), 'album_id': str(self.album.pk), 'title': title,
+                    'duration_sec': 100, 'audio_master_url': 'https://example.com/n.mp3',
+                    'genres': [str(genre.pk) for genre in genres],
+                }, format='json')
+            self.assertEqual(response.status_code, 201, response.content)
+            return response.json()['id'], [query['sql'] for query in queries]
+
+        post('Primera', [self.genre])
+        track_pk, queries = post('Segunda', [self.genre, self.subgenre, jazz])
+        self.assertEqual(self.artist_genres(), self.expected_artist_genres())
+        # Una fila de lectura por pista, sin volver a leer el esquema
+        self.assertEqual(sum(sql.startswith('INSERT INTO "track_read_model"') for sql in queries), 1)
+        self.assertFalse([sql for sql in queries if 'sqlite_master' in sql])
+        # Solo los pares de los géneros de la pista, sin borrar las filas del artista
+        self.assertFalse([sql for sql in queries if sql.startswith('DELETE FROM "artist_genre"')])
+        self.assertEqual(TrackReadModel.objects.get(pk=track_pk).genre_names, ['Indie', 'Jazz', 'Rock'])
+
+        # Quitar el único uso de un género borra su par
+        response = client.patch(BASE + f'tracks/{track_pk}/', {'genres': [str(self.genre.pk)]}, format='json')
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(self.artist_genres(), self.expected_artist_genres())
+        self.assertFalse(ArtistGenre.objects.filter(artist=self.artist, genre=jazz).exists())
+
+    def test_archived_numbers_are_read_once_per_process(self):
+        ArchivedTrack.objects.create(
+            id=100, artist_id=self.artist, album_id=self.album, track_number=7, title='Archivada',
+            status='retired', audio_master_url='https://example.com/z.mp3', language='es'
+        )
+        client = APIClient()
+
+        def post(title):
+            with CaptureQueriesContext(connection) as queries:
+                response = client.post(BASE + 'tracks/', {
+                    'artist_id': str(self.artist.pk), 'album_id': str(self.album.pk), 'title': title,
+                    'duration_sec': 100, 'audio_master_url': 'https://example.com/n.mp3',
+                }, format='json')
+            self.assertEqual(response.status_code, 201, response.content)
+            cold = [query['sql'] for query in queries if '"tracks_archive"' in query['sql'] or 'sqlite_master' in query['sql']]
+            return response.json()['track_number'], cold
+
+        number, cold = post('Primera')
+        self.assertEqual(number, 8)
+        self.assertTrue(cold)
+        number, cold = post('Segunda')
+        self.assertEqual(number, 9)
+        self.assertEqual(cold, [])
+
+        # archive_tracks lo anuncia en el bus (como aquí) y la siguiente numeración vuelve a leerlas
+        ArchivedTrack.objects.create(
+            id=101, artist_id=self.artist, album_id=self.album, track_number=20, title='Otra',
+            status='retired', audio_master_url='https://example.com/y.mp3', language='es'
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            publish(ARCHIVE_EVENT, ['default'])
+        self.assertEqual(post('Tercera')[0], 21)
+
+
+class TrackSerializerTests(CatalogTestCase):
+    def test_album_is_nested_with_album_serializer(self):
+        data = TrackSerializer(self.track).data
+        self.assertEqual(data['album'], AlbumSerializer(self.album).data)
+        self.assertEqual(data['artist']['name'], 'Artista')
+
+
+class SerializerImportTests(SimpleTestCase):
+
+    def test_cross_app_serializers_import_in_any_order(self):
+        # Un proceso nuevo por orden: la referencia a AlbumSerializer queda resuelta al
+        # importar track.serializers y es la misma clase que exporta album.serializers
+        script = (
+            "import django; django.setup(); import {first}.serializers; import track.serializers as ts; "
+            "assert ts.AlbumSerializer.Meta.model.__name__ == 'Album'; import {second}.serializers; "
+            "from album.serializers import AlbumSerializer; assert ts.AlbumSerializer is AlbumSerializer"
+        )
+        for first, second in (('track', 'album'), ('album', 'track')):
+            with self.subTest(first=first):
+                result = subprocess.run(
+                    [sys.executable, '-c', script.format(first=first, second=second)],
+                    cwd=settings.BASE_DIR, capture_output=True, text=True,
+                )
+                self.assertEqual(result.returncode, 0, result.stderr)
@@ -2,20 +2,43 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.shortcuts import get_object_or_404
-from django.db.models import Q
-from .models import Track
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
+from album.models import Album
+from artist.models import Artist
+from core.aggregates import refresh_album_aggregates, refresh_artist_genres
+from core.coalescing import CoalescedReadMixin
+from core.dictionaries import snapshot
+from core.filters import AllowlistedOrderingFilter
+from core.genre_tree import expand, wants_subgenres
+from core.sharding import shard_for_artist, sharded_tracks, sharding_enabled
+from core.write_queue import run_write
+from .models import TRACKLIST_ORDER, Track, TrackGenre, TrackReadModel
 from .serializers import (
     TrackSerializer,
+    TrackReadModelSerializer,
     TrackCreateSerializer,
     TrackUpdateSerializer
 )
 
 
-class TrackViewSet(viewsets.ModelViewSet):
-    queryset = Track.objects.select_related('artist_id', 'album_id').prefetch_related('genres')
+class TrackViewSet(CoalescedReadMixin, viewsets.ModelViewSet):
+    queryset = Track.objects.select_related('artist_id', 'album_id').prefetch_related('genres', 'album_id__genres')
     serializer_class = TrackSerializer
+    filter_backends = [AllowlistedOrderingFilter]
+    ordering_allowlist = {
+        'title': ('title',),
+        '-title': ('-title',),
+    }
+
+    def uses_read_model(self):
+        """?flat=true en listados y búsquedas: filas planas de track_read_model, sin JOIN"""
+        flat = self.request.query_params.get('flat', '')
+        return self.action in ('list', 'search') and flat.lower() == 'true'
 
     def get_serializer_class(self):
+        if self.uses_read_model():
+            return TrackReadModelSerializer
         if self.action == 'create':
             return TrackCreateSerializer
         elif self.action in ['update', 'partial_update']:
@@ -23,7 +46,12 @@ class TrackViewSet(viewsets.ModelViewSet):
         return TrackSerializer
 
     def get_queryset(self):
-        queryset = super().get_queryset()
+        # Con sharding las pistas no pueden hacer JOIN con las tablas de default
+        sharded = sharding_enabled()
+        if self.uses_read_model():
+            queryset = TrackReadModel.objects.all()
+        else:
+            queryset = Track.objects.all() if sharded else super().get_queryset()
 
         # Filtros según query parameters
         album_id = self.request.query_params.get('album_id')
@@ -32,16 +60,51 @@ class TrackViewSet(viewsets.ModelViewSet):
         status = self.request.query_params.get('status')
 
         if album_id:
-            queryset = queryset.filter(album_id=album_id)
+            # Las pistas de un álbum salen en el orden de su lista salvo ?ordering=
+            queryset = queryset.filter(album_id=album_id).order_by(*TRACKLIST_ORDER)
         if artist_id:
             queryset = queryset.filter(artist_id=artist_id)
         if genre:
-            queryset = queryset.filter(genres__name__icontains=genre)
+            # Ids resueltos antes (con ?include_subgenres=true también sus
+            # subgéneros) y EXISTS por pista: se recorre el índice del orden
+            # (title) sin JOIN ni DISTINCT; también vale dentro de cada shard
+            genre_ids = expand(snapshot().genre_pks_matching(genre), wants_subgenres(self.request))
+            queryset = queryset.filter(Exists(
+                TrackGenre.objects.filter(track=OuterRef('pk'), genre__in=genre_ids)
+            ))
         if status:
             queryset = queryset.filter(status=status)
+        elif self.action in ('list', 'search'):
+            # Listados públicos: solo pistas publicadas salvo que se pida otro estado
+            queryset = queryset.published()
 
+        if sharded:
+            # Con artista se consulta solo su shard; si no, todos y se mezclan
+            return sharded_tracks(queryset, artist_id=artist_id)
         return queryset
 
+    def get_search_filter(self, query):
+        """Título, artista o álbum; con sharding artista y álbum se resuelven antes a ids"""
+        if self.uses_read_model():
+            return (
+                Q(title__icontains=query) |
+                Q(artist_name__icontains=query) |
+                Q(album_title__icontains=query)
+            )
+        if not sharding_enabled():
+            return (
+                Q(title__icontains=query) |
+                Q(artist_id__name__icontains=query) |
+                Q(album_id__title__icontains=query)
+            )
+        artist_ids = list(Artist.objects.filter(name__icontains=query).values_list('pk', flat=True))
+        album_ids = list(Album.objects.filter(title__icontains=query).values_list('pk', flat=True))
+        return (
+            Q(title__icontains=query) |
+            Q(artist_id__in=artist_ids) |
+            Q(album_id__in=album_ids)
+        )
+
     def list(self, request, *args, **kwargs):
         """
         GET /tracks - Listar todas las canciones
@@ -66,9 +129,11 @@ class TrackViewSet(viewsets.ModelViewSet):
         """
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
+        # Con sharding la pista se escribe en el shard de su artista
+        artist = serializer.validated_data.get('artist_id')
 
         try:
-            track = serializer.save()
+            track = run_write(serializer.save, using=shard_for_artist(artist.pk if artist else None))
         except Exception as e:
             return Response(
                 {'error': str(e)},
@@ -96,7 +161,7 @@ class TrackViewSet(viewsets.ModelViewSet):
         serializer.is_valid(raise_exception=True)
 
         try:
-            track = serializer.save()
+            track = run_write(serializer.save, using=track._state.db)
         except Exception as e:
             return Response(
                 {'error': str(e)},
@@ -111,7 +176,10 @@ class TrackViewSet(viewsets.ModelViewSet):
         DELETE /tracks/{track_id} - Eliminar canción
         """
         track = self.get_object()
-        track.delete()
+        with transaction.atomic(using=track._state.db):
+            track.delete()
+            refresh_album_aggregates([track.album_id_id])
+            refresh_artist_genres([track.artist_id_id])
         return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(detail=False, methods=['get'])
@@ -120,14 +188,10 @@ class TrackViewSet(viewsets.ModelViewSet):
         Búsqueda avanzada de tracks por título, artista o álbum
         """
         query = request.query_params.get('q', '')
-        queryset = self.get_queryset()
+        queryset = self.filter_queryset(self.get_queryset())
 
         if query:
-            queryset = queryset.filter(
-                Q(title__icontains=query) |
-                Q(artist_id__name__icontains=query) |
-                Q(album_id__title__icontains=query)
-            )
+            queryset = queryset.filter(self.get_search_filter(query))
 
         page = self.paginate_queryset(queryset)
         if page is not None: